@@ -1,127 +1,134 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+import argparse
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import csv
-from datetime import datetime
-import os
-import uuid
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+import math
+from datetime import datetime, timedelta
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# Storage, aggregates, import and export live in the headless expense_tracker
+# package; this file is only the Tkinter front end on top of it.
+from expense_tracker import (DB_FILE, DISPLAY_HEADERS, EXPENSE_FILE, EXPORT_CHUNK_ROWS, EXPORT_COLUMNS,
+                             EXPORT_WRITERS, PARTITION_DIR, STORAGE_BACKENDS, CsvHeaderError, ExportCancelled,
+                             StorageError, add_expense_to_csv, close_store, convert_csv_to_partitions,
+                             delete_expense_from_csv, export_expenses, get_all_expenses, get_daily_report,
+                             get_monthly_summary, get_monthly_totals_for_graph, get_store, import_expenses,
+                             initialize_csv, search_expenses, update_expense_in_csv, use_backend)
+from expense_tracker import config as tracker_config
+from expense_tracker import metrics
+# pandas, numpy and matplotlib are heavy to import and only needed for
+# reports, export and the trend chart, so they are imported where used.
+
+# Seconds spent in each startup phase; printed with --startup-report.
+STARTUP_TIMINGS = {'import': time.perf_counter() - _IMPORT_STARTED}
 
 # --- Configuration ---
-EXPENSE_FILE = 'expenses.csv'
-HEADERS = ['ID', 'Date', 'Description', 'Amount']
-
-# --- CSV File Handling Functions (No Change) ---
-def initialize_csv():
-    if not os.path.exists(EXPENSE_FILE):
-        with open(EXPENSE_FILE, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(HEADERS)
-        print(f"Created new expense file: {EXPENSE_FILE}")
-    else:
-        with open(EXPENSE_FILE, 'r', newline='') as file:
-            reader = csv.reader(file)
-            first_row = next(reader, None)
-            if first_row != HEADERS:
-                messagebox.showwarning("CSV Warning", "Your CSV file headers might be outdated or missing 'ID' column. Please consider starting with a fresh CSV.")
-
-def add_expense_to_csv(date, description, amount):
-    try:
-        amount_float = float(amount)
-        if amount_float <= 0:
-            return False, "Amount must be positive."
-        datetime.strptime(date, '%Y-%m-%d')
-        expense_id = str(uuid.uuid4())
-        with open(EXPENSE_FILE, 'a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([expense_id, date, description, amount_float])
-        return True, "Expense added successfully!"
-    except ValueError:
-        return False, "Invalid amount or date format. Please use YYYY-MM-DD for date and a number for amount."
-    except Exception as e:
-        return False, f"An error occurred: {e}"
-
-def get_all_expenses():
-    expenses = []
-    try:
-        with open(EXPENSE_FILE, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            if reader.fieldnames != HEADERS:
-                messagebox.showwarning("CSV Error", f"CSV file headers are incorrect. Expected {HEADERS}, found {reader.fieldnames}. Please fix the CSV or delete it to regenerate.")
-                return []
-            for row in reader:
-                expenses.append(row)
-    except FileNotFoundError:
-        pass
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not read expenses from CSV: {e}")
-    return expenses
-
-def update_expense_in_csv(expense_id, new_date, new_description, new_amount):
-    all_expenses = get_all_expenses()
-    updated_expenses = []
-    found = False
-    for expense in all_expenses:
-        if expense.get('ID') == expense_id:
-            try:
-                amount_float = float(new_amount)
-                datetime.strptime(new_date, '%Y-%m-%d')
-                updated_expenses.append({'ID': expense_id, 'Date': new_date, 'Description': new_description, 'Amount': amount_float})
-                found = True
-            except ValueError:
-                return False, "Invalid amount or date format for update."
-        else:
-            updated_expenses.append(expense)
-    if not found:
-        return False, "Expense not found for update."
-    try:
-        with open(EXPENSE_FILE, 'w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=HEADERS)
-            writer.writeheader()
-            writer.writerows(updated_expenses)
-        return True, "Expense updated successfully!"
-    except Exception as e:
-        return False, f"Error updating expense: {e}"
-
-def delete_expense_from_csv(expense_id):
-    all_expenses = get_all_expenses()
-    updated_expenses = [exp for exp in all_expenses if exp.get('ID') != expense_id]
-    if len(updated_expenses) == len(all_expenses):
-        return False, "Expense not found for deletion."
-    try:
-        with open(EXPENSE_FILE, 'w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=HEADERS)
-            writer.writeheader()
-            writer.writerows(updated_expenses)
-        return True, "Expense deleted successfully!"
-    except Exception as e:
-        return False, f"Error deleting expense: {e}"
-
-def get_monthly_summary(year, month):
-    total_monthly_expense = 0
-    all_expenses = get_all_expenses()
-    for expense in all_expenses:
+# Above this many expenses the View/Manage list only keeps a window of
+# VIRTUAL_WINDOW_ROWS rows in the Treeview and pages rows in while scrolling.
+VIRTUAL_LIST_THRESHOLD = 5000
+VIRTUAL_WINDOW_ROWS = 200
+VIRTUAL_MARGIN_ROWS = 40
+IO_WORKERS = 2
+STARTUP_REPORT = False
+# The trend chart switches from one bar per month to one bar per year once
+# there are more than GRAPH_MAX_BARS months, and never labels more than
+# GRAPH_MAX_LABELS ticks, so drawing time stays bounded as history grows.
+GRAPH_MAX_BARS = 36
+GRAPH_MAX_LABELS = 18
+JOB_POLL_MS = 30
+SEARCH_DELAY_MS = 300 # Typing in the search box filters after this pause
+DIAGNOSTICS_REFRESH_MS = 1000
+DAILY_DEFAULT_DAYS = 90 # Daily Analytics starts on the last this-many days
+
+# --- Background Jobs ---
+# File I/O and aggregation run on a small thread pool. Finished jobs are
+# handed back through a queue that the Tk thread drains with after(), so
+# callbacks (and every widget call) still happen on the mainloop.
+class BackgroundJobs:
+    def __init__(self, master, workers=IO_WORKERS, on_busy_change=None):
+        self.master = master
+        self.on_busy_change = on_busy_change
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='expense-io')
+        self._finished = queue.Queue()
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        self._pending += 1
+        if self._pending == 1 and self.on_busy_change:
+            self.on_busy_change(True)
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._finished.put((f, on_done, on_error)))
+        if not self._polling:
+            self._polling = True
+            self.master.after(JOB_POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
         try:
-            expense_date = datetime.strptime(expense['Date'], '%Y-%m-%d')
-            if expense_date.year == int(year) and expense_date.month == int(month):
-                total_monthly_expense += float(expense['Amount'])
-        except (ValueError, KeyError):
-            continue
-    return total_monthly_expense
-
-def get_monthly_totals_for_graph():
-    monthly_totals = {}
-    all_expenses = get_all_expenses()
-    for expense in all_expenses:
+            while True:
+                try:
+                    future, on_done, on_error = self._finished.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                self._finish(future, on_done, on_error)
+        finally:
+            # Rescheduled even if a callback raised, or later jobs would
+            # never be picked up.
+            if self._pending:
+                self.master.after(JOB_POLL_MS, self._poll)
+            else:
+                self._polling = False
+                if self.on_busy_change:
+                    self.on_busy_change(False)
+
+    def _finish(self, future, on_done, on_error):
+        # One job's callback; an exception in it is reported, not propagated.
         try:
-            expense_date = datetime.strptime(expense['Date'], '%Y-%m-%d')
-            month_key = expense_date.strftime('%Y-%m')
-            amount = float(expense['Amount'])
-            monthly_totals[month_key] = monthly_totals.get(month_key, 0) + amount
-        except (ValueError, KeyError):
-            continue
-    return dict(sorted(monthly_totals.items()))
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    messagebox.showerror("Error", f"An error occurred: {error}")
+            elif on_done:
+                on_done(future.result())
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+def load_view_data(parts, year, month, list_query=None, daily_range=None):
+    # One shared load for every view that asked for a refresh. list_query
+    # holds the View/Manage filters and sort, passed to search_expenses();
+    # daily_range the Daily Analytics (from, to) dates.
+    data = {}
+    if 'tree' in parts:
+        data['expenses'] = search_expenses(**list_query) if list_query else get_all_expenses()
+    if 'summary' in parts:
+        data['summary'] = (year, month, get_monthly_summary(year, month))
+    if 'graph' in parts:
+        data['graph'] = get_monthly_totals_for_graph()
+    if 'daily' in parts:
+        data['daily'] = get_daily_report(*daily_range)
+    return data
+
+def _format_bytes(count):
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+def print_startup_report():
+    print("Startup timings:")
+    for phase in ('import', 'build', 'load', 'reports_tab'):
+        if phase in STARTUP_TIMINGS:
+            print(f"  {phase:<12} {STARTUP_TIMINGS[phase] * 1000:8.1f} ms")
 
 # --- Tkinter GUI Application ---
 class ExpenseTrackerApp:
@@ -157,6 +164,21 @@ class ExpenseTrackerApp:
 
         master.config(bg=self.bg_color)
 
+        # --- Status Bar (busy indicator, last operation timing) ---
+        status_frame = tk.Frame(master, bg=self.bg_color)
+        status_frame.pack(side='bottom', fill='x', padx=15, pady=(0, 10))
+        self.status_label = ttk.Label(status_frame, text="Ready", background=self.bg_color)
+        self.status_label.pack(side='left')
+        ttk.Button(status_frame, text="Diagnostics", command=self.open_diagnostics).pack(side='right')
+        self.metrics_label = ttk.Label(status_frame, text="", background=self.bg_color, foreground='#777777')
+        self.metrics_label.pack(side='right', padx=10)
+        self.busy_bar = ttk.Progressbar(status_frame, mode='indeterminate', length=160)
+        self.diagnostics_window = None
+
+        self.jobs = BackgroundJobs(master, on_busy_change=self._set_busy)
+        self._refresh_parts = set()
+        self._refresh_running = False
+
         # --- Notebook (Tabs) ---
         self.notebook = ttk.Notebook(master, style='TNotebook')
         self.notebook.pack(expand=True, fill='both', padx=15, pady=15)
@@ -175,10 +197,13 @@ class ExpenseTrackerApp:
         # --- Initialize Tabs ---
         self._setup_add_expense_tab()
         self._setup_view_expenses_tab()
-        self._setup_reports_tab()
+        # The Reports tab (and its matplotlib figure) is built on first visit.
+        self._reports_built = False
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
 
-        self.load_expenses()
-        self.update_summary_display()
+        # Let the window paint before the first (background) load starts.
+        self._startup_mark = None
+        master.after_idle(self._start_first_load)
 
     def _setup_add_expense_tab(self):
         self.add_expense_tab.columnconfigure(1, weight=1)
@@ -205,14 +230,37 @@ class ExpenseTrackerApp:
         self.add_button.grid(row=3, column=0, columnspan=2, pady=20)
 
     def _setup_view_expenses_tab(self):
+        ### Filter bar: description search plus date and amount ranges
+        filter_frame = tk.Frame(self.view_expenses_tab, bg=self.bg_color)
+        filter_frame.pack(side='top', fill='x', padx=15, pady=(10, 0))
+        ttk.Label(filter_frame, text="Search:", font=self.heading_font).pack(side='left', padx=(0, 5))
+        self.search_entry = ttk.Entry(filter_frame, width=20, font=self.base_font)
+        self.search_entry.pack(side='left', padx=5)
+        self.search_entry.bind('<KeyRelease>', self._on_search_typed)
+        self.filter_entries = {}
+        for key, label, width in (('start_date', "From:", 11), ('end_date', "To:", 11),
+                                  ('min_amount', "Min ₹:", 8), ('max_amount', "Max ₹:", 8)):
+            ttk.Label(filter_frame, text=label, font=self.heading_font).pack(side='left', padx=(10, 5))
+            entry = ttk.Entry(filter_frame, width=width, font=self.base_font)
+            entry.pack(side='left')
+            entry.bind('<Return>', lambda event: self.apply_filters())
+            self.filter_entries[key] = entry
+        self.search_entry.bind('<Return>', lambda event: self.apply_filters())
+        ttk.Button(filter_frame, text="Filter", command=self.apply_filters).pack(side='left', padx=(10, 5))
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).pack(side='left')
+        self.filter_status_label = ttk.Label(filter_frame, text="", background=self.bg_color)
+        self.filter_status_label.pack(side='left', padx=10)
+        self._list_filters = {}
+        self._list_sort = None  # (column, descending) once a heading was clicked
+        self._search_after = None
+
         tree_frame = tk.Frame(self.view_expenses_tab, bg=self.bg_color)
         tree_frame.pack(side='top', fill='both', expand=True, padx=15, pady=10)
 
-        display_headers = [h for h in HEADERS if h != 'ID']
-        self.tree = ttk.Treeview(tree_frame, columns=display_headers, show='headings')
+        self.tree = ttk.Treeview(tree_frame, columns=DISPLAY_HEADERS, show='headings')
 
-        for col in display_headers:
-            self.tree.heading(col, text=col)
+        for col in DISPLAY_HEADERS:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_list_by(c))
             if col == 'Date':
                 self.tree.column(col, width=120, anchor='center')
             elif col == 'Amount':
@@ -220,11 +268,21 @@ class ExpenseTrackerApp:
             else:
                 self.tree.column(col, width=250, anchor='w')
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        ### The scrollbar talks to our own handlers so it can span the whole
+        ### list even when only a window of rows lives in the Treeview.
+        self.tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_list_scrollbar)
+        self.tree.configure(yscrollcommand=self._on_tree_yview)
 
         self.tree.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        self.tree_scrollbar.pack(side='right', fill='y')
+
+        self._display_rows = []     # Every expense row (lazy views), in ledger order
+        self._shown_ids = []        # IDs currently inserted in the Treeview, in order
+        self._shown_values = {}
+        self._virtual = False
+        self._win_start = 0
+        self._list_top = 0.0
+        self._visible_rows = 20
 
         button_frame = tk.Frame(self.view_expenses_tab, bg=self.bg_color, pady=10)
         button_frame.pack(side='top', fill='x', padx=15)
@@ -236,6 +294,9 @@ class ExpenseTrackerApp:
         self.delete_button = ttk.Button(button_frame, text="Delete Selected", command=self.delete_expense)
         self.delete_button.pack(side='left', padx=5, pady=8)
 
+        self.import_button = ttk.Button(button_frame, text="Import CSV...", command=self.import_statement)
+        self.import_button.pack(side='right', padx=5, pady=8)
+
         summary_frame = tk.Frame(self.view_expenses_tab, bg=self.bg_color, bd=2, relief='groove', padx=15, pady=15)
         summary_frame.pack(pady=15, fill='x', padx=15)
         summary_frame.columnconfigure(1, weight=1)
@@ -271,21 +332,80 @@ class ExpenseTrackerApp:
         ### Use grid for better layout in Reports tab
         reports_frame.columnconfigure(0, weight=1)
         reports_frame.rowconfigure(0, weight=0) # Export area
-        reports_frame.rowconfigure(1, weight=1) # Graph area
+        reports_frame.rowconfigure(1, weight=0) # Daily analytics area
+        reports_frame.rowconfigure(2, weight=1) # Graph area
 
-        ### Export to Excel Section
+        ### Export Section
         export_frame = tk.Frame(reports_frame, bd=2, relief='groove', padx=10, pady=10, bg=self.bg_color)
         export_frame.grid(row=0, column=0, sticky='ew', pady=10, padx=10)
         ttk.Label(export_frame, text="Export Data", font=self.title_font, foreground=self.secondary_color).pack(pady=5)
-        export_button = ttk.Button(export_frame, text="Export All to Excel", command=self.export_to_excel)
-        export_button.pack(pady=8)
+
+        options_frame = tk.Frame(export_frame, bg=self.bg_color)
+        options_frame.pack(pady=5)
+        ttk.Label(options_frame, text="Format:", font=self.heading_font).grid(row=0, column=0, sticky='w', padx=5)
+        self.export_format_var = tk.StringVar(self.master, value='xlsx')
+        ttk.OptionMenu(options_frame, self.export_format_var, 'xlsx', *EXPORT_WRITERS).grid(row=0, column=1, sticky='w', padx=5)
+        ttk.Label(options_frame, text="From (YYYY-MM-DD):", font=self.heading_font).grid(row=0, column=2, sticky='w', padx=5)
+        self.export_from_entry = ttk.Entry(options_frame, width=12, font=self.base_font)
+        self.export_from_entry.grid(row=0, column=3, padx=5)
+        ttk.Label(options_frame, text="To:", font=self.heading_font).grid(row=0, column=4, sticky='w', padx=5)
+        self.export_to_entry = ttk.Entry(options_frame, width=12, font=self.base_font)
+        self.export_to_entry.grid(row=0, column=5, padx=5)
+        ttk.Label(options_frame, text="or Month (YYYY-MM):", font=self.heading_font).grid(row=0, column=6, sticky='w', padx=5)
+        self.export_month_entry = ttk.Entry(options_frame, width=9, font=self.base_font)
+        self.export_month_entry.grid(row=0, column=7, padx=5)
+
+        action_frame = tk.Frame(export_frame, bg=self.bg_color)
+        action_frame.pack(pady=5)
+        self.export_button = ttk.Button(action_frame, text="Export", command=self.export_data)
+        self.export_button.pack(side='left', padx=5)
+        self.export_cancel_button = ttk.Button(action_frame, text="Cancel", command=self.cancel_export, state='disabled')
+        self.export_cancel_button.pack(side='left', padx=5)
+        self.export_progress = ttk.Progressbar(action_frame, mode='determinate', length=250, maximum=1)
+        self.export_progress.pack(side='left', padx=10)
+        self.export_status_label = ttk.Label(action_frame, text="")
+        self.export_status_label.pack(side='left', padx=5)
+        self._export_cancel = None
+        self._export_state = (0, 0)
+
+        ### Daily Analytics Section
+        daily_frame = tk.Frame(reports_frame, bd=2, relief='groove', padx=10, pady=10, bg=self.bg_color)
+        daily_frame.grid(row=1, column=0, sticky='ew', pady=10, padx=10)
+        ttk.Label(daily_frame, text="Daily Analytics", font=self.title_font, foreground=self.secondary_color).pack(pady=5)
+
+        range_frame = tk.Frame(daily_frame, bg=self.bg_color)
+        range_frame.pack(pady=5)
+        today = datetime.now().date()
+        ttk.Label(range_frame, text="From (YYYY-MM-DD):", font=self.heading_font).grid(row=0, column=0, sticky='w', padx=5)
+        self.daily_from_entry = ttk.Entry(range_frame, width=12, font=self.base_font)
+        self.daily_from_entry.insert(0, (today - timedelta(days=DAILY_DEFAULT_DAYS - 1)).isoformat())
+        self.daily_from_entry.grid(row=0, column=1, padx=5)
+        ttk.Label(range_frame, text="To:", font=self.heading_font).grid(row=0, column=2, sticky='w', padx=5)
+        self.daily_to_entry = ttk.Entry(range_frame, width=12, font=self.base_font)
+        self.daily_to_entry.insert(0, today.isoformat())
+        self.daily_to_entry.grid(row=0, column=3, padx=5)
+        ttk.Button(range_frame, text="Show", command=self.show_daily_analytics).grid(row=0, column=4, padx=5)
+
+        self.daily_summary_label = ttk.Label(daily_frame, text="", font=self.base_font, justify='left')
+        self.daily_summary_label.pack(pady=5, anchor='w')
+        weekday_frame = tk.Frame(daily_frame, bg=self.bg_color)
+        weekday_frame.pack(pady=5)
+        self.daily_weekday_labels = []
+        for column, name in enumerate(('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')):
+            ttk.Label(weekday_frame, text=name, font=self.heading_font).grid(row=0, column=column, padx=12)
+            label = ttk.Label(weekday_frame, text="₹0.00", font=self.base_font)
+            label.grid(row=1, column=column, padx=12)
+            self.daily_weekday_labels.append(label)
 
         ### Graph View Section
         graph_container = tk.Frame(reports_frame, bd=2, relief='groove', padx=10, pady=10, bg='white') # White background for the graph area
-        graph_container.grid(row=1, column=0, sticky='nsew', pady=10, padx=10)
+        graph_container.grid(row=2, column=0, sticky='nsew', pady=10, padx=10)
         ttk.Label(graph_container, text="Monthly Expense Trend", font=self.title_font, foreground=self.secondary_color).pack(pady=5)
 
-        self.fig, self.ax = plt.subplots(figsize=(8, 4), dpi=100)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        self.fig = Figure(figsize=(8, 4), dpi=100)
+        self.ax = self.fig.add_subplot()
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_container)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -293,9 +413,22 @@ class ExpenseTrackerApp:
         toolbar = NavigationToolbar2Tk(self.canvas, graph_container)
         toolbar.update()
         self.canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self._reports_built = True
+
+        ### Chart artists are created once and updated in place by draw_monthly_graph
+        self._graph_bars = []
+        self._graph_signature = None
+        self._graph_mode = None
+        self._graph_empty_text = self.ax.text(0.5, 0.5, "No data to display graph", ha='center', va='center',
+                                              transform=self.ax.transAxes, fontsize=12, visible=False)
+        self.ax.set_ylabel("Total Amount (₹)", fontsize=10)
+        self.ax.tick_params(axis='x', rotation=45, labelsize=9)
+        self.ax.tick_params(axis='y', labelsize=9)
 
-        self.draw_monthly_graph()
-        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
+
+    def _start_first_load(self):
+        self._startup_mark = time.perf_counter()
+        self.request_refresh()
 
     def add_expense(self):
         date = self.date_entry.get()
@@ -306,41 +439,308 @@ class ExpenseTrackerApp:
             messagebox.showerror("Input Error", "All fields are required!")
             return
 
-        success, msg = add_expense_to_csv(date, description, amount)
+        self.add_button.state(['disabled'])
+        self.jobs.submit(add_expense_to_csv, date, description, amount, on_done=self._on_expense_added,
+                         on_error=lambda e: (self.add_button.state(['!disabled']), messagebox.showerror("Error", f"An error occurred: {e}")))
+
+    def _on_expense_added(self, result):
+        success, msg = result
+        self.add_button.state(['!disabled'])
         if success:
             messagebox.showinfo("Success", msg, icon='info') ### Added icon
             self.clear_add_entries()
-            self.load_expenses()
-            self.update_summary_display()
-            self.draw_monthly_graph()
+            self.request_refresh()
             self.notebook.select(self.view_expenses_tab)
         else:
             messagebox.showerror("Error", msg, icon='error') ### Added icon
 
+    def _set_busy(self, busy):
+        if busy:
+            self.status_label.config(text="Working...")
+            self.busy_bar.pack(side='right')
+            self.busy_bar.start(10)
+            self.master.config(cursor='watch')
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.status_label.config(text="Ready")
+            self.master.config(cursor='')
+            self._update_metrics_status()
+
+    # --- Diagnostics ---
+    def _update_metrics_status(self):
+        last = metrics.last_call()
+        if last is not None:
+            name, seconds = last
+            self.metrics_label.config(text=f"Last: {name} {seconds * 1000:.1f} ms")
+
+    def open_diagnostics(self):
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        window = self.diagnostics_window = tk.Toplevel(self.master)
+        window.title("Diagnostics")
+        window.geometry("900x400")
+        window.config(bg=self.bg_color)
+        columns = ('Operation', 'Calls', 'Errors', 'Avg ms', 'p95 ms', 'Max ms', 'Rows', 'Read', 'Written')
+        tree_frame = tk.Frame(window, bg=self.bg_color)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.diagnostics_tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+        for col in columns:
+            self.diagnostics_tree.heading(col, text=col)
+            self.diagnostics_tree.column(col, width=220 if col == 'Operation' else 80, anchor='w' if col == 'Operation' else 'e')
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.diagnostics_tree.yview)
+        self.diagnostics_tree.configure(yscrollcommand=scrollbar.set)
+        self.diagnostics_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        button_frame = tk.Frame(window, bg=self.bg_color)
+        button_frame.pack(fill='x', padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="Save JSON...", command=self.save_metrics).pack(side='left')
+        ttk.Button(button_frame, text="Reset", command=lambda: (metrics.reset(), self._refresh_diagnostics(reschedule=False))).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side='right')
+        self._refresh_diagnostics()
+
+    def _refresh_diagnostics(self, reschedule=True):
+        # Redrawn every DIAGNOSTICS_REFRESH_MS while the window is open.
+        if self.diagnostics_window is None or not self.diagnostics_window.winfo_exists():
+            return
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        for name, stats in metrics.snapshot().items():
+            self.diagnostics_tree.insert('', 'end', values=(
+                name, stats['calls'], stats['errors'], f"{stats['avg_ms']:.2f}", stats['p95_ms'], f"{stats['max_ms']:.2f}",
+                stats['rows'], _format_bytes(stats['bytes_read']), _format_bytes(stats['bytes_written'])))
+        if reschedule:
+            self.diagnostics_window.after(DIAGNOSTICS_REFRESH_MS, self._refresh_diagnostics)
+
+    def save_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[("JSON", "*.json")],
+                                            title="Save metrics", parent=self.diagnostics_window)
+        if path:
+            try:
+                metrics.dump_json(path)
+            except OSError as e:
+                messagebox.showerror("Save Error", f"Could not save metrics: {e}", parent=self.diagnostics_window)
+
+    def request_refresh(self, tree=True, summary=True, graph=True, daily=None):
+        # Requests made while a load is running are merged into a single
+        # follow-up load instead of each triggering its own read. The Daily
+        # Analytics panel (daily) is refreshed with the graph unless asked
+        # for separately; both exist only once the Reports tab is built.
+        daily = (graph if daily is None else daily) and self._reports_built
+        graph = graph and self._reports_built
+        self._refresh_parts |= {part for part, wanted in (('tree', tree), ('summary', summary), ('graph', graph),
+                                                          ('daily', daily)) if wanted}
+        if not self._refresh_running:
+            self._start_refresh()
+
+    def _start_refresh(self):
+        parts, self._refresh_parts = self._refresh_parts, set()
+        try:
+            year = int(self.summary_year_var.get())
+            month = int(self.summary_month_var.get())
+        except ValueError:
+            self.summary_label.config(text="Invalid selection")
+            parts.discard('summary')
+            year = month = None
+        daily_range = None
+        if 'daily' in parts:
+            daily_range = self._daily_range()
+            if daily_range is None:
+                parts.discard('daily')
+        if not parts:
+            return
+        self._refresh_running = True
+        self.jobs.submit(load_view_data, parts, year, month, self._list_query(), daily_range,
+                         on_done=self._apply_view_data, on_error=self._on_refresh_error)
+
+    @metrics.timed('gui.refresh')
+    def _apply_view_data(self, data):
+        self._refresh_running = False
+        if 'expenses' in data:
+            self.load_expenses(data['expenses'])
+            filtered = bool(self._list_filters)
+            self.filter_status_label.config(text=f"{len(data['expenses'])} matching" if filtered else "",
+                                            foreground=self.text_color)
+        if 'summary' in data:
+            self.show_summary(*data['summary'])
+        if 'graph' in data:
+            self.draw_monthly_graph(data['graph'])
+        if 'daily' in data:
+            self.show_daily_report(data['daily'])
+        if self._startup_mark is not None:
+            STARTUP_TIMINGS['load'] = time.perf_counter() - self._startup_mark
+            self._startup_mark = None
+            if STARTUP_REPORT:
+                print_startup_report()
+        if self._refresh_parts:
+            self._start_refresh()
+
+    def _on_refresh_error(self, error):
+        self._refresh_running = False
+        self.summary_label.config(text=f"Error: {error}")
+        if isinstance(error, CsvHeaderError):
+            messagebox.showwarning("CSV Error", str(error))
+        elif isinstance(error, StorageError):
+            messagebox.showerror("File Error", str(error))
+        if self._refresh_parts:
+            self._start_refresh()
+
+    def _list_query(self):
+        query = dict(self._list_filters)
+        if self._list_sort:
+            query['sort'], query['descending'] = self._list_sort
+        return query
+
+    def _read_filters(self):
+        filters = {}
+        text = self.search_entry.get().strip()
+        if text:
+            filters['text'] = text
+        for key, entry in self.filter_entries.items():
+            value = entry.get().strip()
+            if not value:
+                continue
+            if key.endswith('_date'):
+                datetime.strptime(value, '%Y-%m-%d')
+                filters[key] = value
+            else:
+                filters[key] = float(value)
+        return filters
+
+    def apply_filters(self):
+        if self._search_after is not None:
+            self.master.after_cancel(self._search_after)
+            self._search_after = None
+        try:
+            filters = self._read_filters()
+        except ValueError:
+            self.filter_status_label.config(text="Use YYYY-MM-DD dates and numeric amounts", foreground=self.error_color)
+            return
+        if filters != self._list_filters:
+            self._list_filters = filters
+            self._list_top = 0.0
+        self.request_refresh(tree=True, summary=False, graph=False)
+
+    def clear_filters(self):
+        self.search_entry.delete(0, tk.END)
+        for entry in self.filter_entries.values():
+            entry.delete(0, tk.END)
+        self.apply_filters()
+
+    def _on_search_typed(self, event):
+        if self._search_after is not None:
+            self.master.after_cancel(self._search_after)
+        self._search_after = self.master.after(SEARCH_DELAY_MS, self.apply_filters)
+
+    def sort_list_by(self, column):
+        # Clicking a heading sorts by it; clicking it again flips the order.
+        descending = self._list_sort == (column, False)
+        self._list_sort = (column, descending)
+        for col in DISPLAY_HEADERS:
+            arrow = (' ▼' if descending else ' ▲') if col == column else ''
+            self.tree.heading(col, text=col + arrow)
+        self._list_top = 0.0
+        self.request_refresh(tree=True, summary=False, graph=False)
+
     def clear_add_entries(self):
         self.date_entry.delete(0, tk.END)
         self.date_entry.insert(0, datetime.now().strftime('%Y-%m-%d'))
         self.description_entry.delete(0, tk.END)
         self.amount_entry.delete(0, tk.END)
 
-    def load_expenses(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        expenses = get_all_expenses()
-        for expense in expenses:
-            display_values = [expense.get(h, '') for h in HEADERS if h != 'ID']
-            self.tree.insert('', tk.END, iid=expense.get('ID'), values=display_values)
+    @metrics.timed('gui.load_expenses')
+    def load_expenses(self, expenses=None):
+        if expenses is None:
+            expenses = get_all_expenses()
+        metrics.record('gui.load_expenses', rows=len(expenses))
+        # Rows are decoded to Treeview values only once they enter the window.
+        self._display_rows = expenses
+        self._virtual = len(expenses) > VIRTUAL_LIST_THRESHOLD
+        if self._virtual:
+            self._scroll_list_to(self._list_top)
+        else:
+            self._win_start = 0
+            self._sync_tree_window(0, len(expenses))
+
+    def _sync_tree_window(self, start, end):
+        # Diff the rows that should be in the Treeview against the ones that
+        # are, so a refresh costs widget calls only for rows that changed.
+        window = {row['ID']: tuple(row.get(h, '') for h in DISPLAY_HEADERS) for row in self._display_rows[start:end]}
+        desired = list(window)
+        desired_set = set(desired)
+        removed = [iid for iid in self._shown_ids if iid not in desired_set]
+        if removed:
+            self.tree.delete(*removed)
+        surviving = [iid for iid in self._shown_ids if iid in desired_set]
+        moved = set()
+        j = 0
+        for index, iid in enumerate(desired):
+            values = window[iid]
+            if iid not in self._shown_values:
+                self.tree.insert('', index, iid=iid, values=values)
+                continue
+            while j < len(surviving) and surviving[j] in moved:
+                j += 1
+            if j < len(surviving) and surviving[j] == iid:
+                j += 1
+            else:
+                self.tree.move(iid, '', index)
+                moved.add(iid)
+            if self._shown_values[iid] != values:
+                self.tree.item(iid, values=values)
+        self._shown_ids = desired
+        self._shown_values = window
+
+    def _scroll_list_to(self, top):
+        total = len(self._display_rows)
+        top = max(0.0, min(float(top), total - self._visible_rows))
+        start = max(0, int(top) - (VIRTUAL_WINDOW_ROWS - self._visible_rows) // 2)
+        end = min(total, start + VIRTUAL_WINDOW_ROWS)
+        start = max(0, end - VIRTUAL_WINDOW_ROWS)
+        self._win_start = start
+        self._list_top = top
+        self._sync_tree_window(start, end)
+        if end > start:
+            self.tree.yview_moveto((top - start) / (end - start))
+
+    def _on_tree_yview(self, first, last):
+        first, last = float(first), float(last)
+        if not self._virtual:
+            self.tree_scrollbar.set(first, last)
+            return
+        shown = len(self._shown_ids) or 1
+        total = len(self._display_rows) or 1
+        top = self._win_start + first * shown
+        self._visible_rows = max(1, round((last - first) * shown))
+        self._list_top = top
+        self.tree_scrollbar.set(top / total, min(1.0, (top + self._visible_rows) / total))
+        win_end = self._win_start + len(self._shown_ids)
+        near_start = self._win_start > 0 and top - self._win_start < VIRTUAL_MARGIN_ROWS
+        near_end = win_end < len(self._display_rows) and win_end - (top + self._visible_rows) < VIRTUAL_MARGIN_ROWS
+        if near_start or near_end:
+            self._scroll_list_to(top)
+
+    def _on_list_scrollbar(self, action, amount, unit=None):
+        if not self._virtual:
+            self.tree.yview(action, amount, *([unit] if unit else []))
+            return
+        if action == 'moveto':
+            top = float(amount) * len(self._display_rows)
+        else:
+            step = self._visible_rows if unit == 'pages' else 1
+            top = self._list_top + int(amount) * step
+        self._scroll_list_to(top)
 
+    @metrics.timed('gui.update_summary_display')
     def update_summary_display(self, *args):
+        self.request_refresh(tree=False, summary=True, graph=False)
+
+    @metrics.timed('gui.show_summary')
+    def show_summary(self, year, month, total):
         try:
-            year = int(self.summary_year_var.get())
-            month = int(self.summary_month_var.get())
-            total = get_monthly_summary(year, month)
             self.summary_label.config(text=f"Total for {datetime(year, month, 1).strftime('%B %Y')}: ₹{total:.2f}")
         except ValueError:
             self.summary_label.config(text="Invalid selection")
-        except Exception as e:
-            self.summary_label.config(text=f"Error: {e}")
 
     def edit_expense(self):
         selected_item = self.tree.focus()
@@ -349,12 +749,11 @@ class ExpenseTrackerApp:
             return
 
         expense_id_to_edit = selected_item
-        expenses = get_all_expenses()
+        # The row is already loaded for the list; looking it up in the store
+        # would block the Tk thread on a remote or partitioned backend.
         selected_expense_data = None
-        for exp in expenses:
-            if exp.get('ID') == expense_id_to_edit:
-                selected_expense_data = exp
-                break
+        if selected_item in self._shown_values:
+            selected_expense_data = self._display_rows[self._win_start + self._shown_ids.index(selected_item)]
 
         if not selected_expense_data:
             messagebox.showerror("Error", "Selected expense data not found.")
@@ -381,20 +780,24 @@ class ExpenseTrackerApp:
         edit_amount_entry.grid(row=2, column=1, padx=10, pady=8, sticky='ew')
         edit_amount_entry.insert(0, selected_expense_data.get('Amount', ''))
 
-        def save_changes():
-            new_date = edit_date_entry.get()
-            new_description = edit_description_entry.get()
-            new_amount = edit_amount_entry.get()
-            success, msg = update_expense_in_csv(expense_id_to_edit, new_date, new_description, new_amount)
+        def on_saved(result):
+            success, msg = result
+            save_button.state(['!disabled'])
             if success:
                 messagebox.showinfo("Success", msg, icon='info')
-                self.load_expenses()
-                self.update_summary_display()
-                self.draw_monthly_graph()
+                self.request_refresh()
                 edit_window.destroy()
             else:
                 messagebox.showerror("Error", msg, icon='error')
 
+        def save_changes():
+            new_date = edit_date_entry.get()
+            new_description = edit_description_entry.get()
+            new_amount = edit_amount_entry.get()
+            save_button.state(['disabled'])
+            self.jobs.submit(update_expense_in_csv, expense_id_to_edit, new_date, new_description, new_amount,
+                             on_done=on_saved, on_error=lambda e: on_saved((False, f"Error updating expense: {e}")))
+
         save_button = ttk.Button(edit_window, text="Save Changes", command=save_changes, style='Primary.TButton')
         save_button.grid(row=3, column=0, columnspan=2, pady=15)
 
@@ -410,63 +813,253 @@ class ExpenseTrackerApp:
 
         confirm = messagebox.askyesno("Confirm Deletion", confirmation_text)
         if confirm:
-            success, msg = delete_expense_from_csv(expense_id_to_delete)
-            if success:
-                messagebox.showinfo("Success", msg, icon='info')
-                self.load_expenses()
-                self.update_summary_display()
-                self.draw_monthly_graph()
-            else:
-                messagebox.showerror("Error", msg, icon='error')
-
-    def export_to_excel(self):
-        expenses = get_all_expenses()
-        if not expenses:
+            self.jobs.submit(delete_expense_from_csv, expense_id_to_delete, on_done=self._on_expense_deleted)
+
+    def import_statement(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Import Expenses from CSV"
+        )
+        if not file_path:
+            return
+        self.import_button.state(['disabled'])
+        self.jobs.submit(import_expenses, file_path, on_done=self._on_import_done, on_error=self._on_import_error)
+
+    def _on_import_done(self, report):
+        self.import_button.state(['!disabled'])
+        lines = [f"Imported {report['imported']} expenses.",
+                 f"Skipped {len(report['duplicates'])} duplicates of existing expenses.",
+                 f"{len(report['errors'])} rows had errors."]
+        lines += [f"Line {e['line']}: {e['error']}" for e in report['errors'][:10]]
+        if len(report['errors']) > 10:
+            lines.append("...")
+        messagebox.showinfo("Import Complete", "\n".join(lines))
+        if report['imported']:
+            self.request_refresh()
+
+    def _on_import_error(self, error):
+        self.import_button.state(['!disabled'])
+        messagebox.showerror("Import Error", f"Failed to import: {error}")
+
+    def _on_expense_deleted(self, result):
+        success, msg = result
+        if success:
+            messagebox.showinfo("Success", msg, icon='info')
+            self.request_refresh()
+        else:
+            messagebox.showerror("Error", msg, icon='error')
+
+    def _export_filters(self):
+        start = self.export_from_entry.get().strip() or None
+        end = self.export_to_entry.get().strip() or None
+        month = self.export_month_entry.get().strip()
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+        if month:
+            parsed = datetime.strptime(month, '%Y-%m')
+            return None, None, (parsed.year, parsed.month)
+        return start, end, None
+
+    def export_data(self):
+        # The list may be showing a search with no hits; the export covers
+        # the whole ledger (or its own date filters), so ask the store.
+        if not len(get_store()):
             messagebox.showwarning("No Data", "No expenses to export.")
             return
         try:
-            df = pd.DataFrame(expenses)
-            df_display = df[[col for col in HEADERS if col != 'ID']]
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                title="Save Expenses as Excel"
-            )
-            if file_path:
-                df_display.to_excel(file_path, index=False)
-                messagebox.showinfo("Export Success", f"Expenses exported to:\n{file_path}")
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export to Excel: {e}")
-
-    def draw_monthly_graph(self):
-        monthly_data = get_monthly_totals_for_graph()
-        months = list(monthly_data.keys())
+            start, end, month = self._export_filters()
+        except ValueError:
+            messagebox.showerror("Input Error", "Please use YYYY-MM-DD for the date range and YYYY-MM for the month.")
+            return
+        fmt = self.export_format_var.get()
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=f".{fmt}",
+            filetypes=[(f"{fmt.upper()} files", f"*.{fmt}"), ("All files", "*.*")],
+            title="Export Expenses"
+        )
+        if not file_path:
+            return
+        self._export_cancel = threading.Event()
+        self._export_state = (0, 0)
+        self.export_button.state(['disabled'])
+        self.export_cancel_button.state(['!disabled'])
+        self.jobs.submit(export_expenses, file_path, fmt, start, end, month, EXPORT_COLUMNS, EXPORT_CHUNK_ROWS,
+                         self._on_export_progress, self._export_cancel,
+                         on_done=lambda rows: self._finish_export(f"Exported {rows} expenses to:\n{file_path}"),
+                         on_error=self._on_export_error)
+        self._poll_export_progress()
+
+    def _on_export_progress(self, done, total):
+        # Called on the worker thread; the Tk thread picks it up in _poll_export_progress.
+        self._export_state = (done, total)
+
+    def _poll_export_progress(self):
+        if self._export_cancel is None:
+            return
+        done, total = self._export_state
+        self.export_progress.config(value=done / total if total else 0)
+        self.export_status_label.config(text=f"{done}/{total} rows")
+        self.master.after(100, self._poll_export_progress)
+
+    def _reset_export(self):
+        self._export_cancel = None
+        self.export_button.state(['!disabled'])
+        self.export_cancel_button.state(['disabled'])
+        self.export_progress.config(value=0)
+        self.export_status_label.config(text="")
+
+    def _finish_export(self, message):
+        self._reset_export()
+        messagebox.showinfo("Export Success", message)
+
+    def _on_export_error(self, error):
+        self._reset_export()
+        if isinstance(error, ExportCancelled):
+            messagebox.showinfo("Export Cancelled", "Export cancelled.")
+        else:
+            messagebox.showerror("Export Error", f"Failed to export: {error}")
+
+    def cancel_export(self):
+        if self._export_cancel is not None:
+            self._export_cancel.set()
+
+    @metrics.timed('gui.draw_monthly_graph')
+    def draw_monthly_graph(self, monthly_data=None):
+        if monthly_data is None:
+            monthly_data = get_monthly_totals_for_graph()
+        signature = hash(tuple(monthly_data.items()))
+        if signature == self._graph_signature:
+            return
+        self._graph_signature = signature
+
+        mode = 'month'
+        if len(monthly_data) > GRAPH_MAX_BARS:
+            mode = 'year'
+            yearly = {}
+            for month_key, total in monthly_data.items():
+                yearly[month_key[:4]] = yearly.get(month_key[:4], 0) + total
+            monthly_data = dict(list(yearly.items())[-GRAPH_MAX_BARS:])
+        labels = list(monthly_data.keys())
         totals = list(monthly_data.values())
 
-        self.ax.clear()
-
-        if not months:
-            self.ax.text(0.5, 0.5, "No data to display graph", ha='center', va='center', transform=self.ax.transAxes, fontsize=12)
-            self.canvas.draw_idle()
-            return
+        self._graph_empty_text.set_visible(not labels)
+        layout_changed = len(labels) != len(self._graph_bars) or mode != self._graph_mode
 
-        self.ax.bar(months, totals, color=self.primary_color)
-        self.ax.set_xlabel("Month", fontsize=10)
-        self.ax.set_ylabel("Total Amount (₹)", fontsize=10)
-        self.ax.set_title("Monthly Expense Overview", fontsize=12, fontweight='bold', color=self.secondary_color)
-        self.ax.tick_params(axis='x', rotation=45, labelsize=9)
-        self.ax.tick_params(axis='y', labelsize=9)
-        self.fig.tight_layout()
+        ### Reuse existing bars; only add or remove the difference
+        for bar, total in zip(self._graph_bars, totals):
+            bar.set_height(total)
+        if len(totals) > len(self._graph_bars):
+            start = len(self._graph_bars)
+            new_bars = self.ax.bar(range(start, len(totals)), totals[start:], color=self.primary_color)
+            self._graph_bars.extend(new_bars.patches)
+        else:
+            for bar in self._graph_bars[len(totals):]:
+                bar.remove()
+            del self._graph_bars[len(totals):]
+
+        step = max(1, math.ceil(len(labels) / GRAPH_MAX_LABELS))
+        self.ax.set_xticks(range(0, len(labels), step))
+        self.ax.set_xticklabels(labels[::step])
+        self.ax.set_xlim(-0.5, max(len(labels), 1) - 0.5)
+        ### Months with net refunds total below zero; keep their bars in view
+        low = min(0, min(totals)) * 1.05 if totals else 0
+        high = max(totals) * 1.05 if totals and max(totals) > 0 else 0
+        self.ax.set_ylim(low, high if high > low else low + 1)
+
+        if mode != self._graph_mode:
+            self._graph_mode = mode
+            self.ax.set_xlabel("Month" if mode == 'month' else "Year", fontsize=10)
+            self.ax.set_title("Monthly Expense Overview" if mode == 'month' else "Yearly Expense Overview",
+                              fontsize=12, fontweight='bold', color=self.secondary_color)
+        if layout_changed:
+            self.fig.tight_layout()
         self.canvas.draw_idle()
 
+    def show_daily_analytics(self):
+        self.request_refresh(tree=False, summary=False, graph=False, daily=True)
+
+    def _daily_range(self):
+        # (from, to) from the Daily Analytics entries, or None after showing why not.
+        start, end = self.daily_from_entry.get().strip(), self.daily_to_entry.get().strip()
+        try:
+            if datetime.strptime(start, '%Y-%m-%d') > datetime.strptime(end, '%Y-%m-%d'):
+                self.daily_summary_label.config(text="The From date must not be after the To date.", foreground=self.error_color)
+                return None
+        except ValueError:
+            self.daily_summary_label.config(text="Invalid date format. Please use YYYY-MM-DD.", foreground=self.error_color)
+            return None
+        return start, end
+
+    @metrics.timed('gui.show_daily_report')
+    def show_daily_report(self, report):
+        rolling = " / ".join(f"₹{window['average']:.2f}" for window in report['rolling'])
+        windows = " / ".join(str(window['days']) for window in report['rolling'])
+        previous = report['year_over_year']
+        if previous['change'] is None:
+            comparison = f"₹{previous['total']:.2f}"
+        else:
+            comparison = f"₹{previous['total']:.2f} ({previous['change']:+.1%} this year)"
+        lines = [
+            f"Total: ₹{report['total']:.2f} over {report['count']} expenses in {report['days']} days (₹{report['daily_average']:.2f} per day)",
+            f"Average per day, last {windows} days to {report['to']}: {rolling}",
+            f"Same period last year ({previous['from']} to {previous['to']}): {comparison}",
+        ]
+        self.daily_summary_label.config(text="\n".join(lines), foreground=self.text_color)
+        for label, weekday in zip(self.daily_weekday_labels, report['weekdays']):
+            label.config(text=f"₹{weekday['total']:.2f}")
+
     def _on_tab_change(self, event):
         selected_tab = self.notebook.tab(self.notebook.select(), "text")
         if selected_tab == "Analytics & Export":
-            self.draw_monthly_graph()
+            if not self._reports_built:
+                started = time.perf_counter()
+                self._setup_reports_tab()
+                STARTUP_TIMINGS['reports_tab'] = time.perf_counter() - started
+            self.request_refresh(tree=False, summary=False, graph=True)
 
 # --- Main Application Entry Point ---
 if __name__ == "__main__":
-    initialize_csv()
+    parser = argparse.ArgumentParser(description="Modern Expense Tracker")
+    parser.add_argument('--backend', choices=STORAGE_BACKENDS, default=tracker_config.STORAGE_BACKEND, help="Storage backend to use")
+    parser.add_argument('--migrate-to-sqlite', action='store_true', help=f"Copy {EXPENSE_FILE} into {DB_FILE} and exit")
+    parser.add_argument('--migrate-to-partitions', action='store_true',
+                        help=f"Split {EXPENSE_FILE} into one file per month under {PARTITION_DIR}/ and exit")
+    parser.add_argument('--server', metavar='URL',
+                        help="Use a running expense server (python -m expense_tracker serve) instead of local files")
+    parser.add_argument('--startup-report', action='store_true', help="Print how long imports, window build and first load took")
+    parser.add_argument('--metrics', metavar='FILE', help="Write per-operation timings and counters to FILE (JSON) on exit")
+    parser.add_argument('--profile', metavar='FILE', help="Profile the whole session and write the profile to FILE")
+    parser.add_argument('--profile-mode', choices=metrics.PROFILE_MODES, default='cprofile',
+                        help="cprofile (exact, main thread, slower) or sample (all threads, low overhead)")
+    args = parser.parse_args()
+    if args.migrate_to_sqlite:
+        from expense_tracker import migrate_csv_to_sqlite # Pulls in sqlite3, which plain startup never needs
+        migrated, skipped = migrate_csv_to_sqlite()
+        print(f"Migrated {migrated} expenses to {DB_FILE} ({len(skipped)} skipped)")
+        raise SystemExit(0)
+    if args.migrate_to_partitions:
+        converted, partitions = convert_csv_to_partitions()
+        print(f"Converted {converted} expenses into {partitions} monthly partitions under {PARTITION_DIR}/")
+        raise SystemExit(0)
+    if args.server:
+        args.backend = 'remote'
+    use_backend(args.backend, args.server)
+    STARTUP_REPORT = args.startup_report
+    if args.backend == 'csv':
+        try:
+            initialize_csv()
+        except CsvHeaderError as e:
+            messagebox.showwarning("CSV Warning", str(e))
+    profile = metrics.ProfileSession(args.profile, args.profile_mode).start() if args.profile else None
+    build_started = time.perf_counter()
     root = tk.Tk()
     app = ExpenseTrackerApp(root)
-    root.mainloop()
\ No newline at end of file
+    STARTUP_TIMINGS['build'] = time.perf_counter() - build_started
+    root.mainloop()
+    app.jobs.shutdown()
+    close_store()
+    if profile:
+        profile.stop()
+    if args.metrics:
+        metrics.dump_json(args.metrics)
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import expense_tracker as tracker
+from expense_tracker import config
+from expense_tracker.storage import read_ledger_csv
+
+# --- Configuration ---
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_SEED = 42
+DEFAULT_THRESHOLD = 0.25     # Fail when an operation is more than 25% slower than baseline
+NOISE_FLOOR_SECONDS = 0.0001 # Per-call times below this on both sides are never regressions
+RESULTS_FILE = 'bench_results.json'
+MUTATIONS_PER_RUN = 100
+SUMMARY_QUERIES_PER_RUN = 1000
+GRAPH_QUERIES_PER_RUN = 100
+SEARCH_QUERIES_PER_RUN = 100
+DAILY_QUERIES_PER_RUN = 1000
+
+# --- Synthetic Ledger ---
+DESCRIPTIONS = ['Groceries', 'Rent', 'Electricity bill', 'Mobile recharge', 'Fuel', 'Dining out',
+                'Movie tickets', 'Medicines', 'Train ticket', 'Gym membership', 'Books', 'Internet']
+
+def generate_ledger(path, rows, seed=DEFAULT_SEED, first_year=2015, last_year=2024):
+    # Same seed and size always produce byte-identical files.
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(tracker.HEADERS)
+        for _ in range(rows):
+            expense_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            date = f"{rng.randint(first_year, last_year):04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            amount = round(rng.uniform(10, 5000), 2)
+            writer.writerow([expense_id, date, rng.choice(DESCRIPTIONS), amount])
+
+# --- Measurement ---
+def measure(fn, calls=1):
+    # Wall time is measured without tracing; peak memory comes from a second,
+    # single traced call so tracemalloc's overhead does not skew the timing.
+    gc.collect()
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    seconds = (time.perf_counter() - started) / calls
+    gc.collect()
+    tracemalloc.start()
+    fn(calls)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': seconds, 'calls': calls, 'peak_bytes': peak}
+
+def reset_store():
+    tracker.close_store()
+
+def isolated(ledger, run, warm=True):
+    # Runs run() in a fresh temporary directory holding a copy of ledger, so
+    # no operation sees another's writes, journal, summary file or caches.
+    # With warm=True the store is loaded before run(), outside its timing.
+    workdir = tempfile.mkdtemp(prefix='expense-bench-')
+    previous_cwd = os.getcwd()
+    try:
+        shutil.copyfile(ledger, os.path.join(workdir, tracker.EXPENSE_FILE))
+        os.chdir(workdir)
+        reset_store()
+        if warm:
+            tracker.get_store()
+        return run()
+    finally:
+        reset_store()
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def copy_table():
+    # The store's rows in a table of their own, for timing index builds.
+    table = tracker.ExpenseTable()
+    for row in tracker.get_all_expenses():
+        table.append(row['ID'], row['Date'], row['Description'], row['Amount'])
+    return table
+
+def run_size(rows, seed, export_format):
+    rng = random.Random(seed)
+    results = {}
+    sourcedir = tempfile.mkdtemp(prefix=f'expense-bench-{rows}-')
+    try:
+        ledger = os.path.join(sourcedir, tracker.EXPENSE_FILE)
+        generate_ledger(ledger, rows, seed)
+        with open(ledger, 'r', newline='') as file:
+            ids = [entry[0] for entry in csv.reader(file)][1:]
+        update_targets = rng.sample(ids, MUTATIONS_PER_RUN + 1)
+        delete_targets = rng.sample(ids, MUTATIONS_PER_RUN + 1)
+        del ids
+
+        def load(_):
+            reset_store()
+            tracker.get_store()
+        results['load'] = isolated(ledger, lambda: measure(load), warm=False)
+
+        results['get_all_expenses'] = isolated(ledger, lambda: measure(lambda _: tracker.get_all_expenses()))
+
+        results['add_expense_to_csv'] = isolated(ledger, lambda: measure(
+            lambda i: tracker.add_expense_to_csv(f"2024-{i % 12 + 1:02d}-15", f"Bench add {i}", str(100 + i)),
+            MUTATIONS_PER_RUN))
+        results['update_expense_in_csv'] = isolated(ledger, lambda: measure(
+            lambda i: tracker.update_expense_in_csv(update_targets[i], '2023-06-30', f"Bench edit {i}", '250.00'),
+            MUTATIONS_PER_RUN))
+        results['delete_expense_from_csv'] = isolated(ledger, lambda: measure(
+            lambda i: tracker.delete_expense_from_csv(delete_targets[i]), MUTATIONS_PER_RUN))
+
+        results['get_monthly_summary'] = isolated(ledger, lambda: measure(
+            lambda i: tracker.get_monthly_summary(2015 + i % 10, i % 12 + 1), SUMMARY_QUERIES_PER_RUN))
+        results['get_monthly_totals_for_graph'] = isolated(ledger, lambda: measure(
+            lambda _: tracker.get_monthly_totals_for_graph(), GRAPH_QUERIES_PER_RUN))
+
+        def search_index_build():
+            table = copy_table()
+            return measure(lambda _: tracker.SearchIndex(table).rebuild())
+        results['search_index_build'] = isolated(ledger, search_index_build)
+        results['search_expenses'] = isolated(ledger, lambda: measure(
+            lambda i: tracker.search_expenses(DESCRIPTIONS[i % len(DESCRIPTIONS)][:4], start_date=f"{2015 + i % 10}-01-01",
+                                              end_date=f"{2015 + i % 10}-06-30", sort='Amount', limit=100),
+            SEARCH_QUERIES_PER_RUN))
+
+        def columnar_aggregates():
+            table = copy_table()
+            return measure(lambda _: (tracker.table_monthly_index(table), tracker.table_day_totals(table)))
+        results['columnar_aggregates'] = isolated(ledger, columnar_aggregates)
+
+        def ledger_read_and_aggregate(_):
+            # The ledger read column-wise straight into a table, then summed.
+            table = read_ledger_csv(ledger)
+            return tracker.table_monthly_index(table), tracker.table_day_totals(table)
+        results['ledger_read_and_aggregate'] = isolated(ledger, lambda: measure(ledger_read_and_aggregate), warm=False)
+
+        results['daily_index_build'] = isolated(ledger, lambda: measure(
+            lambda _: tracker.DailyIndex().rebuild(tracker.get_all_expenses())))
+
+        def daily_queries():
+            tracker.get_daily_report('2020-01-01', '2020-01-31') # Builds the store's own index outside the timed queries
+            return {
+                'get_date_range_total': measure(
+                    lambda i: tracker.get_date_range_total(f"{2015 + i % 10}-03-{i % 28 + 1:02d}", f"{2016 + i % 9}-09-30"),
+                    DAILY_QUERIES_PER_RUN),
+                'get_daily_report': measure(
+                    lambda i: tracker.get_daily_report(f"{2015 + i % 10}-01-01", f"{2015 + i % 10}-12-31"),
+                    DAILY_QUERIES_PER_RUN),
+            }
+        results.update(isolated(ledger, daily_queries))
+
+        results['export'] = isolated(ledger, lambda: measure(
+            lambda _: tracker.export_expenses(f'export.{export_format}', export_format)))
+    finally:
+        shutil.rmtree(sourcedir, ignore_errors=True)
+    return results
+
+# --- Baseline Comparison ---
+def compare(results, baseline, threshold):
+    regressions = []
+    for size, operations in results['sizes'].items():
+        for name, current in operations.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            if current['seconds'] < NOISE_FLOOR_SECONDS and before['seconds'] < NOISE_FLOOR_SECONDS:
+                continue
+            slowdown = current['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+            if slowdown > threshold:
+                regressions.append((size, name, before['seconds'], current['seconds'], slowdown))
+    return regressions
+
+def print_results(results):
+    print(f"{'rows':>9}  {'operation':<30} {'ms/call':>10} {'peak MiB':>10}")
+    for size, operations in results['sizes'].items():
+        for name, result in operations.items():
+            print(f"{size:>9}  {name:<30} {result['seconds'] * 1000:10.3f} {result['peak_bytes'] / 2**20:10.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless performance benchmarks for the expense tracker")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Ledger sizes (rows) to benchmark")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed for the synthetic ledger generator")
+    parser.add_argument('--export-format', choices=sorted(tracker.EXPORT_WRITERS), default='csv', help="Format used for the export benchmark")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Where to write the JSON results")
+    parser.add_argument('--baseline', help="JSON results from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown per operation (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'backend': config.STORAGE_BACKEND,
+        'sizes': {},
+    }
+    for rows in args.sizes:
+        print(f"Benchmarking {rows} rows...", file=sys.stderr)
+        results['sizes'][str(rows)] = run_size(rows, args.seed, args.export_format)
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print_results(results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for size, name, before, after, slowdown in regressions:
+            print(f"REGRESSION {size} rows {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms (+{slowdown:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
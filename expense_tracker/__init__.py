@@ -0,0 +1,40 @@
+# Headless core of the expense tracker: storage backends, aggregates, bulk
+# import and streaming export. Nothing here imports tkinter, so the package
+# can be used from scripts, the command line (python -m expense_tracker) and
+# the GUI in app.py alike.
+from .config import DB_FILE, DISPLAY_HEADERS, EXPENSE_FILE, HEADERS, PARTITION_DIR, SERVER_URL
+from . import metrics
+from .metrics import ProfileSession
+from .errors import (CsvHeaderError, ExpenseError, ExpenseNotFoundError, ExportCancelled, StorageError,
+                     ValidationError)
+from .records import canonical_date, format_paise, month_date_range, to_paise, validate_expense
+from .summary import MonthlyIndex
+from .daily import DailyIndex, FenwickTree
+from .table import ChainedRows, ExpenseRow, ExpenseTable
+from .search import SEARCH_COLUMNS, SearchIndex
+from .storage import (STORAGE_BACKENDS, CsvStorage, StorageBackend, add_expense_to_csv, check_summary_index, close_store,
+                      delete_expense_from_csv, get_all_expenses, get_daily_report, get_date_range_total, get_expense,
+                      get_monthly_summary, get_monthly_totals_for_graph, get_store, get_yearly_summary,
+                      initialize_csv, open_store, search_expenses, update_expense_in_csv, use_backend)
+from .partitioned import PartitionedStorage, convert_csv_to_partitions, partition_key
+from .columnar import table_day_totals, table_monthly_index, table_range_stats
+from .importer import detect_column_mapping, detect_date_format, import_expenses
+from .export import EXPORT_CHUNK_ROWS, EXPORT_COLUMNS, EXPORT_WRITERS, export_expenses
+
+# The SQLite backend, the HTTP client and the server pull in sqlite3,
+# http.client and asyncio, which most callers never use; they are imported
+# on first access instead of with the package.
+_LAZY = {
+    'SqliteStorage': 'sqlite_storage', 'migrate_csv_to_sqlite': 'sqlite_storage',
+    'RemoteStorage': 'remote',
+    'ExpenseServer': 'server', 'serve': 'server',
+}
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,324 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date
+
+from . import config, metrics
+from .daily import day_ordinal
+from .errors import ExpenseError, ValidationError
+from .export import EXPORT_WRITERS, export_expenses
+from .importer import import_expenses
+from .partitioned import convert_csv_to_partitions
+from .records import month_date_range, validate_expense
+from .search import SEARCH_COLUMNS
+from .storage import STORAGE_BACKENDS, close_store, get_store, initialize_csv, use_backend
+
+# --- Batch Command Line ---
+# Every invocation opens the store once and runs all of its operations
+# against it, so thousands of adds or queries cost one load, not one
+# process each. Results go to stdout as JSON, problems to stderr.
+CLI_BATCH_ROWS = 5000
+LIST_CHUNK_ROWS = 5000
+
+def _error(message):
+    print(message, file=sys.stderr)
+
+def _print_json(value):
+    # default=dict serialises the ExpenseRow views the stores hand out.
+    print(json.dumps(value, default=dict))
+
+def _read_entries(stream):
+    # Yields (line, fields) from NDJSON or CSV with a header row; the format
+    # is picked from the first non-blank character of the input.
+    first = ''
+    for first in stream:
+        if first.strip():
+            break
+    if not first.strip():
+        return
+    if first.lstrip().startswith('{'):
+        for line, text in enumerate(_chain_first(first, stream), 1):
+            if not text.strip():
+                continue
+            try:
+                fields = json.loads(text)
+            except ValueError as e:
+                yield line, e
+                continue
+            yield line, fields if isinstance(fields, dict) else ValueError("Expected a JSON object")
+    else:
+        reader = csv.DictReader(_chain_first(first, stream))
+        for line, fields in enumerate(reader, 2):
+            yield line, fields
+
+def _chain_first(first, stream):
+    yield first
+    yield from stream
+
+def _field(fields, name):
+    # Accepts 'Date' as well as 'date' style keys.
+    value = fields.get(name, fields.get(name.lower()))
+    return '' if value is None else str(value).strip()
+
+def cmd_add(args):
+    store = get_store()
+    if args.date is not None:
+        source = [(1, {'Date': args.date, 'Description': args.description or '', 'Amount': args.amount})]
+    else:
+        source = _read_entries(sys.stdin)
+    added, errors, batch = 0, 0, []
+    for line, fields in source:
+        try:
+            if isinstance(fields, Exception):
+                raise ValidationError(str(fields))
+            date, description = _field(fields, 'Date'), _field(fields, 'Description')
+            amount = validate_expense(date, _field(fields, 'Amount'))
+        except ValidationError as e:
+            errors += 1
+            _error(f"line {line}: {e}")
+            continue
+        batch.append((date, description, amount))
+        if len(batch) >= CLI_BATCH_ROWS:
+            added += len(store.add_many(batch))
+            batch = []
+    if batch:
+        added += len(store.add_many(batch))
+    _print_json({'added': added, 'errors': errors})
+    return 1 if errors else 0
+
+def cmd_import(args):
+    mapping = None
+    if args.map:
+        mapping = dict(item.split('=', 1) for item in args.map)
+        missing = [name for name in ('Date', 'Description', 'Amount') if name not in mapping]
+        if missing:
+            raise ValidationError(f"--map is missing {', '.join(missing)}")
+    spooled = None
+    path = args.file
+    if path == '-':
+        # The importer reads the file twice (sniffing, then batches), so
+        # stdin is spooled to a temporary file first.
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as spool:
+            shutil.copyfileobj(sys.stdin, spool)
+        path = spooled = spool.name
+    try:
+        report = import_expenses(path, mapping=mapping, date_format=args.date_format,
+                                 skip_duplicates=not args.keep_duplicates)
+    finally:
+        if spooled:
+            os.remove(spooled)
+    for error in report['errors']:
+        _error(f"line {error['line']}: {error['error']}")
+    _print_json({'imported': report['imported'], 'duplicates': len(report['duplicates']),
+                 'errors': len(report['errors']), 'mapping': report['mapping'],
+                 'date_format': report['date_format']})
+    return 1 if report['errors'] else 0
+
+def cmd_summary(args):
+    store = get_store()
+    if args.month is not None:
+        if args.year is None:
+            raise ValidationError("--month needs --year")
+        _print_json({'year': args.year, 'month': args.month, 'total': store.month_total(args.year, args.month)})
+    elif args.year is not None:
+        _print_json({'year': args.year, 'total': store.year_total(args.year)})
+    else:
+        for month, total in store.monthly_totals().items():
+            _print_json({'month': month, 'total': total})
+    return 0
+
+def cmd_analytics(args):
+    # Defaults to the 90 days ending today.
+    end = args.end or date.today().isoformat()
+    start = args.start or date.fromordinal(day_ordinal(end) - 89).isoformat()
+    _print_json(get_store().daily_report(start, end))
+    return 0
+
+def _date_filter(args):
+    if args.month:
+        try:
+            year, month = args.month.split('-')
+            return month_date_range(year, month)
+        except ValueError:
+            raise ValidationError(f"--month must be YYYY-MM, got {args.month}")
+    return args.start, args.end
+
+def cmd_export(args):
+    start, end = _date_filter(args)
+    count = export_expenses(args.output, args.format, start_date=start, end_date=end)
+    _print_json({'exported': count, 'file': args.output})
+    return 0
+
+def cmd_partition(args):
+    rows, partitions = convert_csv_to_partitions(args.source, args.target)
+    _print_json({'converted': rows, 'partitions': partitions, 'directory': args.target})
+    return 0
+
+def cmd_serve(args):
+    from .server import serve
+    serve(args.host, args.port, get_store())
+    return 0
+
+def _run_request(store, request):
+    op = request.get('op')
+    if op == 'get':
+        return store.get(request['id'])
+    if op == 'list':
+        rows = []
+        for chunk in store.iter_chunks(LIST_CHUNK_ROWS, request.get('from'), request.get('to')):
+            rows.extend(chunk)
+        return rows
+    if op == 'search':
+        return store.search(request.get('text'), request.get('prefix', False), request.get('from'), request.get('to'),
+                            request.get('min_amount'), request.get('max_amount'), request.get('sort', 'Date'),
+                            request.get('descending', False), request.get('limit'))
+    if op == 'month_total':
+        return store.month_total(int(request['year']), int(request['month']))
+    if op == 'year_total':
+        return store.year_total(int(request['year']))
+    if op == 'range_total':
+        return store.range_total(request['from'], request['to'])
+    if op == 'daily_report':
+        return store.daily_report(request['from'], request['to'])
+    if op == 'add':
+        amount = validate_expense(request['date'], request['amount'])
+        return store.add(request['date'], request.get('description', ''), amount)
+    if op == 'update':
+        current = store.get(request['id'])
+        if current is None:
+            return None
+        date = request.get('date', current['Date'])
+        amount = validate_expense(date, request.get('amount', current['Amount']), require_positive=False)
+        return store.update(request['id'], date, request.get('description', current['Description']), amount)
+    if op == 'delete':
+        return store.delete(request['id'])
+    raise ValidationError(f"Unknown op: {op}")
+
+def cmd_query(args):
+    store = get_store()
+    if args.batch:
+        # One NDJSON request per line in, one NDJSON response per line out.
+        failures = 0
+        for line, request in _read_entries(sys.stdin):
+            try:
+                if isinstance(request, Exception):
+                    raise ValidationError(str(request))
+                _print_json({'ok': True, 'result': _run_request(store, request)})
+            except (ExpenseError, KeyError, ValueError) as e:
+                failures += 1
+                _print_json({'ok': False, 'line': line, 'error': str(e)})
+        return 1 if failures else 0
+
+    start, end = _date_filter(args)
+    if args.text or args.min_amount is not None or args.max_amount is not None or args.sort or args.limit is not None:
+        rows = store.search(args.text, args.prefix, start, end, args.min_amount, args.max_amount, args.sort or 'Date',
+                            args.desc, args.limit)
+        chunks = (rows[i:i + LIST_CHUNK_ROWS] for i in range(0, len(rows), LIST_CHUNK_ROWS))
+    else:
+        chunks = store.iter_chunks(LIST_CHUNK_ROWS, start, end)
+    writer = None
+    if args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=config.HEADERS)
+        writer.writeheader()
+    for chunk in chunks:
+        if writer:
+            writer.writerows(chunk)
+        else:
+            sys.stdout.writelines(json.dumps(dict(row)) + '\n' for row in chunk)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='expense_tracker', description="Batch command line for the expense tracker")
+    parser.add_argument('--backend', choices=STORAGE_BACKENDS, default=config.STORAGE_BACKEND, help="Storage backend to use")
+    parser.add_argument('--data', help="Expense file (csv), database (sqlite), partition directory (partitioned) or server URL (remote) to work on")
+    parser.add_argument('--metrics', metavar='FILE', help="Write per-operation timings and counters to FILE (JSON) when done")
+    parser.add_argument('--profile', metavar='FILE', help="Profile the command and write the profile to FILE")
+    parser.add_argument('--profile-mode', choices=metrics.PROFILE_MODES, default='cprofile')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="Add expenses from the options or NDJSON/CSV on stdin")
+    add.add_argument('--date', help="YYYY-MM-DD (without it, expenses are read from stdin)")
+    add.add_argument('--description')
+    add.add_argument('--amount')
+    add.set_defaults(func=cmd_add)
+
+    imp = commands.add_parser('import', help="Import a CSV or bank statement ('-' reads stdin)")
+    imp.add_argument('file')
+    imp.add_argument('--date-format', help="strptime format of the date column (detected when omitted)")
+    imp.add_argument('--map', action='append', metavar='FIELD=COLUMN',
+                     help="Source column for Date, Description or Amount (repeat for each)")
+    imp.add_argument('--keep-duplicates', action='store_true', help="Import rows that match existing expenses too")
+    imp.set_defaults(func=cmd_import)
+
+    summary = commands.add_parser('summary', help="Monthly or yearly totals")
+    summary.add_argument('--year', type=int)
+    summary.add_argument('--month', type=int)
+    summary.set_defaults(func=cmd_summary)
+
+    analytics = commands.add_parser('analytics', help="Range total, rolling averages, year-over-year and weekday breakdown")
+    analytics.add_argument('--from', dest='start', help="First date, YYYY-MM-DD (default: 89 days before --to)")
+    analytics.add_argument('--to', dest='end', help="Last date, YYYY-MM-DD (default: today)")
+    analytics.set_defaults(func=cmd_analytics)
+
+    export = commands.add_parser('export', help="Export expenses to xlsx, CSV or Parquet")
+    export.add_argument('output')
+    export.add_argument('--format', choices=sorted(EXPORT_WRITERS), help="Defaults to the output file's extension")
+
+    query = commands.add_parser('query', help="List expenses, or run NDJSON requests from stdin with --batch")
+    query.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    query.add_argument('--batch', action='store_true',
+                       help="Read requests (get, list, search, add, update, delete, month_total, year_total, range_total, daily_report) from stdin")
+    query.add_argument('--text', help="Only expenses whose description contains this (case-insensitive)")
+    query.add_argument('--prefix', action='store_true', help="Match --text at the start of the description only")
+    query.add_argument('--min-amount', type=float)
+    query.add_argument('--max-amount', type=float)
+    query.add_argument('--sort', choices=SEARCH_COLUMNS, help="Sort by this column (ledger order when omitted)")
+    query.add_argument('--desc', action='store_true', help="Sort in descending order")
+    query.add_argument('--limit', type=int, help="Return at most this many expenses")
+    query.set_defaults(func=cmd_query)
+
+    partition = commands.add_parser('partition', help="Split a CSV ledger into one file per month for --backend partitioned")
+    partition.add_argument('source', nargs='?', default=config.EXPENSE_FILE, help=f"CSV ledger (default {config.EXPENSE_FILE})")
+    partition.add_argument('target', nargs='?', default=config.PARTITION_DIR, help=f"New partition directory (default {config.PARTITION_DIR})")
+    partition.set_defaults(func=cmd_partition)
+
+    server = commands.add_parser('serve', help="Serve the ledger as a JSON API for several clients (app.py --server)")
+    server.add_argument('--host', default=config.SERVER_HOST)
+    server.add_argument('--port', type=int, default=config.SERVER_PORT)
+    server.set_defaults(func=cmd_serve)
+
+    for command in (export, query):
+        command.add_argument('--from', dest='start', help="First date, YYYY-MM-DD")
+        command.add_argument('--to', dest='end', help="Last date, YYYY-MM-DD")
+        command.add_argument('--month', help="Only this month, YYYY-MM")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profile = metrics.ProfileSession(args.profile, args.profile_mode).start() if args.profile else None
+    try:
+        use_backend(args.backend, args.data)
+        if args.backend == 'csv' and args.command != 'partition':
+            # stdout carries the results, so the "created" notice goes to stderr.
+            with contextlib.redirect_stdout(sys.stderr):
+                initialize_csv(args.data or config.EXPENSE_FILE)
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into head and friends; stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (ExpenseError, OSError) as e:
+        _error(f"error: {e}")
+        return 2
+    finally:
+        close_store()
+        if profile:
+            profile.stop()
+        if args.metrics:
+            metrics.dump_json(args.metrics)
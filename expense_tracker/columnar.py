@@ -0,0 +1,474 @@
+import csv
+import os
+from array import array
+from datetime import date
+
+from .config import HEADERS
+from .metrics import timed
+from .summary import MonthlyIndex
+
+# --- Columnar (NumPy) Aggregation ---
+# Whole-ledger aggregates computed straight from an ExpenseTable's packed
+# columns (see table.py): NumPy reads the days and paise arrays in place,
+# without copying them, and each aggregate is one grouped sum instead of a
+# Python loop with a strptime per row. The stores use this to rebuild the
+# monthly summary and the daily index.
+# Rows the summaries skip (unparseable dates or amounts) sit in the table's
+# small side dicts, so masking them out costs one step per malformed row and
+# nothing per good one. Sums are int64 paise, exact like MonthlyIndex.apply.
+# Without NumPy the same results come from the row-by-row code paths.
+_EPOCH_ORDINAL = 719163 # date(1970, 1, 1).toordinal(), day 0 of datetime64
+
+def _usable(np, table):
+    # (days, paise) of the live rows with a parseable date and amount.
+    days = np.frombuffer(table.days, dtype=np.int32)
+    paise = np.frombuffer(table.paise, dtype=np.int64)
+    mask = np.frombuffer(table.alive, dtype=np.uint8).astype(bool)
+    odd = list(table.unparsed_slots())
+    if odd:
+        mask[odd] = False
+    return days[mask], paise[mask]
+
+def _group_sums(np, keys, paise, rows=None):
+    # (keys, paise, rows) arrays per distinct key, keys ascending. Each key
+    # counts as one row unless rows gives the count per key.
+    base = int(keys.min())
+    keys = keys - base
+    totals = np.zeros(int(keys.max()) + 1, dtype=np.int64)
+    np.add.at(totals, keys, paise)
+    if rows is None:
+        counts = np.bincount(keys)
+    else:
+        counts = np.zeros(len(totals), dtype=np.int64)
+        np.add.at(counts, keys, rows)
+    present = np.flatnonzero(counts)
+    return present + base, totals[present], counts[present]
+
+def _grouped(np, keys, paise, rows=None):
+    # (key, paise, rows) per distinct key, keys ascending.
+    if not len(keys):
+        return []
+    return zip(*(column.tolist() for column in _group_sums(np, keys, paise, rows)))
+
+@timed('columnar.monthly_index')
+def table_monthly_index(table):
+    # A MonthlyIndex of the table, equal to MonthlyIndex().rebuild(table.rows()).
+    try:
+        import numpy as np
+    except ImportError:
+        return MonthlyIndex().rebuild(table.rows())
+    days, paise = _usable(np, table)
+    index = MonthlyIndex()
+    if not len(days):
+        return index
+    # Summed per day first, so the month lookup runs once per distinct day.
+    days, paise, rows = _group_sums(np, days, paise)
+    months = (days - _EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    for month, total, rows in _grouped(np, months, paise, rows):
+        year = 1970 + month // 12
+        index.months[f"{year:04d}-{month % 12 + 1:02d}"] = (total, rows)
+        year_total, year_rows = index.years.get(f"{year:04d}", (0, 0))
+        index.years[f"{year:04d}"] = (year_total + total, year_rows + rows)
+    return index
+
+@timed('columnar.day_totals')
+def table_day_totals(table):
+    # {day ordinal: (paise, rows)}, equal to table.day_totals().
+    try:
+        import numpy as np
+    except ImportError:
+        return table.day_totals()
+    days, paise = _usable(np, table)
+    return {day: (total, rows) for day, total, rows in _grouped(np, days, paise)}
+
+@timed('columnar.range_stats')
+def table_range_stats(table, first_day=None, last_day=None):
+    # (rows, paise), equal to table.range_stats(first_day, last_day).
+    try:
+        import numpy as np
+    except ImportError:
+        return table.range_stats(first_day, last_day)
+    days = np.frombuffer(table.days, dtype=np.int32)
+    paise = np.frombuffer(table.paise, dtype=np.int64)
+    # Unparseable dates read day 0, outside every range, as in range_stats().
+    mask = np.frombuffer(table.alive, dtype=np.uint8).astype(bool)
+    mask &= (days >= (first_day or 1)) & (days <= (last_day or date.max.toordinal()))
+    return int(mask.sum()), int(paise[mask].sum())
+
+# --- Columnar Ledger Load ---
+# read_ledger_columns() reads a ledger CSV as one NumPy byte array instead of
+# one csv.reader row and a handful of str/int conversions per line. Lines of
+# the usual shape
+#     <lower-case UUID>,YYYY-MM-DD,<description>,<[-]digits[.d[d]]>
+# are decoded column-wise straight into the table's packed arrays: the fixed
+# head of each line and the tail holding the amount are read as 64-bit words
+# and checked and converted 8 bytes at a time, and repeated descriptions are
+# found by hashing them. Every other line (quoted fields, odd IDs, dates or
+# amounts, missing or extra fields) goes through the csv module and
+# ExpenseTable.fill() at its own slot, so the table and its load_errors
+# report equal read_ledger_csv()'s row-by-row path, and malformed rows cost
+# nothing for the good ones. Files it does not take (no NumPy, a different
+# header line, bare '\r' line ends) return None.
+_LEDGER_HEADER = ','.join(HEADERS).encode()
+_HEAD_WIDTH = 48        # '<UUID>,YYYY-MM-DD,' at the start of a usual line
+_TAIL_WIDTH = 16        # End of a line holding ',<amount>'
+_DESCRIPTION_WIDTH = 64 # Longer descriptions are shared one row at a time
+_SCAN_BLOCK = 1 << 18   # Bytes searched for line ends at a time
+_PARSE_BLOCK = 1 << 16  # Lines parsed at a time
+_HASH_MULTIPLIER = 0x100000001b3
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Byte-wise constants for 8 characters per uint64 word, first in the low byte.
+_ONES = 0x0101010101010101
+_HIGH = 0x8080808080808080
+_LOW7 = 0x7F7F7F7F7F7F7F7F
+_LOW_BYTES = tuple((1 << 8 * count) - 1 for count in range(9))
+
+def malformed_row(line, entry):
+    # Report entry for a row without exactly the HEADERS fields.
+    if not entry:
+        return {'line': line, 'error': "Empty row skipped"}
+    return {'line': line, 'error': f"Expected {len(HEADERS)} fields, found {len(entry)}"}
+
+def unparsed_fields(line, table, slot):
+    # Report entries for a row kept with an unparseable Date or Amount.
+    errors = []
+    if slot in table.odd_date_slots():
+        errors.append({'line': line, 'error': f"Unparseable date {table.date_text(slot)!r}"})
+    if slot in table.odd_amount_slots():
+        errors.append({'line': line, 'error': f"Unparseable amount {table.amount_text(slot)!r}"})
+    return errors
+
+def _line_ends(np, buf):
+    # (offsets of the '\n's, number of '\r's) in buf, a block at a time.
+    ends, returns = [], 0
+    for first in range(0, len(buf), _SCAN_BLOCK):
+        block = buf[first:first + _SCAN_BLOCK]
+        ends.append(np.flatnonzero(block == ord('\n')) + first)
+        returns += int(np.count_nonzero(block == ord('\r')))
+    return np.concatenate(ends), returns
+
+def _csv_record(data, starts, ends, first):
+    # (fields, lines used) of the CSV record starting on line first.
+    used = []
+    def lines():
+        for k in range(first, len(starts)):
+            used.append(k)
+            yield data[starts[k]:ends[k] + 1].decode('utf-8')
+    return next(csv.reader(lines()), []), len(used)
+
+def _equal_bytes(words, char):
+    # High bit of every byte of words that is char, the others 0.
+    x = words ^ (_ONES * ord(char))
+    return ~(((x & _LOW7) + _LOW7) | x | _LOW7)
+
+def _all_digits(words):
+    # True where all 8 bytes of the word are ASCII digits.
+    return ((words & 0xF0F0F0F0F0F0F0F0) == 0x3030303030303030) & (((words & 0x0F0F0F0F0F0F0F0F) + 0x0606060606060606) & 0xF0F0F0F0F0F0F0F0 == 0)
+
+def _digit_groups(words):
+    # The 8 ASCII digits of each word as 2-digit values in 16-bit lanes, and
+    # as 4-digit values in 32-bit lanes; the first digit is the highest.
+    pairs = ((words & 0x0F0F0F0F0F0F0F0F) * 2561) >> 8 & 0x00FF00FF00FF00FF
+    return pairs, (pairs * 6553601) >> 16 & 0x0000FFFF0000FFFF
+
+def _eight_digits(words):
+    # Value of the 8 ASCII digits of each word.
+    return (_digit_groups(words)[1] * 42949672960001) >> 32
+
+def _hex_pairs(words, ok):
+    # The 4 bytes spelled by the 8 hex digits of each word, as a uint32. A
+    # byte is a lower-case hex digit if spelling its nibble gives it back.
+    nibbles = ((words & 0x0F0F0F0F0F0F0F0F) + 9 * ((words >> 6) & _ONES)) & 0x0F0F0F0F0F0F0F0F
+    letters = ((nibbles + 0x0606060606060606) >> 4) & _ONES
+    ok &= (nibbles | 0x3030303030303030) + letters * 0x27 == words
+    x = ((nibbles << 4) | (nibbles >> 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    return (x | (x >> 16)) & 0xFFFFFFFF
+
+def _calendar(np):
+    # ([ordinal of Jan 1 - 1, leap year] per year 0-9999, days before each
+    # month and days in it, indexed by month + 13 * leap). Year 0 and month 0
+    # have no days, so their dates never pass.
+    year = np.arange(10000)
+    before = np.maximum(year - 1, 0)
+    leap = ((year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))).astype(np.int32)
+    first_days = np.array([before * 365 + before // 4 - before // 100 + before // 400, leap], dtype=np.int32)
+    month_days = np.array(_DAYS_IN_MONTH * 2, dtype=np.int32)
+    month_days[13 + 2] += 1
+    month_days[13] = 0
+    month_starts = np.concatenate(([0, 0], np.cumsum(month_days[1:12]), [0, 0], np.cumsum(month_days[14:25])))
+    return first_days, month_starts.astype(np.int32), month_days
+
+def _last_byte(np, flags):
+    # Index of the highest byte with its high bit set, -1 if none.
+    return (np.frexp(flags.astype(np.float64))[1] - 1) // 8
+
+def _low_bytes(np, count):
+    # Word masks keeping the low count (clipped to 0..8) bytes.
+    return np.take(np.array(_LOW_BYTES, dtype=np.uint64), count, mode='clip')
+
+def _parse_head(np, head, ok):
+    # (16 UUID bytes, day ordinal) per line from its first 48 bytes; ok is
+    # cleared where either is not in the usual form.
+    w0, w1, w2, w3, w4, w5 = head.view('<u8').T
+    ok &= (w1 & 0x0000FF00000000FF) == 0x00002D000000002D  # '-' at 8 and 13
+    ok &= (w2 & 0xFF00000000FF0000) == 0x2D000000002D0000  # '-' at 18 and 23
+    ok &= (w4 & 0x000000FF00000000) == 0x0000002C00000000  # ',' at 36
+    ok &= (w5 & 0xFF0000FF0000FF00) == 0x2C00002D00002D00  # '-' at 41 and 44, ',' at 47
+    ids = np.empty((len(head), 4), dtype='<u4')
+    ids[:, 0] = _hex_pairs(w0, ok)
+    ids[:, 1] = _hex_pairs(((w1 >> 8) & 0xFFFFFFFF) | (((w1 >> 48) | ((w2 & 0xFFFF) << 16)) << 32), ok)
+    last = _hex_pairs(w3, ok)
+    middle = _hex_pairs(((w2 >> 24) & 0xFFFFFFFF) | ((w4 & 0xFFFFFFFF) << 32), ok)
+    ids[:, 2] = (middle & 0xFFFF) | ((last & 0xFFFF) << 16)
+    ids[:, 3] = (last >> 16) | ((middle >> 16) << 16)
+    # YYYYMMDD gathered into one word from 'YYYY-MM-DD' at 37.
+    digits = (w4 >> 40) | ((w5 & 0xFF) << 24) | ((w5 & 0xFFFF0000) << 16) | ((w5 & 0xFFFF0000000000) << 8)
+    ok &= _all_digits(digits)
+    pairs, quads = _digit_groups(digits)
+    year = (quads & 0xFFFF).astype(np.intp)
+    month = ((pairs >> 32) & 0xFF).astype(np.intp)
+    day = ((pairs >> 48) & 0xFF).astype(np.int32)
+    # Lines whose date is not all digits look up clipped nonsense; ok is
+    # already clear for them.
+    first_days, month_starts, month_days = _calendar(np)
+    month = np.where(month <= 12, month, 0) + 13 * np.take(first_days[1], year, mode='clip')
+    ok &= (year >= 1) & (day >= 1) & (day <= np.take(month_days, month))
+    days = np.take(first_days[0], year, mode='clip') + np.take(month_starts, month) + day
+    return ids.view(np.uint8), days
+
+def _parse_tail(np, tail, ok):
+    # (paise, index of the ',' before the amount) per line from its last 16
+    # bytes; ok is cleared for amounts left to to_paise(). The amount is
+    # rewritten as 16 digits of paise ('-12.5' -> '0000000000001250') in two
+    # words: the rupee digits move to end at byte 13, the paise fill 14-15.
+    low, high = tail.view('<u8').T
+    commas = _equal_bytes(high, ',')
+    comma = 8 + _last_byte(np, commas)
+    wide = np.flatnonzero(commas == 0)
+    if len(wide):
+        comma[wide] = _last_byte(np, _equal_bytes(low[wide], ','))
+    ok &= comma >= 0
+    after = np.clip(comma + 1, 0, 15)
+    sign = (np.take_along_axis(tail, after[:, None], axis=1)[:, 0] == ord('-')) & (comma < 15)
+    dot2 = (tail[:, 13] == ord('.')) & (comma < 13)
+    dot1 = (tail[:, 14] == ord('.')) & (comma < 14)
+    rupees = 15 - comma - sign - np.where(dot2, 3, np.where(dot1, 2, 0))
+    ok &= (rupees >= 1) & (rupees <= 14)
+    # 'r.pp' has its rupees end at 12, 'r.p' at 13 and 'r' at 15.
+    paise = np.where(dot2, high >> 48, np.where(dot1, (high >> 56) | 0x3000, 0x3030))
+    up = np.where(dot2, 8, 0).astype(np.uint64)
+    down = np.where(dot1 | dot2, 0, 16).astype(np.uint64)
+    low, high = low << up, (high << up) | ((low >> 1) >> (63 - up))
+    low, high = (low >> down) | ((high << 1) << (63 - down)), high >> down
+    high = (high & 0x0000FFFFFFFFFFFF) | (paise << 48)
+    # Bytes before the rupee digits (description, ',', '-') become '0'.
+    start = 14 - np.clip(rupees, 0, 14)
+    for word, blank in ((low, _low_bytes(np, start)), (high, _low_bytes(np, start - 8))):
+        word &= ~blank
+        word |= blank & (_ONES * ord('0'))
+    ok &= _all_digits(low) & _all_digits(high)
+    paise = (_eight_digits(low) * 100000000 + _eight_digits(high)).astype(np.int64)
+    return np.where(sign, -paise, paise), comma
+
+def _parse_lines(np, buf, start, stop):
+    # (ids, days, paise, comma, ok) of the lines start:stop, _PARSE_BLOCK
+    # lines at a time so the word temporaries stay in cache.
+    ok = np.ones(len(start), dtype=bool)
+    keys = np.empty((len(start), 16), dtype=np.uint8)
+    days = np.empty(len(start), dtype=np.int32)
+    paise = np.empty(len(start), dtype=np.int64)
+    comma = np.empty(len(start), dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view
+    heads, tails = windows(buf, _HEAD_WIDTH), windows(buf, _TAIL_WIDTH)
+    for first in range(0, len(start), _PARSE_BLOCK):
+        block = slice(first, first + _PARSE_BLOCK)
+        keys[block], days[block] = _parse_head(np, heads[start[block]], ok[block])
+        paise[block], comma[block] = _parse_tail(np, tails[stop[block] - _TAIL_WIDTH], ok[block])
+    return keys, days, paise, comma, ok
+
+def _share_descriptions(np, table, data, buf, start, length, ok):
+    # (desc_start, desc_length) of each line's description, stored once per
+    # distinct text. ok is cleared for descriptions holding a ','. Rows are
+    # bucketed by a hash of their text; the first row of a bucket stands for
+    # every row with the same text, and the rest are shared one at a time.
+    offsets = np.zeros(len(start), dtype=np.int64)
+    lengths = np.zeros(len(start), dtype=np.int32)
+    short = np.flatnonzero(ok & (length <= _DESCRIPTION_WIDTH))
+    single = np.flatnonzero(ok & (length > _DESCRIPTION_WIDTH))
+    if len(short):
+        size = length[short]
+        width = max(-(-int(size.max()) // 8), 1)
+        windows = np.lib.stride_tricks.sliding_window_view(buf, width * 8)
+        text = np.empty((width, len(short)), dtype=np.uint64)
+        comma = np.zeros(len(short), dtype=bool)
+        digest = size.astype(np.uint64)
+        for first in range(0, len(short), _PARSE_BLOCK):
+            block = slice(first, first + _PARSE_BLOCK)
+            for i, word in enumerate(windows[start[short[block]]].view('<u8').T):
+                word &= _low_bytes(np, size[block] - 8 * i)
+                comma[block] |= _equal_bytes(word, ',') != 0
+                digest[block] ^= word
+                digest[block] *= np.uint64(_HASH_MULTIPLIER)
+                text[i, block] = word
+        buckets = 1 << max(len(short) * 2, 1).bit_length()
+        bucket = (digest >> 32).astype(np.int64) & (buckets - 1)
+        first = np.full(buckets, len(short))
+        np.minimum.at(first, bucket, np.arange(len(short)))
+        first = first[bucket]
+        same = ~comma & ~comma[first] & (size[first] == size)
+        for word in text:
+            same &= word[first] == word
+        ok[short[comma]] = False
+        single = np.concatenate((single, short[~same & ~comma]))
+        shared = np.zeros(len(short), dtype=bool)
+        shared[first[same]] = True
+        shared = np.flatnonzero(shared)
+        spans = np.array([table.store_description(data[s:s + n].decode('utf-8'))
+                          for s, n in zip(start[short[shared]].tolist(), size[shared].tolist())],
+                         dtype=np.int64).reshape(-1, 2)
+        span_of = np.zeros(len(short), dtype=np.int64)
+        span_of[shared] = np.arange(len(shared))
+        span_of = span_of[first[same]]
+        offsets[short[same]] = spans[span_of, 0]
+        lengths[short[same]] = spans[span_of, 1]
+    for i in single.tolist():
+        s, n = int(start[i]), int(length[i])
+        if b',' in data[s:s + n]:
+            ok[i] = False
+        else:
+            offsets[i], lengths[i] = table.store_description(data[s:s + n].decode('utf-8'))
+    return offsets, lengths
+
+def _index_ids(np, table):
+    # Builds the ID hash table reindex() would, column-wise. Taken in order
+    # of their home entry, linear probing puts each key on max(its home, the
+    # previous key's entry + 1), one running maximum for all of them; keys
+    # pushed past the end wrap round to the first free entries. The sort is
+    # on the whole first word of the key, so repeated IDs end up next to each
+    # other, where the later slot wins as in reindex().
+    keys = np.frombuffer(table.ids, dtype='<u8').reshape(-1, 2)
+    live = np.frombuffer(table.alive, dtype=np.uint8).astype(bool)
+    odd = list(table.odd_id_slots())
+    if odd:
+        live[odd] = False
+    size = 8
+    while size < table.live * 2:
+        size *= 2
+    bits = size.bit_length() - 1
+    slots = np.flatnonzero(live)
+    first = keys[slots, 0]
+    order = np.argsort(((first & (size - 1)) << (64 - bits)) | (first >> bits))
+    slots, first = slots[order], first[order]
+    superseded = []
+    repeats = np.flatnonzero(first[1:] == first[:-1])
+    if len(repeats):
+        # Runs of one first word, in Python: they are repeated IDs but for
+        # a 64-bit coincidence, and hardly ever there.
+        drop = np.zeros(len(slots), dtype=bool)
+        for run in np.split(repeats, np.flatnonzero(np.diff(repeats) != 1) + 1):
+            latest = {}
+            for i in sorted(range(run[0], run[-1] + 2), key=lambda i: slots[i]):
+                key = bytes(keys[slots[i]])
+                if key in latest:
+                    drop[latest[key]] = True
+                    superseded.append(int(slots[latest[key]]))
+                latest[key] = i
+        slots, first = slots[~drop], first[~drop]
+    step = np.arange(len(slots))
+    position = np.maximum.accumulate((first & (size - 1)).astype(np.int64) - step) + step
+    index = np.zeros(size, dtype=np.int64)
+    inside = position < size
+    index[position[inside]] = slots[inside] + 1
+    wrapped = slots[~inside]
+    if len(wrapped):
+        index[np.flatnonzero(index == 0)[:len(wrapped)]] = wrapped + 1
+    del keys
+    table.adopt_index(array('q', index.tobytes()), len(slots), superseded)
+
+@timed('columnar.read_ledger', rows=len)
+def read_ledger_columns(path, table):
+    # Fills the empty table from the ledger CSV at path and returns it, or
+    # returns None, leaving the table alone, for the row-by-row path.
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        # Zero padding lets every line's fixed-width windows read past its end.
+        data = bytearray(size + 1 + _DESCRIPTION_WIDTH + 8)
+        size = file.readinto(memoryview(data)[:size])
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if not size or data[size - 1] != ord('\n'):
+        data[size] = ord('\n')
+        size += 1
+    ends, carriage_returns = _line_ends(np, buf[:size])
+    returns = buf[ends - 1] == ord('\r')
+    if np.count_nonzero(returns) != carriage_returns:
+        return None
+    stops = ends - returns
+    if data[:stops[0]] != _LEDGER_HEADER:
+        return None
+    starts, ends, stops = ends[:-1] + 1, ends[1:], stops[1:]
+
+    # Quoted records go to the csv module, with the lines they run over.
+    quoted = np.zeros(len(starts), dtype=bool)
+    inside = np.zeros(len(starts), dtype=bool)
+    records = {} # first line -> fields, for lines handled by the csv module
+    if b'"' in data:
+        quoted[np.searchsorted(ends, np.flatnonzero(buf == ord('"')))] = True
+        resume = 0
+        for k in np.flatnonzero(quoted).tolist():
+            if k >= resume:
+                records[k], used = _csv_record(data, starts, ends, k)
+                inside[k + 1:k + used] = True
+                resume = k + used
+    blank = ~inside & (stops == starts)
+    kept = ~inside & ~blank
+    slot_of = np.cumsum(kept) - 1
+
+    # The usual lines, column-wise.
+    fast = np.flatnonzero(kept & ~quoted & (stops - starts >= _HEAD_WIDTH + 2))
+    start, stop = starts[fast], stops[fast]
+    keys, days, paise, comma, ok = _parse_lines(np, buf, start, stop)
+    desc_start = start + _HEAD_WIDTH
+    desc_length = stop - _TAIL_WIDTH + comma - desc_start
+    ok &= desc_length >= 0
+    offsets, lengths = _share_descriptions(np, table, data, buf, desc_start, np.maximum(desc_length, 0), ok)
+
+    count = int(kept.sum())
+    whole = len(fast) == count and ok.all() # Otherwise the loop below fills the gaps
+    slots = None if whole else slot_of[fast[ok]]
+    columns = []
+    for values, dtype in ((keys, np.uint8), (days, np.int32), (paise, np.int64), (offsets, np.int64), (lengths, np.int32)):
+        if whole:
+            column = values.astype(dtype, copy=False)
+        else:
+            column = np.zeros((count,) + values.shape[1:], dtype=dtype)
+            column[slots] = values[ok]
+        columns.append(memoryview(column.reshape(-1).view(np.uint8)))
+    table.extend_columns(*columns)
+    del columns, keys, days, paise, offsets, lengths
+
+    # Everything else, row by row in ledger order.
+    usual = np.zeros(len(starts), dtype=bool)
+    usual[fast[ok]] = True
+    errors = table.load_errors
+    for k in np.flatnonzero((kept & ~usual) | blank).tolist():
+        line = k + 2
+        entry = records.get(k)
+        if entry is None:
+            text = data[starts[k]:stops[k]].decode('utf-8')
+            entry = text.split(',') if text else []
+        slot = int(slot_of[k])
+        if len(entry) == len(HEADERS):
+            table.fill(slot, entry[0], entry[1], entry[2], entry[3])
+            errors.extend(unparsed_fields(line, table, slot))
+            continue
+        errors.append(malformed_row(line, entry))
+        if entry:
+            entry += [None] * (4 - len(entry))
+            table.fill(slot, entry[0], entry[1], entry[2], entry[3])
+    _index_ids(np, table)
+    return table
@@ -0,0 +1,24 @@
+# --- Configuration ---
+EXPENSE_FILE = 'expenses.csv'
+HEADERS = ['ID', 'Date', 'Description', 'Amount']
+DISPLAY_HEADERS = [h for h in HEADERS if h != 'ID']
+DB_FILE = 'expenses.db'
+STORAGE_BACKEND = 'csv' # 'csv', 'sqlite', 'partitioned' or 'remote'
+
+# Files kept next to a CSV ledger (see CsvStorage)
+JOURNAL_SUFFIX = '.journal'
+SUMMARY_SUFFIX = '.summary.json'
+JOURNAL_FILE = EXPENSE_FILE + JOURNAL_SUFFIX
+SUMMARY_FILE = EXPENSE_FILE + SUMMARY_SUFFIX
+COMPACT_THRESHOLD = 1000
+JOURNAL_ADD, JOURNAL_UPDATE, JOURNAL_DELETE = 'A', 'U', 'D'
+
+# Month-partitioned layout (see PartitionedStorage)
+PARTITION_DIR = 'expenses'
+MANIFEST_FILE = 'manifest.json'
+UNDATED_PARTITION = 'undated' # Rows whose date cannot be parsed
+
+# Local JSON API server (see server.py) and its client backend (remote.py)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_URL = f'http://{SERVER_HOST}:{SERVER_PORT}'
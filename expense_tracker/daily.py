@@ -0,0 +1,255 @@
+from datetime import date, datetime
+
+from .errors import ValidationError
+from .records import row_day_paise
+from .table import ExpenseRow
+
+# --- Daily Analytics Index ---
+# Spending per calendar day, held as two Fenwick (binary indexed) trees over
+# day ordinals: one of paise, one of row counts. A point update (an expense
+# added, edited or deleted) and a prefix sum are both O(log days), so the
+# total of any date range costs two prefix sums however long the ledger is.
+# Rolling averages and year-over-year figures are just more range queries.
+# The plain per-day values are kept next to the trees for the weekday
+# breakdown (every 7th day of a range) and for regrowing the day span.
+# The span never grows past MAX_SPAN_DAYS: days outside it (a typo like
+# 9999-12-31) go to a small dict that every query adds in, instead of
+# stretching the arrays over thousands of years.
+ROLLING_WINDOWS = (7, 30, 90)
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MIN_SPAN_DAYS = 366
+MAX_SPAN_DAYS = 100 * 366
+MAX_OUTLIER_DAYS = 1000 # More than this and the span is re-centred on the busiest days
+
+class FenwickTree:
+    __slots__ = ('tree',)
+
+    def __init__(self, values):
+        # Built in O(n) from the plain values, position 0 first.
+        tree = [0]
+        tree.extend(values)
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, position, delta):
+        tree = self.tree
+        i = position + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, end):
+        # Sum of positions 0..end-1.
+        tree = self.tree
+        total = 0
+        i = min(end, len(tree) - 1)
+        while i > 0:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+def day_ordinal(value):
+    # Ordinal of a date, datetime or 'YYYY-MM-DD' string.
+    if isinstance(value, (date, datetime)):
+        return value.toordinal()
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').toordinal()
+    except ValueError:
+        raise ValidationError(f"Invalid date: {value!r}. Please use YYYY-MM-DD.")
+
+def _year_earlier(day):
+    # Same calendar day one year before; 29 February maps to the 28th.
+    d = date.fromordinal(day)
+    try:
+        return d.replace(year=d.year - 1).toordinal()
+    except ValueError:
+        return d.replace(year=d.year - 1, day=28).toordinal()
+
+def _busiest_window(days, totals):
+    # (first, last) of the MAX_SPAN_DAYS-long run of the sorted days that
+    # holds the most rows; the days outside it become outliers.
+    best, best_rows, rows, start = (days[0], days[0]), -1, 0, 0
+    for end, day in enumerate(days):
+        rows += totals[day][1]
+        while day - days[start] + 1 > MAX_SPAN_DAYS:
+            rows -= totals[days[start]][1]
+            start += 1
+        if rows > best_rows:
+            best, best_rows = (days[start], day), rows
+    return best
+
+class DailyIndex:
+    def __init__(self):
+        self.first_day = 0 # Ordinal held at position 0
+        self.paise = []    # Plain per-day values
+        self.rows = []
+        self.outliers = {} # Day ordinal -> [paise, rows], for days outside the span
+        self._paise_tree = FenwickTree([])
+        self._rows_tree = FenwickTree([])
+
+    def _rebuild_trees(self):
+        self._paise_tree = FenwickTree(self.paise)
+        self._rows_tree = FenwickTree(self.rows)
+
+    def _position(self, day):
+        # Position of day, growing the span (at least doubling it, towards
+        # the side that overflowed) when day falls outside it, or None when
+        # that would take the span past MAX_SPAN_DAYS.
+        size = len(self.paise)
+        position = day - self.first_day
+        if size and 0 <= position < size:
+            return position
+        if not size:
+            first, last = day, day
+        else:
+            first, last = min(self.first_day, day), max(self.first_day + size - 1, day)
+        if last - first + 1 > MAX_SPAN_DAYS:
+            return None
+        span = min(MAX_SPAN_DAYS, max(MIN_SPAN_DAYS, 2 * (last - first + 1)))
+        if size and day < self.first_day:
+            first = max(1, last - span + 1)
+        shift = self.first_day - first
+        paise, rows = [0] * span, [0] * span
+        if size:
+            paise[shift:shift + size] = self.paise
+            rows[shift:shift + size] = self.rows
+        self.first_day, self.paise, self.rows = first, paise, rows
+        # Outliers the grown span now covers move into it.
+        for outlier in [d for d in self.outliers if first <= d < first + span]:
+            outlier_paise, outlier_rows = self.outliers.pop(outlier)
+            paise[outlier - first] += outlier_paise
+            rows[outlier - first] += outlier_rows
+        self._rebuild_trees()
+        return day - first
+
+    def add(self, day, paise, rows=1):
+        position = self._position(day)
+        if position is None:
+            entry = self.outliers.setdefault(day, [0, 0])
+            entry[0] += paise
+            entry[1] += rows
+            if entry == [0, 0]:
+                del self.outliers[day]
+            elif len(self.outliers) > MAX_OUTLIER_DAYS:
+                # The span sits on the wrong days, e.g. the first expense
+                # added had the typo date.
+                self.rebuild_days(self.day_totals())
+            return
+        self.paise[position] += paise
+        self.rows[position] += rows
+        self._paise_tree.add(position, paise)
+        self._rows_tree.add(position, rows)
+
+    def apply(self, row, sign=1):
+        entry = row.day_paise() if isinstance(row, ExpenseRow) else row_day_paise(row)
+        if entry is not None:
+            self.add(entry[0], sign * entry[1], sign)
+
+    def rebuild(self, rows):
+        totals = {}
+        for row in rows:
+            entry = row.day_paise() if isinstance(row, ExpenseRow) else row_day_paise(row)
+            if entry is not None:
+                paise, count = totals.get(entry[0], (0, 0))
+                totals[entry[0]] = (paise + entry[1], count + 1)
+        return self.rebuild_days(totals)
+
+    def rebuild_days(self, totals):
+        # totals: {day ordinal: (paise, rows)}, e.g. from ExpenseTable.day_totals().
+        self.first_day, self.paise, self.rows, self.outliers = 0, [], [], {}
+        if totals:
+            days = sorted(totals)
+            first, last = days[0], days[-1]
+            if last - first + 1 > MAX_SPAN_DAYS:
+                first, last = _busiest_window(days, totals)
+            self.first_day = first
+            self.paise = [0] * max(MIN_SPAN_DAYS, last - first + 1)
+            self.rows = [0] * len(self.paise)
+            for day, (paise, rows) in totals.items():
+                if first <= day <= last:
+                    self.paise[day - first] = paise
+                    self.rows[day - first] = rows
+                else:
+                    self.outliers[day] = [paise, rows]
+        self._rebuild_trees()
+        return self
+
+    def day_totals(self):
+        # {day ordinal: (paise, rows)} of every day with rows, span and outliers.
+        totals = {self.first_day + position: (paise, rows)
+                  for position, (paise, rows) in enumerate(zip(self.paise, self.rows)) if rows or paise}
+        totals.update((day, tuple(entry)) for day, entry in self.outliers.items())
+        return totals
+
+    # --- Queries ---
+    def _bounds(self, first_day, last_day):
+        # Positions [start, end) of an inclusive day range, clipped to the span.
+        start = max(0, first_day - self.first_day)
+        end = min(len(self.paise), last_day - self.first_day + 1)
+        return start, max(start, end)
+
+    def range_stats(self, first_day, last_day):
+        # (rows, paise) dated first_day..last_day (day ordinals, inclusive).
+        start, end = self._bounds(first_day, last_day)
+        rows = self._rows_tree.prefix(end) - self._rows_tree.prefix(start)
+        paise = self._paise_tree.prefix(end) - self._paise_tree.prefix(start)
+        for day, (outlier_paise, outlier_rows) in self.outliers.items():
+            if first_day <= day <= last_day:
+                rows += outlier_rows
+                paise += outlier_paise
+        return rows, paise
+
+    def range_total(self, start_date, end_date):
+        return self.range_stats(day_ordinal(start_date), day_ordinal(end_date))[1] / 100
+
+    def rolling_average(self, days, end_date):
+        # Average spend per day over the days days ending on end_date.
+        last = day_ordinal(end_date)
+        return self.range_stats(last - days + 1, last)[1] / days / 100
+
+    def weekday_totals(self, first_day, last_day):
+        # [(weekday name, paise, rows)], Monday first.
+        start, end = self._bounds(first_day, last_day)
+        result = []
+        for weekday, name in enumerate(WEEKDAYS):
+            # Ordinal 1 (1 January of year 1) was a Monday.
+            offset = start + (weekday - (self.first_day + start - 1)) % 7
+            result.append([name, sum(self.paise[offset:end:7]), sum(self.rows[offset:end:7])])
+        for day, (paise, rows) in self.outliers.items():
+            if first_day <= day <= last_day:
+                result[(day - 1) % 7][1] += paise
+                result[(day - 1) % 7][2] += rows
+        return [tuple(item) for item in result]
+
+    def report(self, start_date, end_date):
+        # Everything the Daily Analytics panel shows for one date range.
+        first, last = day_ordinal(start_date), day_ordinal(end_date)
+        if first > last:
+            raise ValidationError("The From date must not be after the To date.")
+        days = last - first + 1
+        rows, paise = self.range_stats(first, last)
+        previous_first, previous_last = _year_earlier(first), _year_earlier(last)
+        previous_rows, previous_paise = self.range_stats(previous_first, previous_last)
+        return {
+            'from': date.fromordinal(first).isoformat(),
+            'to': date.fromordinal(last).isoformat(),
+            'days': days,
+            'total': paise / 100,
+            'count': rows,
+            'daily_average': paise / days / 100,
+            'rolling': [{'days': window, 'average': self.range_stats(last - window + 1, last)[1] / window / 100}
+                        for window in ROLLING_WINDOWS],
+            'year_over_year': {
+                'from': date.fromordinal(previous_first).isoformat(),
+                'to': date.fromordinal(previous_last).isoformat(),
+                'total': previous_paise / 100,
+                'count': previous_rows,
+                'change': (paise - previous_paise) / previous_paise if previous_paise else None,
+            },
+            'weekdays': [{'weekday': name, 'total': total / 100, 'count': count}
+                         for name, total, count in self.weekday_totals(first, last)],
+        }
@@ -0,0 +1,21 @@
+# --- Errors ---
+# Everything the core library raises on bad input or bad files derives from
+# ExpenseError, so callers (the GUI, the CLI, scripts) can decide how to
+# report it. Nothing in the package shows dialogs or exits the process.
+class ExpenseError(Exception):
+    pass
+
+class ValidationError(ExpenseError, ValueError):
+    pass
+
+class ExpenseNotFoundError(ExpenseError, LookupError):
+    pass
+
+class StorageError(ExpenseError):
+    pass
+
+class CsvHeaderError(StorageError):
+    pass
+
+class ExportCancelled(ExpenseError):
+    pass
@@ -0,0 +1,121 @@
+import csv
+import os
+
+from .config import DISPLAY_HEADERS
+from .errors import ExportCancelled, ValidationError
+from .metrics import file_size, record, timed
+from .records import canonical_date, month_date_range
+from .storage import get_store
+
+# --- Streaming Export ---
+# Rows are pulled from the store EXPORT_CHUNK_ROWS at a time and handed to a
+# format writer, so memory use stays flat however large the ledger is. Date
+# filters are applied by the store before any row reaches a writer. Output
+# goes to a temporary file that only replaces file_path once complete.
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_COLUMNS = DISPLAY_HEADERS
+
+def _export_values(row, columns):
+    values = [row.get(col, '') for col in columns]
+    if 'Amount' in columns:
+        i = columns.index('Amount')
+        try:
+            values[i] = float(values[i])
+        except (TypeError, ValueError):
+            pass
+    return values
+
+class CsvExportWriter:
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows([row.get(col, '') for col in self.columns] for row in rows)
+
+    def close(self):
+        self.file.close()
+
+class XlsxExportWriter:
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+        self.path = path
+        self.columns = columns
+        # write_only workbooks stream rows to disk instead of keeping cells.
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Expenses")
+        self.sheet.append(columns)
+
+    def write(self, rows):
+        for row in rows:
+            self.sheet.append(_export_values(row, self.columns))
+
+    def close(self):
+        self.workbook.save(self.path)
+
+class ParquetExportWriter:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs the 'pyarrow' package (pip install pyarrow).")
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(col, pa.float64() if col == 'Amount' else pa.string()) for col in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        import pandas as pd
+        data = {col: [row.get(col, '') for row in rows] for col in self.columns}
+        if 'Amount' in data:
+            data['Amount'] = pd.to_numeric(pd.Series(data['Amount'], dtype=object), errors='coerce').tolist()
+        self.writer.write_table(self.pa.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+EXPORT_WRITERS = {'xlsx': XlsxExportWriter, 'csv': CsvExportWriter, 'parquet': ParquetExportWriter}
+
+@timed('export.export_expenses')
+def export_expenses(file_path, fmt=None, start_date=None, end_date=None, month=None, columns=EXPORT_COLUMNS,
+                    chunk_size=EXPORT_CHUNK_ROWS, progress=None, cancel_event=None, store=None):
+    # month is a (year, month) pair and overrides start_date/end_date.
+    # progress(done, total) is called after every chunk from the calling
+    # thread; setting cancel_event stops the export and removes the file.
+    # Returns the number of rows written.
+    fmt = (fmt or os.path.splitext(file_path)[1].lstrip('.')).lower()
+    if fmt not in EXPORT_WRITERS:
+        raise ValidationError(f"Unsupported export format: {fmt}")
+    if month is not None:
+        start_date, end_date = month_date_range(*month)
+    start_date = canonical_date(start_date) if start_date else None
+    end_date = canonical_date(end_date) if end_date else None
+    if store is None:
+        store = get_store()
+    total = store.count(start_date, end_date)
+    tmp_path = file_path + '.part'
+    writer = EXPORT_WRITERS[fmt](tmp_path, list(columns))
+    done = 0
+    try:
+        for chunk in store.iter_chunks(chunk_size, start_date, end_date):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            writer.write(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+        writer.close()
+        os.replace(tmp_path, file_path)
+        record('export.export_expenses', rows=done, bytes_written=file_size(file_path))
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return done
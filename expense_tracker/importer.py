@@ -0,0 +1,191 @@
+import csv
+import itertools
+import os
+from datetime import datetime
+
+from .errors import ValidationError
+from .metrics import file_size, record, timed
+from .records import canonical_date, to_paise
+from .storage import get_store
+
+# --- Bulk Import ---
+# Imports bank statements and other CSVs. Source columns are mapped onto
+# Date/Description/Amount (guessed from the header when no mapping is given),
+# the date format is detected from a sample, rows are validated in batches
+# (on a process pool for big files) and every batch is written with a single
+# store.add_many() call. Bad rows are reported, not fatal.
+IMPORT_BATCH_ROWS = 5000
+IMPORT_SAMPLE_ROWS = 200
+IMPORT_PARALLEL_BYTES = 8 * 1024 * 1024
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d',
+                       '%d %b %Y', '%d-%b-%Y', '%d %B %Y', '%b %d, %Y', '%d/%m/%y', '%m/%d/%y']
+IMPORT_COLUMN_NAMES = {
+    'Date': ['date', 'transaction date', 'txn date', 'value date', 'posting date'],
+    'Description': ['description', 'narration', 'particulars', 'details', 'remarks', 'memo', 'payee'],
+    'Amount': ['amount', 'debit', 'withdrawal', 'withdrawal amt.', 'withdrawal amount', 'debit amount', 'amount (inr)'],
+}
+
+def detect_column_mapping(fieldnames):
+    lowered = {name.strip().lower(): name for name in fieldnames or [] if name}
+    mapping = {}
+    for field, candidates in IMPORT_COLUMN_NAMES.items():
+        for candidate in candidates:
+            if candidate in lowered:
+                mapping[field] = lowered[candidate]
+                break
+    missing = [field for field in IMPORT_COLUMN_NAMES if field not in mapping]
+    if missing:
+        raise ValidationError(f"Could not find column(s) for {', '.join(missing)} in {fieldnames}. Please pass a column mapping.")
+    return mapping
+
+def detect_date_format(values):
+    # The format that parses the most sample values wins; earlier entries in
+    # IMPORT_DATE_FORMATS win ties (so ISO beats day-first beats month-first).
+    values = [v.strip() for v in values if v and v.strip()]
+    best, best_hits = None, 0
+    for fmt in IMPORT_DATE_FORMATS:
+        hits = 0
+        for value in values:
+            try:
+                datetime.strptime(value, fmt)
+                hits += 1
+            except ValueError:
+                pass
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    if best is None:
+        raise ValidationError("Could not detect the date format. Please pass date_format.")
+    return best
+
+def parse_import_amount(value):
+    # Signed amount of a statement cell: debits are positive, credits
+    # ('Cr'), minus signs and accounting-style '(500.00)' are negative.
+    cleaned = value.replace(',', '').replace('₹', '').replace('Rs.', '').replace('INR', '').strip()
+    credit = False
+    if cleaned[-2:].lower() in ('dr', 'cr'):
+        credit = cleaned[-2:].lower() == 'cr'
+        cleaned = cleaned[:-2].strip()
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        credit = True
+        cleaned = cleaned[1:-1].strip()
+    if cleaned.endswith('-'):
+        credit = True
+        cleaned = cleaned[:-1].strip()
+    amount = float(cleaned)
+    return -abs(amount) if credit else amount
+
+def validate_import_batch(batch, date_format):
+    # batch is a list of (line, date, description, amount) strings; runs in
+    # worker processes, so it only touches its arguments.
+    valid, errors = [], []
+    parsed_dates = {} # Statements repeat dates a lot; strptime is the hot spot
+    for line, date, description, amount in batch:
+        parsed = parsed_dates.get(date)
+        if parsed is None:
+            try:
+                parsed = datetime.strptime(date.strip(), date_format).strftime('%Y-%m-%d')
+            except ValueError:
+                parsed = ''
+            parsed_dates[date] = parsed
+        if not parsed:
+            errors.append({'line': line, 'error': f"Invalid date '{date}' (expected {date_format})"})
+            continue
+        date = parsed
+        if not amount.strip():
+            errors.append({'line': line, 'error': "No amount"})
+            continue
+        try:
+            amount_float = parse_import_amount(amount)
+            to_paise(amount_float) # Rejects inf, nan and amounts too big for the ledger
+        except ValueError:
+            errors.append({'line': line, 'error': f"Invalid amount '{amount}'"})
+            continue
+        if amount_float < 0:
+            # Refunds and other credits are money in, not expenses.
+            errors.append({'line': line, 'error': f"Credit amount '{amount}' skipped; only expenses are imported"})
+            continue
+        if amount_float == 0:
+            errors.append({'line': line, 'error': "Amount must be positive."})
+            continue
+        valid.append((line, date, description.strip(), amount_float))
+    return valid, errors
+
+def _duplicate_key(date, description, amount):
+    return canonical_date(date), description.strip().lower(), to_paise(amount)
+
+def _read_import_batches(path, mapping, batch_size):
+    with open(path, 'r', newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        if mapping is None:
+            mapping = detect_column_mapping(reader.fieldnames)
+        columns = (mapping['Date'], mapping['Description'], mapping['Amount'])
+        batch = []
+        for line, raw in enumerate(reader, start=2):
+            batch.append((line,) + tuple(raw.get(col) or '' for col in columns))
+            if len(batch) >= batch_size:
+                yield mapping, batch
+                batch = []
+        if batch:
+            yield mapping, batch
+
+@timed('import.import_expenses')
+def import_expenses(path, mapping=None, date_format=None, batch_size=IMPORT_BATCH_ROWS, parallel=None,
+                    skip_duplicates=True, progress=None, store=None):
+    # mapping maps 'Date'/'Description'/'Amount' to source column names.
+    # Returns a report dict with the number imported, the line numbers
+    # skipped as duplicates of existing expenses, and per-line errors.
+    if store is None:
+        store = get_store()
+    if mapping is None or date_format is None:
+        with open(path, 'r', newline='', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            mapping = mapping or detect_column_mapping(reader.fieldnames)
+            sample = [row.get(mapping['Date']) for _, row in zip(range(IMPORT_SAMPLE_ROWS), reader)]
+        date_format = date_format or detect_date_format(sample)
+    if parallel is None:
+        parallel = os.path.getsize(path) >= IMPORT_PARALLEL_BYTES
+
+    # Existing rows are counted per key so that a statement with two genuine
+    # identical transactions is only de-duplicated as often as it exists.
+    existing = {}
+    if skip_duplicates:
+        for row in store.all():
+            try:
+                key = _duplicate_key(row['Date'], row['Description'], row['Amount'])
+            except (TypeError, ValueError):
+                continue
+            existing[key] = existing.get(key, 0) + 1
+
+    report = {'imported': 0, 'duplicates': [], 'errors': [], 'mapping': mapping, 'date_format': date_format}
+    batches = (batch for _, batch in _read_import_batches(path, mapping, batch_size))
+    executor = None
+    if parallel:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor()
+    try:
+        if executor:
+            results = executor.map(validate_import_batch, batches, itertools.repeat(date_format))
+        else:
+            results = (validate_import_batch(batch, date_format) for batch in batches)
+        processed = 0
+        for valid, errors in results:
+            report['errors'].extend(errors)
+            entries = []
+            for line, date, description, amount in valid:
+                key = _duplicate_key(date, description, amount)
+                if existing.get(key):
+                    existing[key] -= 1
+                    report['duplicates'].append(line)
+                    continue
+                entries.append((date, description, amount))
+            if entries:
+                store.add_many(entries)
+                report['imported'] += len(entries)
+            processed += len(valid) + len(errors)
+            if progress:
+                progress(processed)
+    finally:
+        if executor:
+            executor.shutdown()
+    record('import.import_expenses', rows=processed, bytes_read=file_size(path))
+    return report
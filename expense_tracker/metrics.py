@@ -0,0 +1,213 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# --- Instrumentation ---
+# Per-operation counters kept in memory for the whole process: call count,
+# errors, a latency histogram, rows scanned and bytes read/written. Storage,
+# aggregation and GUI refresh functions are wrapped with @timed; code that
+# reads or writes files adds its rows and bytes with record(). Recording is a
+# perf_counter() pair and one locked dict update per call, so it stays on.
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000) # Upper bounds; one more bucket for slower calls
+SAMPLE_INTERVAL_S = 0.005
+PROFILE_MODES = ('cprofile', 'sample')
+
+class OperationStats:
+    __slots__ = ('calls', 'errors', 'total_s', 'max_s', 'buckets', 'rows', 'bytes_read', 'bytes_written')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def percentile_ms(self, fraction):
+        # Upper bound of the bucket holding the given fraction of calls.
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return bound
+        return round(self.max_s * 1000, 3)
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_s * 1000, 3),
+            'avg_ms': round(self.total_s * 1000 / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': self.percentile_ms(0.5) if self.calls else 0.0,
+            'p95_ms': self.percentile_ms(0.95) if self.calls else 0.0,
+            'max_ms': round(self.max_s * 1000, 3),
+            'histogram': {f"<={bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+                         | {f">{LATENCY_BUCKETS_MS[-1]}ms": self.buckets[-1]},
+            'rows': self.rows,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+        }
+
+_stats = {}
+_lock = threading.Lock()
+_last = None # (name, seconds) of the most recent timed call
+
+def _entry(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = OperationStats()
+    return stats
+
+def observe(name, seconds, error=False):
+    global _last
+    bucket = bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+    with _lock:
+        stats = _entry(name)
+        stats.calls += 1
+        stats.errors += error
+        stats.total_s += seconds
+        if seconds > stats.max_s:
+            stats.max_s = seconds
+        stats.buckets[bucket] += 1
+        _last = (name, seconds)
+
+def record(name, rows=0, bytes_read=0, bytes_written=0):
+    with _lock:
+        stats = _entry(name)
+        stats.rows += rows
+        stats.bytes_read += bytes_read
+        stats.bytes_written += bytes_written
+
+def timed(name, rows=None):
+    # Decorator recording every call under name. rows, if given, is called
+    # with the result to count the rows it returned (e.g. rows=len).
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe(name, time.perf_counter() - started, error=True)
+                raise
+            observe(name, time.perf_counter() - started)
+            if rows is not None:
+                try:
+                    record(name, rows=rows(result))
+                except (TypeError, ValueError):
+                    pass
+            return result
+        return wrapper
+    return decorate
+
+def snapshot():
+    with _lock:
+        return {name: _stats[name].to_dict() for name in sorted(_stats)}
+
+def last_call():
+    return _last
+
+def reset():
+    global _last
+    with _lock:
+        _stats.clear()
+        _last = None
+
+def dump_json(path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump({'pid': os.getpid(), 'time': time.time(), 'operations': snapshot()}, file, indent=2)
+    os.replace(tmp_path, path)
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+# --- Profiling ---
+# Opt-in only: nothing below runs unless a session is started. cProfile
+# records every call on the thread that started it (exact, but slows the
+# program down noticeably); the sampler looks at every thread's stack each
+# SAMPLE_INTERVAL_S from a side thread, so it also sees background jobs, and
+# writes collapsed stacks ("outer;inner count" per line), which flame graph
+# tools read directly.
+class StackSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                file.write(f"{stack} {count}\n")
+
+class ProfileSession:
+    # start() ... stop() around the code to profile; stop() writes the
+    # profile to path (pstats format for cprofile, collapsed stacks for sample).
+    def __init__(self, path, mode='cprofile'):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}; use one of {', '.join(PROFILE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self._profiler = None
+
+    def start(self):
+        if self.mode == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler().start()
+        return self
+
+    def stop(self):
+        if self._profiler is None:
+            return
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            self._profiler.dump_stats(self.path)
+        else:
+            self._profiler.stop()
+            self._profiler.write(self.path)
+        self._profiler = None
+        print(f"Profile written to {self.path}", file=sys.stderr)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,551 @@
+import csv
+import heapq
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+
+from .columnar import table_day_totals, table_range_stats
+from .config import EXPENSE_FILE, HEADERS, MANIFEST_FILE, PARTITION_DIR, UNDATED_PARTITION
+from .daily import DailyIndex
+from .errors import StorageError, ValidationError
+from .metrics import file_size, record, timed
+from .records import canonical_date, month_date_range, to_paise
+from .search import SEARCH_COLUMNS, SearchIndex
+from .storage import CsvStorage, StorageBackend, fsync_directory, read_ledger_csv
+from .table import ChainedRows, ExpenseTable, RowList
+
+# --- Month-Partitioned Storage ---
+# One CSV per calendar month (<dir>/YYYY-MM.csv, same columns as
+# expenses.csv) plus <dir>/manifest.json with the row count and total paise
+# of every partition. Adds append to their month's file; edits and deletes
+# rewrite only the partitions they touch. Partitions are read on first use:
+# monthly and yearly summaries come straight from the manifest, a date range
+# total reads at most its two boundary months, and a full load reads all
+# partitions at once on a process pool. Ledger order is month order, then
+# the order rows were added within a month. Next to each partition,
+# <dir>/YYYY-MM.ids lists its IDs one per line, so finding an expense by ID
+# reads only the partition that holds it. An ID list is written ahead of
+# the rows it covers and may still name rows deleted since, but never
+# misses a live one; a partition without one is simply read to check.
+MANIFEST_VERSION = 1
+ID_LIST_SUFFIX = '.ids'
+PARTITION_PARALLEL_BYTES = 8 * 1024 * 1024 # Smaller loads are read in-process
+_PARTITION_NAME = re.compile(r'^(\d{4}-\d{2}|' + UNDATED_PARTITION + r')\.csv$')
+
+def partition_key(date):
+    # 'YYYY-MM' of a YYYY-MM-DD date, or UNDATED_PARTITION.
+    try:
+        parsed = datetime.strptime(date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return UNDATED_PARTITION
+    return f"{parsed.year:04d}-{parsed.month:02d}"
+
+def _day(date):
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid date: {date!r}. Please use YYYY-MM-DD.")
+
+def _entry_paise(amount):
+    try:
+        return to_paise(amount)
+    except ValueError:
+        return 0
+
+def _keyed(table, key_of, slots):
+    # (sort key, table, slot) for heapq.merge() across partitions.
+    return ((key_of(slot), table, slot) for slot in slots)
+
+class PartitionedStorage(StorageBackend):
+    def __init__(self, directory=PARTITION_DIR):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.partitions = {}     # key -> [rows, paise], for every partition file
+        self._tables = {}        # key -> ExpenseTable, for the partitions read so far
+        self._all_loaded = False
+        self._indexes = {}       # key -> SearchIndex of that partition's table, built as it is read
+        self._daily = None       # DailyIndex, built on the first daily_report()
+        self._unsynced = set()   # Partition files written since the last sync()
+        self._unsynced_dir = False # Partition files created, renamed or removed since then
+        self._id_lists = {}      # key -> b'\n' + ID list file, for partitions not read yet
+        self._lock = threading.RLock()
+        self.manifest_error = None # StorageError of the last failed manifest save in close()
+        self.load_errors = {}    # key -> {'line', 'error'} list, for partitions read with malformed rows
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.csv')
+
+    def _ids_path(self, key):
+        return os.path.join(self.directory, key + ID_LIST_SUFFIX)
+
+    def _stamp(self, key):
+        st = os.stat(self._path(key))
+        return [st.st_size, st.st_mtime_ns]
+
+    @timed('partitioned.load')
+    def load(self):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._tables = {}
+            self._indexes = {}
+            self._all_loaded = False
+            self._daily = None
+            self._id_lists = {}
+            self.load_errors = {}
+            try:
+                with open(self.manifest_path, 'r') as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError):
+                manifest = {}
+            saved = manifest.get('partitions', {}) if manifest.get('version') == MANIFEST_VERSION else {}
+            self.partitions = {}
+            stale = []
+            for name in os.listdir(self.directory):
+                match = _PARTITION_NAME.match(name)
+                if not match:
+                    continue
+                key = match.group(1)
+                entry = saved.get(key)
+                if entry is not None and entry.get('stamp') == self._stamp(key):
+                    self.partitions[key] = [entry['rows'], entry['paise']]
+                else:
+                    stale.append(key)
+            # Partitions written since the manifest was saved (e.g. after a
+            # crash) are read and counted again; the others stay on disk.
+            self._read_partitions(stale, recount=True)
+        return self
+
+    @timed('partitioned.read')
+    def _read_partitions(self, keys, recount=False):
+        keys = [key for key in keys if key not in self._tables]
+        paths = [self._path(key) for key in keys]
+        try:
+            if (len(paths) > 1 and (os.cpu_count() or 1) > 1
+                    and sum(os.path.getsize(path) for path in paths) >= PARTITION_PARALLEL_BYTES):
+                # Parsing is CPU bound, so the partitions are read by worker
+                # processes; the packed tables come back as a few big arrays.
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor() as executor:
+                    tables = list(executor.map(read_ledger_csv, paths))
+            else:
+                tables = [read_ledger_csv(path) for path in paths]
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            raise StorageError(f"Could not read expense partitions from {self.directory}: {e}") from e
+        record('partitioned.read', rows=sum(table.live for table in tables), bytes_read=sum(map(file_size, paths)))
+        for key, table in zip(keys, tables):
+            self._attach(key, table)
+            if table.load_errors:
+                self.load_errors[key] = table.load_errors
+            self._id_lists.pop(key, None)
+            if recount or key not in self.partitions:
+                self._count(key)
+                # Changed behind the manifest's back, so its ID list may be too.
+                self._write_ids(key)
+
+    def _attach(self, key, table):
+        self._tables[key] = table
+        self._indexes[key] = SearchIndex(table).rebuild()
+
+    def _count(self, key):
+        table = self._tables[key]
+        self.partitions[key] = [table.live, table_range_stats(table)[1]]
+
+    def _table(self, key):
+        # The partition's table, read from disk on first use.
+        if key not in self._tables:
+            if key in self.partitions:
+                self._read_partitions([key])
+            else:
+                self._attach(key, ExpenseTable())
+        return self._tables[key]
+
+    def _load_all(self):
+        if not self._all_loaded:
+            self._read_partitions(list(self.partitions))
+            self._all_loaded = True
+
+    @staticmethod
+    def _ordered(keys):
+        return sorted(keys, key=lambda key: (key == UNDATED_PARTITION, key))
+
+    def _may_hold(self, key, expense_id):
+        # False only when the unread partition's ID list rules expense_id out.
+        ids = self._id_lists.get(key)
+        if ids is None:
+            try:
+                with open(self._ids_path(key), 'rb') as file:
+                    ids = self._id_lists[key] = b'\n' + file.read()
+            except OSError:
+                return True
+        return '\n' in expense_id or b'\n' + expense_id.encode('utf-8') + b'\n' in ids
+
+    def _find(self, expense_id, hint=None):
+        # (partition, slot) of a live row, or (None, -1). The hint partition,
+        # if given, is tried first, then the partitions already read, then
+        # the unread ones whose ID list names expense_id.
+        unread = [key for key in self.partitions if key not in self._tables]
+        keys = [hint] if hint in self.partitions or hint in self._tables else []
+        keys += [key for key in list(self._tables) if key != hint]
+        keys += [key for key in unread if key != hint]
+        for key in keys:
+            if key not in self._tables and not self._may_hold(key, expense_id):
+                continue
+            slot = self._table(key).find(expense_id)
+            if slot >= 0:
+                return key, slot
+        return None, -1
+
+    def _write_ids(self, key):
+        # Replaces a partition's ID list with the IDs of its table. If that
+        # fails the list is dropped, as a stale one could miss a row.
+        table = self._tables[key]
+        path = self._ids_path(key)
+        try:
+            if table.live:
+                with open(path + '.tmp', 'w', newline='') as file:
+                    file.writelines(table.id_text(slot) + '\n' for slot in table.live_slots())
+                os.replace(path + '.tmp', path)
+                self._unsynced.add(path)
+                return
+        except OSError:
+            pass
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _append_rows(self, key, entries):
+        path = self._path(key)
+        ids_path = self._ids_path(key)
+        size = file_size(path)
+        try:
+            if not size or os.path.exists(ids_path):
+                with open(ids_path, 'a', newline='') as file:
+                    file.writelines(entry['ID'] + '\n' for entry in entries)
+                self._id_lists.pop(key, None)
+                self._unsynced.add(ids_path)
+            with open(path, 'a', newline='') as file:
+                writer = csv.writer(file)
+                if not size:
+                    writer.writerow(HEADERS)
+                    self._unsynced_dir = True
+                writer.writerows([entry[h] for h in HEADERS] for entry in entries)
+        except OSError as e:
+            raise StorageError(f"Could not write {path}: {e}") from e
+        self._unsynced.add(path)
+        record('partitioned.append', rows=len(entries), bytes_written=file_size(path) - size)
+
+    @timed('partitioned.rewrite')
+    def _rewrite(self, key):
+        # Swaps in a fresh copy of one partition; an emptied one is removed.
+        table = self._tables[key]
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        try:
+            if not table.live:
+                if os.path.exists(path):
+                    os.remove(path)
+                    self._unsynced_dir = True
+                self.partitions.pop(key, None)
+                self._write_ids(key)
+                return
+            with open(tmp_path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(HEADERS)
+                writer.writerows([row[h] for h in HEADERS] for row in table.rows())
+            os.replace(tmp_path, path)
+            self._unsynced_dir = True
+        except OSError as e:
+            raise StorageError(f"Could not rewrite {path}: {e}") from e
+        self._write_ids(key)
+        self._unsynced.add(path)
+        record('partitioned.rewrite', rows=table.live, bytes_written=file_size(path))
+        self._count(key)
+
+    def all(self):
+        with self._lock:
+            self._load_all()
+            return ChainedRows([self._tables[key].rows() for key in self._ordered(self._tables)])
+
+    def get(self, expense_id):
+        with self._lock:
+            key, slot = self._find(expense_id)
+            return self._tables[key].row(slot) if key is not None else None
+
+    def __len__(self):
+        return sum(rows for rows, _ in self.partitions.values())
+
+    def add(self, date, description, amount):
+        return self.add_many([(date, description, amount)])[0]
+
+    def add_many(self, entries):
+        # Partitions that have not been read are only appended to, so bulk
+        # imports never load the rest of the ledger.
+        entries = [{'ID': str(uuid.uuid4()), 'Date': date, 'Description': description, 'Amount': str(amount)}
+                   for date, description, amount in entries]
+        groups = {}
+        for entry in entries:
+            groups.setdefault(partition_key(entry['Date']), []).append(entry)
+        views = {}
+        detached = None # Rows of partitions not read yet, viewed like loaded ones
+        with self._lock:
+            for key, group in groups.items():
+                self._append_rows(key, group)
+                stats = self.partitions.setdefault(key, [0, 0])
+                stats[0] += len(group)
+                if key != UNDATED_PARTITION:
+                    stats[1] += sum(_entry_paise(entry['Amount']) for entry in group)
+                if self._all_loaded or key in self._tables:
+                    if key not in self._tables:
+                        self._attach(key, ExpenseTable())
+                    table, index = self._tables[key], self._indexes[key]
+                    for entry in group:
+                        slot = table.insert(entry['ID'], entry['Date'], entry['Description'], entry['Amount'])
+                        index.add(slot)
+                        views[entry['ID']] = table.row(slot)
+                else:
+                    if detached is None:
+                        detached = ExpenseTable()
+                    for entry in group:
+                        slot = detached.append(entry['ID'], entry['Date'], entry['Description'], entry['Amount'])
+                        views[entry['ID']] = detached.row(slot)
+                if self._daily is not None:
+                    for entry in group:
+                        self._daily.apply(views[entry['ID']])
+        return [views[entry['ID']] for entry in entries]
+
+    def update(self, expense_id, date, description, amount):
+        new_key = partition_key(date)
+        with self._lock:
+            key, slot = self._find(expense_id, hint=new_key) # Most edits keep the month
+            if key is None:
+                return None
+            amount = str(amount)
+            old = self._tables[key].day_paise(slot)
+            if new_key == key:
+                table = self._tables[key]
+                previous = (table.date_text(slot), table.description(slot), table.amount_text(slot))
+                self._indexes[key].remove(slot)
+                table.overwrite(slot, date, description, amount)
+                try:
+                    self._rewrite(key)
+                except StorageError:
+                    table.overwrite(slot, *previous)
+                    raise
+                finally:
+                    self._indexes[key].add(slot)
+            else:
+                # Moving to another month: append to the new partition first,
+                # so a crash in between leaves a duplicate rather than a loss.
+                # The new partition is read before the row is appended to it.
+                table = self._table(new_key)
+                self._append_rows(new_key, [{'ID': expense_id, 'Date': date, 'Description': description, 'Amount': amount}])
+                self._indexes[key].remove(slot)
+                self._tables[key].remove(slot)
+                self._rewrite(key)
+                slot = table.insert(expense_id, date, description, amount)
+                self._indexes[new_key].add(slot)
+                self._count(new_key)
+            row = table.row(slot)
+            # Only once the partition files are written, so a failed write
+            # leaves the daily index matching what is on disk.
+            if self._daily is not None:
+                if old is not None:
+                    self._daily.add(old[0], -old[1], -1)
+                self._daily.apply(row)
+        return row
+
+    def delete(self, expense_id):
+        with self._lock:
+            key, slot = self._find(expense_id)
+            if key is None:
+                return None
+            table = self._tables[key]
+            row = table.row(slot)
+            self._indexes[key].remove(slot)
+            table.remove(slot)
+            self._rewrite(key)
+            if self._daily is not None:
+                self._daily.apply(row, -1)
+        return row
+
+    def month_total(self, year, month):
+        with self._lock:
+            return self.partitions.get(f"{int(year):04d}-{int(month):02d}", (0, 0))[1] / 100
+
+    def year_total(self, year):
+        prefix = f"{int(year):04d}-"
+        with self._lock:
+            return sum(paise for key, (_, paise) in self.partitions.items() if key.startswith(prefix)) / 100
+
+    def monthly_totals(self):
+        with self._lock:
+            return {key: paise / 100 for key, (rows, paise) in sorted(self.partitions.items())
+                    if key != UNDATED_PARTITION and rows}
+
+    def _range_stats(self, start_date, end_date):
+        # (rows, paise) dated start_date..end_date: months fully inside the
+        # range come from the manifest, only the boundary months are read.
+        first, last = _day(start_date), _day(end_date)
+        first_key, last_key = partition_key(start_date), partition_key(end_date)
+        rows = paise = 0
+        with self._lock:
+            for key, stats in list(self.partitions.items()):
+                if key == UNDATED_PARTITION or not first_key <= key <= last_key:
+                    continue
+                month_start, month_end = month_date_range(key[:4], key[5:])
+                if first <= _day(month_start) and _day(month_end) <= last:
+                    rows, paise = rows + stats[0], paise + stats[1]
+                else:
+                    month_rows, month_paise = table_range_stats(self._table(key), first, last)
+                    rows, paise = rows + month_rows, paise + month_paise
+        return rows, paise
+
+    def range_total(self, start_date, end_date):
+        return self._range_stats(start_date, end_date)[1] / 100
+
+    def count(self, start_date=None, end_date=None):
+        if start_date is None and end_date is None:
+            return len(self)
+        return self._range_stats(start_date or '0001-01-01', end_date or '9999-12-31')[0]
+
+    def iter_chunks(self, chunk_size, start_date=None, end_date=None):
+        # Reads only the partitions that overlap the date range.
+        ranged = start_date is not None or end_date is not None
+        first_key = partition_key(canonical_date(start_date)) if start_date else ''
+        last_key = partition_key(canonical_date(end_date)) if end_date else '9999-12'
+        with self._lock:
+            keys = self._ordered(set(self.partitions) | set(self._tables))
+        chunk = []
+        for key in keys:
+            if ranged and (key == UNDATED_PARTITION or not first_key <= key <= last_key):
+                continue
+            with self._lock:
+                rows = self._table(key).rows()
+            for row in rows:
+                if ranged and not CsvStorage._in_range(row, start_date, end_date):
+                    continue
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def search(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+               sort='Date', descending=False, limit=None):
+        # Each partition overlapping the date range answers from its own
+        # index; the per-partition results are then merged. Partitions are
+        # months, so by date that is just concatenation (undated rows sort
+        # first, as unparseable dates do within a partition).
+        if sort not in SEARCH_COLUMNS:
+            raise ValidationError(f"Cannot sort by {sort}; use one of {', '.join(SEARCH_COLUMNS)}")
+        first_key = partition_key(canonical_date(start_date)) if start_date else ''
+        last_key = partition_key(canonical_date(end_date)) if end_date else '9999-12'
+        with self._lock:
+            keys = [key for key in set(self.partitions) | set(self._tables)
+                    if not (start_date or end_date) or (key != UNDATED_PARTITION and first_key <= key <= last_key)]
+            self._read_partitions(keys)
+            keys = sorted(keys, key=lambda key: (key != UNDATED_PARTITION, key), reverse=descending)
+            results = [(self._tables[key], self._indexes[key],
+                        self._indexes[key].query(text, prefix, start_date, end_date, min_amount, max_amount,
+                                                 sort, descending, limit)) for key in keys]
+            if sort == 'Date':
+                rows = ChainedRows([RowList(table, slots) for table, _, slots in results])
+                return rows[:limit] if limit is not None else rows
+            merged = heapq.merge(*[_keyed(table, index.sort_key(sort), slots) for table, index, slots in results],
+                                 key=itemgetter(0), reverse=descending)
+            return [table.row(slot) for _, table, slot in islice(merged, limit)]
+
+    def daily_report(self, start_date, end_date):
+        # The daily index needs every partition, so it is built on first use
+        # and then kept current by add/update/delete.
+        with self._lock:
+            if self._daily is None:
+                self._load_all()
+                totals = {}
+                for table in self._tables.values():
+                    totals.update(table_day_totals(table)) # A day lives in exactly one partition
+                self._daily = DailyIndex().rebuild_days(totals)
+            return self._daily.report(start_date, end_date)
+
+    def check_summary(self, repair=False):
+        # Recounts every partition and reports ('partition', key, stored,
+        # recounted) mismatches against the manifest.
+        with self._lock:
+            self._load_all()
+            recounted = {key: [table.live, table_range_stats(table)[1]] for key, table in self._tables.items() if table.live}
+            mismatches = [('partition', key, tuple(self.partitions.get(key, (0, 0))), tuple(recounted.get(key, (0, 0))))
+                          for key in sorted(set(self.partitions) | set(recounted))
+                          if self.partitions.get(key, [0, 0]) != recounted.get(key, [0, 0])]
+            if repair:
+                self.partitions = recounted
+        return mismatches
+
+    def sync(self):
+        with self._lock:
+            paths, self._unsynced = self._unsynced, set()
+            for path in paths:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    continue # Emptied and removed since
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            if self._unsynced_dir:
+                fsync_directory(self.manifest_path) # Same directory as the partitions
+                self._unsynced_dir = False
+
+    @timed('partitioned.save_manifest')
+    def save_manifest(self):
+        with self._lock:
+            partitions = {key: {'rows': rows, 'paise': paise, 'stamp': self._stamp(key)}
+                          for key, (rows, paise) in self.partitions.items()}
+            tmp_path = self.manifest_path + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump({'version': MANIFEST_VERSION, 'partitions': partitions}, file)
+            os.replace(tmp_path, self.manifest_path)
+
+    def close(self):
+        try:
+            self.save_manifest()
+        except OSError as e:
+            # The next load finds the manifest stale and rereads the partitions.
+            # Counted as an error under partitioned.save_manifest.
+            self.manifest_error = StorageError(f"Could not save partition manifest: {e}")
+
+def convert_csv_to_partitions(csv_path=EXPENSE_FILE, directory=PARTITION_DIR):
+    # One-shot split of an existing ledger (including any pending journal
+    # entries) into month partitions and a manifest. Returns (rows,
+    # partitions) written. The CSV itself is left as it is.
+    if os.path.isdir(directory) and any(_PARTITION_NAME.match(name) for name in os.listdir(directory)):
+        raise StorageError(f"{directory} already holds expense partitions. Please remove them or pick another directory.")
+    os.makedirs(directory, exist_ok=True)
+    source = CsvStorage(csv_path).load()
+    files, writers, count = {}, {}, 0
+    try:
+        for row in source.all():
+            key = partition_key(row['Date'])
+            writer = writers.get(key)
+            if writer is None:
+                files[key] = open(os.path.join(directory, key + '.csv.tmp'), 'w', newline='')
+                writer = writers[key] = csv.writer(files[key])
+                writer.writerow(HEADERS)
+            writer.writerow([row[h] for h in HEADERS])
+            count += 1
+    finally:
+        for file in files.values():
+            file.close()
+        source.close()
+    for key in files:
+        path = os.path.join(directory, key + '.csv')
+        os.replace(path + '.tmp', path)
+    PartitionedStorage(directory).load().close()
+    return count, len(files)
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from .errors import ValidationError
+
+# --- Record Helpers ---
+PAISE_LIMIT = 2 ** 63 # Amounts are kept as signed 64-bit paise
+
+def validate_expense(date, amount, require_positive=True):
+    # Returns the amount as a float or raises ValidationError. The date must be
+    # YYYY-MM-DD; it is checked but returned to the caller unchanged. The
+    # amount must fit the ledger's integer paise, so inf, nan and 1e30 fail.
+    try:
+        paise = to_paise(amount)
+        datetime.strptime(date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid amount or date format. Please use YYYY-MM-DD for date and a number for amount.")
+    if require_positive and paise <= 0:
+        raise ValidationError("Amount must be positive.")
+    return float(amount)
+
+def row_month_amount(row):
+    try:
+        expense_date = datetime.strptime(row['Date'], '%Y-%m-%d')
+        return expense_date.strftime('%Y-%m'), float(row['Amount'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def row_month_paise(row):
+    # Like row_month_amount, with the amount as exact integer paise.
+    try:
+        expense_date = datetime.strptime(row['Date'], '%Y-%m-%d')
+        return expense_date.strftime('%Y-%m'), to_paise(row['Amount'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def row_day_paise(row):
+    # (day ordinal, paise) for the daily index, or None if either is unparseable.
+    try:
+        return datetime.strptime(row['Date'], '%Y-%m-%d').toordinal(), to_paise(row['Amount'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def canonical_date(date):
+    # Zero-padded YYYY-MM-DD, so dates compare correctly as strings.
+    # Unparseable dates are returned unchanged.
+    if len(date) == 10:
+        return date
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return date
+
+def month_date_range(year, month):
+    # Inclusive (first day, last day) of a calendar month as YYYY-MM-DD strings.
+    year, month = int(year), int(month)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    last_day = datetime(next_year, next_month, 1) - timedelta(days=1)
+    return f"{year:04d}-{month:02d}-01", last_day.strftime('%Y-%m-%d')
+
+def to_paise(amount):
+    # Exact amount in integer paise from text like '120', '-5.5' or '19.99'
+    # (or a float, via its shortest repr). More than two decimals round half
+    # up. Raises ValueError for anything that is not a finite number.
+    text = str(amount).strip()
+    whole, _, cents = text.partition('.')
+    digits = whole[1:] if whole[:1] in ('+', '-') else whole
+    if digits.isascii() and digits.isdigit() and len(cents) <= 2 and (not cents or cents.isascii() and cents.isdigit()):
+        # Plain 'rupees.paise' text, the common case, without going through Decimal.
+        paise = int(whole + cents.ljust(2, '0'))
+    else:
+        try:
+            paise = int((Decimal(text) * 100).to_integral_value(ROUND_HALF_UP))
+        except (ArithmeticError, ValueError): # decimal's Overflow and InvalidOperation among them
+            raise ValueError(f"Invalid amount: {amount!r}")
+    if abs(paise) >= PAISE_LIMIT:
+        raise ValueError(f"Amount out of range: {amount!r}")
+    return paise
+
+def format_paise(paise):
+    sign = '-' if paise < 0 else ''
+    rupees, rest = divmod(abs(paise), 100)
+    return f"{sign}{rupees}.{rest:02d}"
@@ -0,0 +1,148 @@
+import http.client
+import json
+import select
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from .config import SERVER_URL
+from .errors import StorageError, ValidationError
+from .storage import StorageBackend
+
+# --- Remote Storage ---
+# The StorageBackend interface over HTTP to a running expense server
+# (python -m expense_tracker serve), so the GUI and the CLI work unchanged
+# against a shared ledger. Each thread keeps one keep-alive connection.
+# Rows come back as plain dicts with the usual ID/Date/Description/Amount keys.
+REQUEST_TIMEOUT_S = 30
+
+def _row(fields):
+    return {'ID': fields['ID'], 'Date': fields['Date'], 'Description': fields['Description'], 'Amount': fields['Amount']}
+
+class RemoteStorage(StorageBackend):
+    def __init__(self, url=SERVER_URL, timeout=REQUEST_TIMEOUT_S):
+        parts = urlsplit(url if '://' in url else 'http://' + url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise StorageError(f"Expected a server URL like http://host:port, got {url}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+            # An idle kept-alive socket only turns readable when the server
+            # has closed it; open a new one rather than send into it.
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _request(self, method, path, params=None, body=None):
+        if params:
+            path += '?' + urlencode({key: value for key, value in params.items() if value is not None})
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if data is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            sent = False
+            try:
+                conn.request(method, path, data, headers)
+                sent = True
+                response = conn.getresponse()
+                status, payload = response.status, response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._local.conn = None
+                # Only a GET is safe to repeat once the request may have
+                # reached the server: a retried POST could add the expense twice.
+                if attempt or (sent and method != 'GET'):
+                    raise StorageError(f"Expense server at {self.url} is not reachable: {e}")
+        result = json.loads(payload) if payload else None
+        if status == 404:
+            return None
+        if status == 400:
+            raise ValidationError(result.get('error', "Bad request"))
+        if status >= 300:
+            raise StorageError(f"Expense server error {status}: {(result or {}).get('error', '')}")
+        return result
+
+    def load(self):
+        self._request('GET', '/health')
+        return self
+
+    def all(self):
+        return [_row(row) for row in self._request('GET', '/expenses')]
+
+    def get(self, expense_id):
+        row = self._request('GET', f"/expenses/{expense_id}")
+        return _row(row) if row is not None else None
+
+    def __len__(self):
+        return self._request('GET', '/health')['rows']
+
+    def add(self, date, description, amount):
+        return _row(self._request('POST', '/expenses', body={'date': date, 'description': description, 'amount': amount}))
+
+    def add_many(self, entries):
+        rows = self._request('POST', '/expenses', body=[{'date': date, 'description': description, 'amount': amount}
+                                                         for date, description, amount in entries])
+        return [_row(row) for row in rows]
+
+    def update(self, expense_id, date, description, amount):
+        row = self._request('PUT', f"/expenses/{expense_id}", body={'date': date, 'description': description, 'amount': amount})
+        return _row(row) if row is not None else None
+
+    def delete(self, expense_id):
+        row = self._request('DELETE', f"/expenses/{expense_id}")
+        return _row(row) if row is not None else None
+
+    def month_total(self, year, month):
+        return self._request('GET', '/summary/month', {'year': year, 'month': month})['total']
+
+    def year_total(self, year):
+        return self._request('GET', '/summary/year', {'year': year})['total']
+
+    def monthly_totals(self):
+        return self._request('GET', '/summary/months')
+
+    def range_total(self, start_date, end_date):
+        return self._request('GET', '/summary/range', {'from': start_date, 'to': end_date})['total']
+
+    def count(self, start_date=None, end_date=None):
+        return self._request('GET', '/expenses/count', {'from': start_date, 'to': end_date})
+
+    def iter_chunks(self, chunk_size, start_date=None, end_date=None):
+        # One request per chunk, so an export streams however big the ledger
+        # is. Pages are by offset: a row added or deleted mid-export can
+        # shift the rows after it by one across a page boundary.
+        offset = 0
+        while True:
+            rows = self._request('GET', '/expenses', {'from': start_date, 'to': end_date, 'offset': offset,
+                                                      'limit': chunk_size})
+            if rows:
+                yield [_row(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+            offset += len(rows)
+
+    def search(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+               sort='Date', descending=False, limit=None):
+        params = {'text': text, 'prefix': int(prefix), 'from': start_date, 'to': end_date, 'min_amount': min_amount,
+                  'max_amount': max_amount, 'sort': sort, 'desc': int(descending), 'limit': limit}
+        return [_row(row) for row in self._request('GET', '/expenses', params)]
+
+    def daily_report(self, start_date, end_date):
+        return self._request('GET', '/analytics/daily', {'from': start_date, 'to': end_date})
+
+    def check_summary(self, repair=False):
+        return [tuple(item) for item in self._request('POST', '/summary/check', body={'repair': repair})]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
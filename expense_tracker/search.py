@@ -0,0 +1,292 @@
+from array import array
+from bisect import bisect_left, insort
+from itertools import chain, compress, islice, repeat
+
+from .daily import day_ordinal
+from .errors import ValidationError
+from .metrics import timed
+from .records import to_paise
+
+# --- Search Index ---
+# In-memory indexes over the slots of one ExpenseTable (see table.py), kept
+# up to date on every add/edit/delete so filters never rescan the ledger.
+# Dates and amounts are read straight from the table's packed columns; the
+# index itself holds only slot numbers in arrays:
+#   * Description: each distinct lower-cased description gets a number;
+#     per number, the slots using it in date order, plus a trigram index over
+#     the distinct descriptions for substring search and a sorted list of
+#     them for prefix search. Ledgers repeat the same few descriptions a lot,
+#     so matching runs over distinct strings, not rows.
+#   * Date and Amount: live slots sorted by (day, slot) and (paise, slot);
+#     ranges are found by binary search, reading the keys from the table.
+# The filter with the fewest candidates drives a query; the others are
+# checked per candidate. Results are slots, turned into rows by the caller.
+SEARCH_COLUMNS = ('Date', 'Description', 'Amount')
+TRIGRAM_SIZE = 3
+_KEY_MAX = '\uffff'
+_NO_DATE = 0            # Day the table stores for unparseable dates
+_NO_AMOUNT = -2 ** 63   # Sort key of unparseable amounts: sorts first, never matches a range
+
+def _trigrams(text):
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+def _position(slots, key_of, key, slot=-1):
+    # Where (key, slot) goes in slots, which are sorted by (key_of(s), s):
+    # with the default slot, the first entry whose key is >= key.
+    lo, hi = 0, len(slots)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        other = slots[mid]
+        if (key_of(other), other) < (key, slot):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+class SearchIndex:
+    def __init__(self, table):
+        self.table = table
+        self.texts = []               # description number -> lower-cased description
+        self.numbers = {}             # lower-cased description -> its number
+        self.postings = []            # description number -> its slots in (day, slot) order
+        self.descriptions = []        # sorted descriptions that have live rows
+        self.trigrams = {}            # trigram -> set of description numbers
+        self.slot_text = array('i')   # slot -> description number, -1 when not indexed
+        self.by_date = array('i')     # indexed slots in (day, slot) order
+        self.by_amount = array('i')   # indexed slots in (paise, slot) order
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def amount_key(self, slot):
+        return _NO_AMOUNT if slot in self.table.odd_amount_slots() else self.table.paise[slot]
+
+    def sort_key(self, sort):
+        # slot -> sort key for one of SEARCH_COLUMNS; ties go by slot.
+        table = self.table
+        if sort == 'Date':
+            return table.days.__getitem__
+        if sort == 'Amount':
+            return self.amount_key if table.odd_amount_slots() else table.paise.__getitem__
+        texts, slot_text, days = self.texts, self.slot_text, table.days
+        return lambda slot: (texts[slot_text[slot]], days[slot])
+
+    def _number(self, text):
+        text = text.lower()
+        number = self.numbers.get(text)
+        if number is None:
+            number = self.numbers[text] = len(self.texts)
+            self.texts.append(text)
+            self.postings.append(array('i'))
+        return number
+
+    def _show(self, number):
+        # A description gets its first live row.
+        text = self.texts[number]
+        insort(self.descriptions, text)
+        for gram in _trigrams(text):
+            self.trigrams.setdefault(gram, set()).add(number)
+
+    def _hide(self, number):
+        # A description loses its last live row.
+        text = self.texts[number]
+        del self.descriptions[bisect_left(self.descriptions, text)]
+        for gram in _trigrams(text):
+            numbers = self.trigrams[gram]
+            numbers.discard(number)
+            if not numbers:
+                del self.trigrams[gram]
+
+    def add(self, slot):
+        # Indexes a live slot: a new row, or an edited one after remove().
+        table = self.table
+        if slot < len(self.slot_text) and self.slot_text[slot] >= 0:
+            return
+        if slot >= len(self.slot_text):
+            self.slot_text.extend(repeat(-1, slot + 1 - len(self.slot_text)))
+        number = self._number(table.description(slot))
+        self.slot_text[slot] = number
+        day, amount = table.days[slot], self.amount_key(slot)
+        postings = self.postings[number]
+        if not postings:
+            self._show(number)
+        postings.insert(_position(postings, table.days.__getitem__, day, slot), slot)
+        self.by_date.insert(_position(self.by_date, table.days.__getitem__, day, slot), slot)
+        self.by_amount.insert(_position(self.by_amount, self.amount_key, amount, slot), slot)
+        self.size += 1
+
+    def remove(self, slot):
+        # Drops a slot; call it before the table row is overwritten.
+        if slot >= len(self.slot_text) or self.slot_text[slot] < 0:
+            return
+        table = self.table
+        number = self.slot_text[slot]
+        self.slot_text[slot] = -1
+        day, amount = table.days[slot], self.amount_key(slot)
+        postings = self.postings[number]
+        del postings[_position(postings, table.days.__getitem__, day, slot)]
+        if not postings:
+            self._hide(number)
+        del self.by_date[_position(self.by_date, table.days.__getitem__, day, slot)]
+        del self.by_amount[_position(self.by_amount, self.amount_key, amount, slot)]
+        self.size -= 1
+
+    @timed('search.index_build', rows=len)
+    def rebuild(self):
+        # Bulk build over the table's live slots: sort once instead of insort per row.
+        table = self.table
+        self.__init__(table)
+        live = table.live_slots()
+        days, paise = table.days, table.paise
+        # Rows with the same description share its bytes in the table, so
+        # each distinct (offset, length) span is decoded and numbered once.
+        spans = {}
+        buffer = table.buffer
+        for span in set(compress(zip(table.desc_start, table.desc_length), table.alive)):
+            spans[span] = self._number(buffer[span[0]:span[0] + span[1]].decode('utf-8'))
+        self.slot_text = array('i', map(spans.get, zip(table.desc_start, table.desc_length), repeat(-1)))
+        if len(live) < len(table.alive):
+            for slot in compress(range(len(table.alive)), map((0).__eq__, table.alive)):
+                self.slot_text[slot] = -1
+        # sorted() is stable and the live slots come in order, so equal keys stay in slot order.
+        self.by_date = array('i', sorted(live, key=days.__getitem__))
+        by_amount = sorted(live, key=paise.__getitem__)
+        odd = table.odd_amount_slots()
+        if odd:
+            by_amount = [slot for slot in by_amount if slot in odd] + [slot for slot in by_amount if slot not in odd]
+        self.by_amount = array('i', by_amount)
+        # Filling the postings in date order leaves each one sorted.
+        appends = [postings.append for postings in self.postings]
+        slot_text = self.slot_text
+        for slot in self.by_date:
+            appends[slot_text[slot]](slot)
+        self.descriptions = sorted(self.texts[number] for number, postings in enumerate(self.postings) if postings)
+        for number, text in enumerate(self.texts):
+            if self.postings[number]:
+                for gram in _trigrams(text):
+                    self.trigrams.setdefault(gram, set()).add(number)
+        self.size = len(live)
+        return self
+
+    def matching_descriptions(self, text, prefix=False):
+        # Numbers of the descriptions containing (or starting with) text.
+        text = text.lower()
+        if prefix:
+            matches = self.descriptions[bisect_left(self.descriptions, text):bisect_left(self.descriptions, text + _KEY_MAX)]
+            return [self.numbers[description] for description in matches]
+        if len(text) < TRIGRAM_SIZE:
+            candidates = (self.numbers[description] for description in self.descriptions)
+        else:
+            grams = sorted((self.trigrams.get(gram, ()) for gram in _trigrams(text)), key=len)
+            candidates = set(grams[0]).intersection(*grams[1:]) if grams else ()
+        return [number for number in candidates if text in self.texts[number]]
+
+    def _date_span(self, first_day, last_day):
+        days = self.table.days.__getitem__
+        lo = _position(self.by_date, days, first_day or _NO_DATE + 1)
+        hi = _position(self.by_date, days, last_day + 1) if last_day else len(self.by_date)
+        return lo, max(lo, hi)
+
+    def _amount_span(self, min_paise, max_paise):
+        lo = _position(self.by_amount, self.amount_key, _NO_AMOUNT + 1 if min_paise is None else min_paise)
+        hi = _position(self.by_amount, self.amount_key, max_paise + 1) if max_paise is not None else len(self.by_amount)
+        return lo, max(lo, hi)
+
+    @timed('search.query', rows=len)
+    def query(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+              sort='Date', descending=False, limit=None):
+        # Returns the matching slots ordered by the sort column (then by date
+        # for Description) and by slot, i.e. ledger order, among equal keys.
+        if sort not in SEARCH_COLUMNS:
+            raise ValidationError(f"Cannot sort by {sort}; use one of {', '.join(SEARCH_COLUMNS)}")
+        first_day = day_ordinal(start_date) if start_date else None
+        last_day = day_ordinal(end_date) if end_date else None
+        try:
+            min_paise = to_paise(min_amount) if min_amount not in (None, '') else None
+            max_paise = to_paise(max_amount) if max_amount not in (None, '') else None
+        except ValueError:
+            raise ValidationError("Amount filters must be numbers.")
+        by_date = first_day is not None or last_day is not None
+        by_amount = min_paise is not None or max_paise is not None
+        table = self.table
+
+        # Candidate sources with their sizes; the smallest one drives the query.
+        sources = []
+        numbers = None
+        if text:
+            numbers = sorted(self.matching_descriptions(text, prefix), key=self.texts.__getitem__)
+            sources.append((sum(len(self.postings[number]) for number in numbers), 'Description'))
+        if by_date:
+            lo, hi = self._date_span(first_day, last_day)
+            sources.append((hi - lo, 'Date'))
+        if by_amount:
+            lo, hi = self._amount_span(min_paise, max_paise)
+            sources.append((hi - lo, 'Amount'))
+        if not sources:
+            return self._ordered(None, sort, descending, limit)
+        _, driver = min(sources)
+        if driver == 'Description':
+            groups = [self.postings[number] for number in numbers]
+            if sort == 'Date' and len(groups) > 1:
+                candidates = sorted(chain.from_iterable(groups))
+                candidates.sort(key=table.days.__getitem__)
+            else:
+                candidates = chain.from_iterable(groups)
+            if sort == 'Date':
+                driver = 'Date' # Date-ordered already, nothing left to sort
+        elif driver == 'Date':
+            lo, hi = self._date_span(first_day, last_day)
+            candidates = self.by_date[lo:hi]
+        else:
+            lo, hi = self._amount_span(min_paise, max_paise)
+            candidates = self.by_amount[lo:hi]
+
+        if len(sources) == 1:
+            matched = list(islice(candidates, limit) if driver == sort and not descending else candidates)
+        else:
+            slot_text, days, paise = self.slot_text, table.days, table.paise
+            odd = table.odd_amount_slots()
+            wanted = set(numbers) if numbers is not None else None
+            first_day = first_day or _NO_DATE + 1
+            matched = []
+            for slot in candidates:
+                if wanted is not None and slot_text[slot] not in wanted:
+                    continue
+                if by_date and (days[slot] < first_day or (last_day is not None and days[slot] > last_day)):
+                    continue
+                if by_amount and (slot in odd or (min_paise is not None and paise[slot] < min_paise)
+                                  or (max_paise is not None and paise[slot] > max_paise)):
+                    continue
+                matched.append(slot)
+
+        if driver == sort:
+            if descending:
+                matched.reverse()
+            return matched[:limit]
+        if len(matched) * 8 < self.size:
+            matched.sort()
+            matched.sort(key=self.sort_key(sort))
+            if descending:
+                matched.reverse()
+            return matched[:limit]
+        # Large result sets: walk the column's sorted index instead of sorting.
+        return self._ordered(matched, sort, descending, limit)
+
+    def _ordered(self, wanted, sort, descending, limit):
+        # The sort column's index (limited to the wanted slots), sliced to limit.
+        if sort == 'Date':
+            ordered = self.by_date
+        elif sort == 'Amount':
+            ordered = self.by_amount
+        else:
+            ordered = array('i', chain.from_iterable(self.postings[self.numbers[description]]
+                                                     for description in self.descriptions))
+        if wanted is not None:
+            mask = bytearray(len(self.slot_text))
+            for slot in wanted:
+                mask[slot] = 1
+            ordered = array('i', compress(ordered, map(mask.__getitem__, ordered)))
+        if descending:
+            ordered = ordered[::-1]
+        return ordered[:limit]
@@ -0,0 +1,346 @@
+import asyncio
+import json
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from . import metrics
+from .config import SERVER_HOST, SERVER_PORT
+from .errors import ExpenseError, ValidationError
+from .records import validate_expense
+from .storage import get_store
+
+# --- Local JSON API Server ---
+# An asyncio HTTP/1.1 server over the shared store, so several people (or
+# several copies of app.py run with --server) can use one ledger without
+# lost updates:
+#   * Every mutation is queued to a single writer. It drains whatever has
+#     queued up since its last batch, applies it (consecutive adds as one
+#     add_many() call), then fsyncs once and answers every request in the
+#     batch. While one batch is being synced the next one collects, so the
+#     batch size grows with the load.
+#   * Edits are read-modify-write inside the writer, so they never race.
+#   * Reads are answered straight from the store's in-memory rows on a
+#     thread pool, without waiting for the fsync. They hold a lock the writer
+#     takes while it applies a batch, so a row is never read half-edited;
+#     they may see a batch a few milliseconds before its fsync has finished.
+# Routes (JSON in and out; dates YYYY-MM-DD):
+#   GET    /health
+#   GET    /expenses?text=&prefix=1&from=&to=&min_amount=&max_amount=&sort=&desc=1&limit=&offset=
+#   GET    /expenses/count?from=&to=
+#   GET    /expenses/<id>
+#   POST   /expenses              {"date", "description", "amount"} or a list of them
+#   PUT    /expenses/<id>         any of "date", "description", "amount"
+#   DELETE /expenses/<id>
+#   GET    /summary/month?year=&month=   /summary/year?year=   /summary/months   /summary/range?from=&to=
+#   POST   /summary/check         {"repair": false}
+#   GET    /analytics/daily?from=&to=
+#   GET    /metrics
+WRITE_BATCH_MAX = 1000           # Mutations applied per fsync at most
+READ_WORKERS = 4
+MAX_BODY_BYTES = 16 * 1024 * 1024
+SEARCH_PARAMS = ('text', 'prefix', 'from', 'to', 'min_amount', 'max_amount', 'sort', 'desc')
+HTTP_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def _entry(fields):
+    # (date, description, amount) from a JSON object, validated like the GUI does.
+    if not isinstance(fields, dict):
+        raise ValidationError("Each expense must be a JSON object")
+    date = str(fields.get('date', '')).strip()
+    description = str(fields.get('description', '')).strip()
+    return date, description, validate_expense(date, fields.get('amount'))
+
+class ExpenseServer:
+    def __init__(self, store=None, host=SERVER_HOST, port=SERVER_PORT):
+        self.store = store if store is not None else get_store()
+        self.host = host
+        self.port = port
+        self._queue = None
+        self._writer_task = None
+        self._server = None
+        self._connections = set()
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='expense-writer')
+        self._rows_lock = threading.Lock() # Held by the writer while it mutates, and by every read
+        self._read_pool = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix='expense-reader')
+
+    # --- Writer ---
+    async def _submit(self, op, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, args, future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH_MAX and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._write_pool, self._apply_batch, [(op, args) for op, args, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue # Client went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    @metrics.timed('server.write_batch')
+    def _apply_batch(self, batch):
+        # Runs on the writer thread. Returns one result (or exception) per op;
+        # the single sync() at the end is the batch's commit.
+        with self._rows_lock:
+            results = self._apply_ops(batch)
+        self._sync()
+        metrics.record('server.write_batch', rows=len(batch))
+        return results
+
+    def _apply_ops(self, batch):
+        store = self.store
+        results = [None] * len(batch)
+        i = 0
+        while i < len(batch):
+            op, args = batch[i]
+            if op == 'add':
+                # Consecutive adds (from any number of requests) share one add_many().
+                j = i
+                while j < len(batch) and batch[j][0] == 'add':
+                    j += 1
+                try:
+                    rows = store.add_many([entry for _, (entries,) in batch[i:j] for entry in entries])
+                    position = 0
+                    for k in range(i, j):
+                        count = len(batch[k][1][0])
+                        results[k] = [dict(row) for row in rows[position:position + count]]
+                        position += count
+                except Exception as e:
+                    results[i:j] = [e] * (j - i)
+                i = j
+                continue
+            try:
+                results[i] = self._apply(op, *args)
+            except Exception as e:
+                results[i] = e
+            i += 1
+        return results
+
+    @metrics.timed('server.fsync')
+    def _sync(self):
+        self.store.sync()
+
+    def _apply(self, op, *args):
+        store = self.store
+        if op == 'update':
+            expense_id, fields = args
+            current = store.get(expense_id)
+            if current is None:
+                return None
+            date = str(fields.get('date', current['Date'])).strip()
+            description = str(fields.get('description', current['Description'])).strip()
+            amount = validate_expense(date, fields.get('amount', current['Amount']), require_positive=False)
+            row = store.update(expense_id, date, description, amount)
+        elif op == 'delete':
+            row = store.delete(*args)
+        elif op == 'check_summary':
+            return store.check_summary(*args)
+        else:
+            raise ValidationError(f"Unknown write op: {op}")
+        return dict(row) if row is not None else None
+
+    # --- Reads ---
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._read_pool, self._locked, fn, args)
+
+    def _locked(self, fn, args):
+        # Row views read the live table, so they are turned into dicts
+        # before the writer can touch it again.
+        with self._rows_lock:
+            return fn(*args)
+
+    def _list(self, params):
+        # With offset, one page of the list: clients page through a big
+        # ledger (e.g. for an export) instead of fetching it in one response.
+        store = self.store
+        offset = int(params.get('offset') or 0)
+        limit = int(params['limit']) if params.get('limit') else None
+        if any(name in params for name in SEARCH_PARAMS):
+            rows = store.search(params.get('text'), _flag(params.get('prefix')), params.get('from'), params.get('to'),
+                                params.get('min_amount'), params.get('max_amount'), params.get('sort', 'Date'),
+                                _flag(params.get('desc')), offset + limit if limit is not None else None)
+        else:
+            rows = store.all()
+        end = offset + limit if limit is not None else len(rows)
+        return [dict(row) for row in rows[offset:end]]
+
+    def _get(self, expense_id):
+        row = self.store.get(expense_id)
+        if row is None:
+            raise HttpError(404, f"No expense with ID {expense_id}")
+        return dict(row)
+
+    # --- HTTP ---
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        parts = [part for part in url.path.split('/') if part]
+        data = json.loads(body) if body else {}
+        store = self.store
+        if parts == ['health'] and method == 'GET':
+            return 200, {'ok': True, 'rows': len(store)}
+        if parts == ['metrics'] and method == 'GET':
+            return 200, metrics.snapshot()
+        if parts == ['expenses']:
+            if method == 'GET':
+                return 200, await self._read(self._list, params)
+            if method == 'POST':
+                entries = [_entry(fields) for fields in (data if isinstance(data, list) else [data])]
+                rows = await self._submit('add', entries)
+                return 201, rows if isinstance(data, list) else rows[0]
+        elif parts == ['expenses', 'count'] and method == 'GET':
+            return 200, await self._read(store.count, params.get('from'), params.get('to'))
+        elif len(parts) == 2 and parts[0] == 'expenses':
+            expense_id = parts[1]
+            if method == 'GET':
+                return 200, await self._read(self._get, expense_id)
+            if method in ('PUT', 'DELETE'):
+                if method == 'PUT' and not isinstance(data, dict):
+                    raise ValidationError("Expected a JSON object")
+                row = await (self._submit('update', expense_id, data) if method == 'PUT' else self._submit('delete', expense_id))
+                if row is None:
+                    raise HttpError(404, f"No expense with ID {expense_id}")
+                return 200, row
+        elif parts[:1] == ['summary']:
+            if parts == ['summary', 'check'] and method == 'POST':
+                return 200, await self._submit('check_summary', bool(data.get('repair')))
+            if method == 'GET':
+                if parts == ['summary', 'month']:
+                    return 200, {'total': await self._read(store.month_total, int(params['year']), int(params['month']))}
+                if parts == ['summary', 'year']:
+                    return 200, {'total': await self._read(store.year_total, int(params['year']))}
+                if parts == ['summary', 'months']:
+                    return 200, await self._read(store.monthly_totals)
+                if parts == ['summary', 'range']:
+                    return 200, {'total': await self._read(store.range_total, params['from'], params['to'])}
+        elif parts == ['analytics', 'daily'] and method == 'GET':
+            return 200, await self._read(store.daily_report, params['from'], params['to'])
+        else:
+            raise HttpError(404, f"No route for {url.path}")
+        raise HttpError(405, f"{method} is not supported on {url.path}")
+
+    @metrics.timed('server.request')
+    async def _respond(self, method, target, body):
+        try:
+            return await self._dispatch(method, target, body)
+        except HttpError as e:
+            return e.status, {'error': str(e)}
+        except (ExpenseError, KeyError, ValueError) as e:
+            return 400, {'error': str(e) if not isinstance(e, KeyError) else f"Missing parameter {e}"}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def _handle(self, reader, writer):
+        # One connection; requests are answered in order (keep-alive).
+        self._connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body's end is unknown, so the connection cannot be reused.
+                    status, payload = 400, {'error': "Invalid Content-Length header"}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, payload = 413, {'error': "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self._respond(method.upper(), target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode('utf-8')
+                head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n" + ("" if keep_alive else "Connection: close\r\n") + "\r\n")
+                writer.write(head.encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1] # Resolves port=0
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive clients would otherwise hold wait_closed() open.
+            for writer in list(self._connections):
+                writer.close()
+            for _ in range(100):
+                if not self._connections:
+                    break
+                await asyncio.sleep(0.01)
+            await self._server.wait_closed()
+        # Let queued mutations finish before the writer goes away.
+        while self._queue is not None and not self._queue.empty():
+            await asyncio.sleep(0.01)
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        self._write_pool.shutdown(wait=True)
+        self._read_pool.shutdown(wait=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving expenses on http://{self.host}:{self.port} (Ctrl+C to stop)")
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stopped.set)
+            except (NotImplementedError, RuntimeError):
+                pass # Windows: Ctrl+C raises KeyboardInterrupt instead
+        try:
+            await stopped.wait()
+        finally:
+            await self.stop()
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, store=None):
+    # Runs until interrupted; the caller closes the store afterwards.
+    try:
+        asyncio.run(ExpenseServer(store, host, port).serve_forever())
+    except KeyboardInterrupt:
+        pass
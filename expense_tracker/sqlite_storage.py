@@ -0,0 +1,237 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from .config import DB_FILE, EXPENSE_FILE
+from .daily import DailyIndex
+from .errors import ValidationError
+from .records import canonical_date, row_month_amount
+from .search import SEARCH_COLUMNS
+from .storage import CsvStorage, StorageBackend
+
+# --- SQLite Storage ---
+# Same interface as CsvStorage, backed by a WAL-mode database. Summaries are
+# SUM ... GROUP BY queries answered from the (Date, Amount) index, which also
+# covers them, so the table rows are never touched. Dates are stored in
+# canonical YYYY-MM-DD form so that string ranges match calendar ranges.
+# Sums add whole paise, which floats hold exactly, so totals match the CSV
+# backend's integer ones.
+SQLITE_MIGRATION_BATCH = 5000
+
+class SqliteStorage(StorageBackend):
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS expenses (ID TEXT PRIMARY KEY, Date TEXT NOT NULL, Description TEXT NOT NULL, Amount REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (Date, Amount)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_amount ON expenses (Amount)",
+    )
+    SELECT_ALL = "SELECT ID, Date, Description, Amount FROM expenses ORDER BY rowid"
+    SELECT_ONE = "SELECT ID, Date, Description, Amount FROM expenses WHERE ID = ?"
+    COUNT = "SELECT COUNT(*) FROM expenses"
+    INSERT = "INSERT INTO expenses (ID, Date, Description, Amount) VALUES (?, ?, ?, ?)"
+    UPSERT = "INSERT OR REPLACE INTO expenses (ID, Date, Description, Amount) VALUES (?, ?, ?, ?)"
+    UPDATE = "UPDATE expenses SET Date = ?, Description = ?, Amount = ? WHERE ID = ?"
+    DELETE = "DELETE FROM expenses WHERE ID = ?"
+    RANGE_SUM = "SELECT TOTAL(round(Amount * 100)) / 100 FROM expenses WHERE Date >= ? AND Date < ?"
+    COUNT_RANGE = "SELECT COUNT(*) FROM expenses WHERE Date >= ? AND Date <= ?"
+    SELECT_CHUNK = ("SELECT rowid, ID, Date, Description, Amount FROM expenses "
+                    "WHERE rowid > ? AND Date >= ? AND Date <= ? ORDER BY rowid LIMIT ?")
+    DAILY_SUMS = "SELECT Date, TOTAL(round(Amount * 100)), COUNT(*) FROM expenses GROUP BY Date"
+    MONTHLY_SUMS = "SELECT substr(Date, 1, 7) AS month, TOTAL(round(Amount * 100)) / 100 FROM expenses GROUP BY month ORDER BY month"
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        # sqlite3 keeps a per-connection cache of compiled statements, so the
+        # constant SQL strings above are prepared once and reused.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+        return self
+
+    @staticmethod
+    def _to_row(record):
+        return {'ID': record[0], 'Date': record[1], 'Description': record[2], 'Amount': str(record[3])}
+
+    def all(self):
+        with self._lock:
+            return [self._to_row(r) for r in self._conn.execute(self.SELECT_ALL)]
+
+    def get(self, expense_id):
+        with self._lock:
+            record = self._conn.execute(self.SELECT_ONE, (expense_id,)).fetchone()
+        return self._to_row(record) if record else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(self.COUNT).fetchone()[0]
+
+    def add(self, date, description, amount):
+        row = {'ID': str(uuid.uuid4()), 'Date': canonical_date(date), 'Description': description, 'Amount': str(amount)}
+        with self._lock, self._conn:
+            self._conn.execute(self.INSERT, (row['ID'], row['Date'], description, float(amount)))
+        return row
+
+    def add_many(self, entries):
+        rows = [{'ID': str(uuid.uuid4()), 'Date': canonical_date(date), 'Description': description, 'Amount': str(amount)}
+                for date, description, amount in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(self.INSERT, ((r['ID'], r['Date'], r['Description'], float(r['Amount'])) for r in rows))
+        return rows
+
+    def update(self, expense_id, date, description, amount):
+        row = {'ID': expense_id, 'Date': canonical_date(date), 'Description': description, 'Amount': str(amount)}
+        with self._lock, self._conn:
+            cursor = self._conn.execute(self.UPDATE, (row['Date'], description, float(amount), expense_id))
+        return row if cursor.rowcount else None
+
+    def delete(self, expense_id):
+        with self._lock, self._conn:
+            row = self.get(expense_id)
+            if row is not None:
+                self._conn.execute(self.DELETE, (expense_id,))
+        return row
+
+    def _range_sum(self, start, end):
+        with self._lock:
+            return self._conn.execute(self.RANGE_SUM, (start, end)).fetchone()[0]
+
+    def month_total(self, year, month):
+        year, month = int(year), int(month)
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return self._range_sum(f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01")
+
+    def year_total(self, year):
+        return self._range_sum(f"{int(year):04d}-01-01", f"{int(year) + 1:04d}-01-01")
+
+    def monthly_totals(self):
+        # Rows with unparseable dates group under junk keys; drop those like
+        # the CSV index does.
+        with self._lock:
+            return {month: total for month, total in self._conn.execute(self.MONTHLY_SUMS)
+                    if row_month_amount({'Date': month + '-01', 'Amount': total})}
+
+    def range_total(self, start_date, end_date):
+        # Inclusive end date, like DailyIndex.range_total.
+        start = canonical_date(str(start_date)[:10])
+        end = (datetime.strptime(str(end_date)[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        return self._range_sum(start, end)
+
+    def daily_report(self, start_date, end_date):
+        # One row per distinct date from the covering index, so the daily
+        # index is rebuilt per report instead of being kept in memory.
+        totals = {}
+        with self._lock:
+            for day, paise, rows in self._conn.execute(self.DAILY_SUMS):
+                try:
+                    totals[datetime.strptime(day, '%Y-%m-%d').toordinal()] = (int(paise), rows)
+                except ValueError:
+                    continue
+        return DailyIndex().rebuild_days(totals).report(start_date, end_date)
+
+    def count(self, start_date=None, end_date=None):
+        if start_date is None and end_date is None:
+            return len(self)
+        with self._lock:
+            return self._conn.execute(self.COUNT_RANGE, (start_date or '', end_date or '\uffff')).fetchone()[0]
+
+    def iter_chunks(self, chunk_size, start_date=None, end_date=None):
+        # Keyset pagination on rowid: each chunk is its own short query, so
+        # the lock is never held while the caller is busy writing a chunk.
+        last_rowid = 0
+        while True:
+            with self._lock:
+                records = self._conn.execute(self.SELECT_CHUNK, (last_rowid, start_date or '', end_date or '\uffff', chunk_size)).fetchall()
+            if not records:
+                return
+            last_rowid = records[-1][0]
+            yield [self._to_row(record[1:]) for record in records]
+
+    def search(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+               sort='Date', descending=False, limit=None):
+        # Date and amount ranges are served by their indexes; LIKE is
+        # case-insensitive for ASCII, like SearchIndex.
+        if sort not in SEARCH_COLUMNS:
+            raise ValidationError(f"Cannot sort by {sort}; use one of {', '.join(SEARCH_COLUMNS)}")
+        clauses, params = [], []
+        if text:
+            escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("Description LIKE ? ESCAPE '\\'")
+            params.append((escaped if prefix else '%' + escaped) + '%')
+        for column, op, value in (('Date', '>=', start_date), ('Date', '<=', end_date),
+                                  ('Amount', '>=', min_amount), ('Amount', '<=', max_amount)):
+            if value in (None, ''):
+                continue
+            if column == 'Date':
+                value = canonical_date(value)
+            else:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    raise ValidationError("Amount filters must be numbers.")
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+        order = ' DESC' if descending else ''
+        key = f'lower(Description){order}, Date' if sort == 'Description' else sort
+        sql = "SELECT ID, Date, Description, Amount FROM expenses"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {key}{order}, ID{order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return [self._to_row(r) for r in self._conn.execute(sql, params)]
+
+    def insert_many(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(self.UPSERT, ((r['ID'], canonical_date(r['Date']), r['Description'], float(r['Amount']))
+                                                 for r in rows))
+
+    def sync(self):
+        # synchronous=NORMAL leaves the latest commits in the WAL without an
+        # fsync; a FULL checkpoint syncs the WAL, copies it into the database
+        # and syncs that too, so the server's acknowledged batches survive a
+        # power loss.
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def migrate_csv_to_sqlite(csv_path=EXPENSE_FILE, db_path=DB_FILE, batch_size=SQLITE_MIGRATION_BATCH):
+    # One-shot copy of an existing ledger (including any pending journal
+    # entries) into SQLite. Rows whose amount is not a number are skipped and
+    # returned so they can be fixed by hand. Safe to re-run: IDs are upserted.
+    source = CsvStorage(csv_path).load()
+    target = SqliteStorage(db_path).load()
+    migrated, skipped, batch = 0, [], []
+    try:
+        for row in source.all():
+            try:
+                float(row['Amount'])
+            except (TypeError, ValueError):
+                skipped.append(row)
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                target.insert_many(batch)
+                migrated += len(batch)
+                batch = []
+        if batch:
+            target.insert_many(batch)
+            migrated += len(batch)
+    finally:
+        target.close()
+        source.close()
+    return migrated, skipped
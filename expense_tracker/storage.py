@@ -0,0 +1,638 @@
+import csv
+import os
+import threading
+import uuid
+
+from .config import (COMPACT_THRESHOLD, EXPENSE_FILE, HEADERS, JOURNAL_ADD, JOURNAL_DELETE, JOURNAL_SUFFIX,
+                     JOURNAL_UPDATE, SUMMARY_SUFFIX)
+from . import config
+from .columnar import malformed_row, read_ledger_columns, table_day_totals, table_monthly_index, unparsed_fields
+from .daily import DailyIndex
+from .errors import CsvHeaderError, ExpenseError, StorageError
+from .metrics import file_size, record, timed
+from .records import canonical_date, validate_expense
+from .search import SearchIndex
+from .summary import MonthlyIndex
+from .table import ExpenseTable, RowList
+
+# --- Storage Interface ---
+# Every backend stores rows as dicts of strings keyed by HEADERS and returns
+# the affected row (or None when the ID is unknown) from its mutators.
+class StorageBackend:
+    def load(self):
+        return self
+
+    def all(self):
+        raise NotImplementedError
+
+    def get(self, expense_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def add(self, date, description, amount):
+        raise NotImplementedError
+
+    def add_many(self, entries):
+        # entries are (date, description, amount) tuples already validated.
+        return [self.add(*entry) for entry in entries]
+
+    def update(self, expense_id, date, description, amount):
+        raise NotImplementedError
+
+    def delete(self, expense_id):
+        raise NotImplementedError
+
+    def month_total(self, year, month):
+        raise NotImplementedError
+
+    def year_total(self, year):
+        raise NotImplementedError
+
+    def monthly_totals(self):
+        raise NotImplementedError
+
+    def range_total(self, start_date, end_date):
+        raise NotImplementedError
+
+    def count(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    def iter_chunks(self, chunk_size, start_date=None, end_date=None):
+        # Yields lists of at most chunk_size rows in ledger order, optionally
+        # limited to an inclusive YYYY-MM-DD date range.
+        raise NotImplementedError
+
+    def search(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+               sort='Date', descending=False, limit=None):
+        # Rows whose Description contains text (or starts with it, with
+        # prefix=True), case-insensitively, within the inclusive date and
+        # amount ranges, ordered by sort ('Date', 'Description' or 'Amount').
+        # Backends without an index of their own copy their rows into a
+        # throwaway table; slot i is then row i.
+        rows = list(self.all())
+        table = ExpenseTable()
+        for row in rows:
+            table.append(row['ID'], row['Date'], row['Description'], row['Amount'])
+        slots = SearchIndex(table).rebuild().query(text, prefix, start_date, end_date, min_amount, max_amount,
+                                                   sort, descending, limit)
+        return [rows[slot] for slot in slots]
+
+    def check_summary(self, repair=False):
+        return []
+
+    def daily_report(self, start_date, end_date):
+        # Range total, rolling averages, year-over-year and weekday figures
+        # (see DailyIndex.report). Backends that keep a DailyIndex current
+        # override this; the default builds one from all rows.
+        return DailyIndex().rebuild(self.all()).report(start_date, end_date)
+
+    def sync(self):
+        # Forces writes made so far to disk (fsync); the server calls it once
+        # per batch of mutations.
+        pass
+
+    def close(self):
+        pass
+
+def fsync_directory(path):
+    # Makes a rename or a newly created file in path's directory durable.
+    # Windows cannot open a directory for fsync (NTFS journals the rename
+    # itself), so there is nothing to do there.
+    if os.name == 'nt':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_ledger_csv(path, table=None):
+    # Reads a ledger CSV (HEADERS first) into an ExpenseTable and returns it.
+    # Module level so process pools can run it too. A fresh table is filled
+    # column-wise when NumPy is there (see columnar.py); the row-by-row path
+    # below gives the same table and the same table.load_errors report.
+    table = ExpenseTable() if table is None else table
+    if not len(table.alive) and read_ledger_columns(path, table) is not None:
+        return table
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header != HEADERS:
+            raise CsvHeaderError(f"CSV file headers are incorrect. Expected {HEADERS}, found {header}. Please fix the CSV or delete it to regenerate.")
+        append, errors = table.append, table.load_errors
+        odd_dates, odd_amounts = table.odd_date_slots(), table.odd_amount_slots()
+        line = reader.line_num
+        for entry in reader:
+            line, start = reader.line_num, line + 1
+            if len(entry) == 4:
+                slot = append(entry[0], entry[1], entry[2], entry[3])
+                if slot in odd_dates or slot in odd_amounts:
+                    errors.extend(unparsed_fields(start, table, slot))
+                continue
+            errors.append(malformed_row(start, entry))
+            if entry:
+                entry += [None] * (4 - len(entry))
+                append(entry[0], entry[1], entry[2], entry[3])
+    table.reindex()
+    return table
+
+def trim_torn_tail(path):
+    # Cuts a journal back to its last complete entry. A crash mid-write can
+    # leave a partial last line; the next session appends in 'a' mode, so
+    # its first entry would land on that line and be skipped as torn too.
+    # An entry ends at a newline outside quotes, i.e. after an even number
+    # of '"' (the csv module doubles quotes inside fields).
+    try:
+        file = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with file:
+        end = complete = quotes = 0
+        for line in file:
+            end += len(line)
+            quotes += line.count(b'"')
+            if line.endswith(b'\n') and quotes % 2 == 0:
+                complete = end
+        if complete < end:
+            file.truncate(complete)
+            file.flush()
+            os.fsync(file.fileno())
+
+# --- CSV Storage (in-memory index + append-only change journal) ---
+# expenses.csv is loaded once into a packed ExpenseTable (see table.py) and
+# rows are handed out as ExpenseRow views of it. Every add/edit/delete
+# is appended as one line to <path>.journal instead of rewriting the CSV, and
+# once the journal grows past COMPACT_THRESHOLD entries it is folded back
+# into expenses.csv by a background thread.
+class CsvStorage(StorageBackend):
+    def __init__(self, path=EXPENSE_FILE, journal_path=None, compact_threshold=COMPACT_THRESHOLD,
+                 summary_path=None):
+        self.path = path
+        self.journal_path = journal_path or path + JOURNAL_SUFFIX
+        self.compacting_path = self.journal_path + '.compacting'
+        self.summary_path = summary_path or path + SUMMARY_SUFFIX
+        self.summary = MonthlyIndex()
+        self.compact_threshold = compact_threshold
+        self.table = ExpenseTable()
+        self._search = SearchIndex(self.table)
+        self._daily = None  # DailyIndex, built on first use
+        self._lock = threading.RLock()
+        self._journal = None
+        self._journal_created = False
+        self._journal_entries = 0
+        self._compact_thread = None
+        self.compact_error = None # StorageError of the last background compaction, if it failed
+        self.summary_error = None # StorageError of the last failed summary save in close()
+        self.load_errors = []     # {'line', 'error'} per malformed row of the CSV at the last load()
+
+    def _stamp(self):
+        stamp = []
+        for path in (self.path, self.compacting_path, self.journal_path):
+            try:
+                st = os.stat(path)
+                stamp.append([st.st_size, st.st_mtime_ns])
+            except FileNotFoundError:
+                stamp.append(None)
+        return stamp
+
+    @timed('csv.load', rows=len)
+    def load(self):
+        with self._lock:
+            table = self.table = ExpenseTable()
+            self._daily = None
+            trim_torn_tail(self.journal_path)
+            stamp = self._stamp()
+            try:
+                read_ledger_csv(self.path, table)
+            except FileNotFoundError:
+                pass
+            except (OSError, csv.Error, UnicodeDecodeError) as e:
+                raise StorageError(f"Could not read expenses from CSV: {e}") from e
+            self.load_errors = table.load_errors
+            # A leftover .compacting journal means a compaction was interrupted;
+            # replay is idempotent so applying it on top of the CSV is safe.
+            self._replay(self.compacting_path)
+            self._journal_entries = self._replay(self.journal_path)
+            record('csv.load', bytes_read=sum(file_size(path) for path in (self.path, self.compacting_path, self.journal_path)))
+            self.summary = MonthlyIndex.load(self.summary_path, stamp) or table_monthly_index(table)
+            # Built here rather than on the first search(), which would hold
+            # the lock for the whole build while other callers wait.
+            self._search = SearchIndex(table).rebuild()
+        self._maybe_compact()
+        return self
+
+    def _replay(self, journal_path):
+        count = 0
+        try:
+            with open(journal_path, 'r', newline='') as file:
+                for entry in csv.reader(file):
+                    if len(entry) != len(HEADERS) + 1:
+                        continue # Torn write at the tail of the journal
+                    op, expense_id, date, description, amount = entry
+                    if op == JOURNAL_DELETE:
+                        slot = self.table.find(expense_id)
+                        if slot >= 0:
+                            self.table.remove(slot)
+                    else:
+                        self.table.put(expense_id, date, description, amount)
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def _append_journal(self, op, row):
+        self._append_journal_many(op, [row])
+
+    def _append_journal_many(self, op, rows):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', newline='')
+            self._journal_writer = csv.writer(self._journal)
+            # A journal created just now (first write, or after a compaction
+            # rotated the old one away) needs its directory entry synced too.
+            self._journal_created = self._journal.tell() == 0
+        start = self._journal.tell()
+        self._journal_writer.writerows([op] + [row[h] for h in HEADERS] for row in rows)
+        self._journal.flush()
+        self._journal_entries += len(rows)
+        record('csv.journal_write', rows=len(rows), bytes_written=self._journal.tell() - start)
+
+    def all(self):
+        # A lazy sequence of views over the rows live right now.
+        with self._lock:
+            return self.table.rows()
+
+    def get(self, expense_id):
+        with self._lock:
+            slot = self.table.find(expense_id)
+            return self.table.row(slot) if slot >= 0 else None
+
+    def __len__(self):
+        return self.table.live
+
+    def add(self, date, description, amount):
+        entry = {'ID': str(uuid.uuid4()), 'Date': date, 'Description': description, 'Amount': str(amount)}
+        with self._lock:
+            self._append_journal(JOURNAL_ADD, entry)
+            slot = self.table.insert(entry['ID'], date, description, entry['Amount'])
+            row = self.table.row(slot)
+            self.summary.apply(row)
+            if self._daily is not None:
+                self._daily.apply(row)
+            self._search.add(slot)
+        self._maybe_compact()
+        return row
+
+    def add_many(self, entries):
+        entries = [{'ID': str(uuid.uuid4()), 'Date': date, 'Description': description, 'Amount': str(amount)}
+                   for date, description, amount in entries]
+        rows = []
+        with self._lock:
+            self._append_journal_many(JOURNAL_ADD, entries)
+            table = self.table
+            for entry in entries:
+                slot = table.insert(entry['ID'], entry['Date'], entry['Description'], entry['Amount'])
+                row = table.row(slot)
+                rows.append(row)
+                self.summary.apply(row)
+                if self._daily is not None:
+                    self._daily.apply(row)
+                self._search.add(slot)
+        self._maybe_compact()
+        return rows
+
+    def update(self, expense_id, date, description, amount):
+        with self._lock:
+            slot = self.table.find(expense_id)
+            if slot < 0:
+                return None
+            entry = {'ID': expense_id, 'Date': date, 'Description': description, 'Amount': str(amount)}
+            self._append_journal(JOURNAL_UPDATE, entry)
+            row = self.table.row(slot)
+            self.summary.apply(row, -1)
+            if self._daily is not None:
+                self._daily.apply(row, -1)
+            self._search.remove(slot)
+            self.table.overwrite(slot, date, description, entry['Amount'])
+            self.summary.apply(row)
+            if self._daily is not None:
+                self._daily.apply(row)
+            self._search.add(slot)
+        self._maybe_compact()
+        return row
+
+    def delete(self, expense_id):
+        with self._lock:
+            slot = self.table.find(expense_id)
+            if slot < 0:
+                return None
+            row = self.table.row(slot)
+            self._append_journal(JOURNAL_DELETE, row)
+            self._search.remove(slot)
+            self.table.remove(slot)
+            self.summary.apply(row, -1)
+            if self._daily is not None:
+                self._daily.apply(row, -1)
+        self._maybe_compact()
+        return row
+
+    def sync(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                if self._journal_created:
+                    fsync_directory(self.journal_path)
+                    self._journal_created = False
+
+    def _maybe_compact(self):
+        if self._journal_entries >= self.compact_threshold:
+            self.compact(background=True)
+
+    def compact(self, background=False):
+        with self._lock:
+            if self._compact_thread and self._compact_thread.is_alive():
+                return
+            if self._journal_entries == 0 and not os.path.exists(self.compacting_path):
+                return
+            # Rotate the journal: writes from now on go to a fresh file while the
+            # snapshot (which already includes the rotated entries) is written out.
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.compacting_path):
+                    with open(self.compacting_path, 'a', newline='') as dst, open(self.journal_path, 'r', newline='') as src:
+                        dst.write(src.read())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.compacting_path)
+            self._journal_entries = 0
+            self.compact_error = None
+            # Views read the live table, so an edit made while the snapshot is
+            # written may already show up in it. That is harmless: the edit is
+            # in the new journal too and replaying it is idempotent.
+            snapshot = self.table.rows()
+        if background:
+            self._compact_thread = threading.Thread(target=self._compact_in_background, args=(snapshot,), daemon=True)
+            self._compact_thread.start()
+        else:
+            self._write_snapshot(snapshot)
+
+    def _compact_in_background(self, snapshot):
+        try:
+            self._write_snapshot(snapshot)
+        except StorageError as e:
+            # Counted as an error under csv.compact; close() retries the
+            # compaction in the foreground, where a failure is raised.
+            self.compact_error = e
+
+    @timed('csv.compact')
+    def _write_snapshot(self, snapshot):
+        # The rotated journal is removed only once the new CSV is durable:
+        # the snapshot is fsync'd, renamed over the old file and the rename
+        # itself fsync'd. Until then a crash leaves the old CSV plus the
+        # .compacting journal, which the next load replays.
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=HEADERS)
+                writer.writeheader()
+                writer.writerows(snapshot)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+            fsync_directory(self.path)
+            os.remove(self.compacting_path)
+            record('csv.compact', rows=len(snapshot), bytes_written=file_size(self.path))
+        except (OSError, csv.Error) as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise StorageError(f"Compaction of {self.path} failed: {e}") from e
+
+    @timed('csv.save_summary')
+    def _save_summary(self):
+        self.summary.save(self.summary_path, self._stamp())
+
+    def close(self):
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+        try:
+            self.compact()
+        finally:
+            with self._lock:
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                try:
+                    self._save_summary()
+                except OSError as e:
+                    # Only a cache: the next load rebuilds it from the rows.
+                    # Counted as an error under csv.save_summary.
+                    self.summary_error = StorageError(f"Could not save summary index: {e}")
+
+    def month_total(self, year, month):
+        with self._lock:
+            return self.summary.month_total(year, month)
+
+    def year_total(self, year):
+        with self._lock:
+            return self.summary.year_total(year)
+
+    def monthly_totals(self):
+        with self._lock:
+            return self.summary.monthly_totals()
+
+    def _daily_index(self):
+        # Built from the in-memory table on first use, then kept current by
+        # add/update/delete, so range queries never re-read the CSV.
+        if self._daily is None:
+            self._daily = DailyIndex().rebuild_days(table_day_totals(self.table))
+        return self._daily
+
+    def range_total(self, start_date, end_date):
+        with self._lock:
+            return self._daily_index().range_total(start_date, end_date)
+
+    def daily_report(self, start_date, end_date):
+        with self._lock:
+            return self._daily_index().report(start_date, end_date)
+
+    @staticmethod
+    def _in_range(row, start_date, end_date):
+        date = canonical_date(row['Date'])
+        return (start_date is None or date >= start_date) and (end_date is None or date <= end_date)
+
+    def count(self, start_date=None, end_date=None):
+        if start_date is None and end_date is None:
+            return self.table.live
+        return sum(1 for row in self.all() if self._in_range(row, start_date, end_date))
+
+    def iter_chunks(self, chunk_size, start_date=None, end_date=None):
+        # Iterates a snapshot of row references, so writers may keep working.
+        rows = self.all()
+        if start_date is None and end_date is None:
+            for i in range(0, len(rows), chunk_size):
+                yield rows[i:i + chunk_size]
+            return
+        chunk = []
+        for row in rows:
+            if self._in_range(row, start_date, end_date):
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def search(self, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+               sort='Date', descending=False, limit=None):
+        with self._lock:
+            slots = self._search.query(text, prefix, start_date, end_date, min_amount, max_amount, sort, descending, limit)
+            return RowList(self.table, slots)
+
+    def check_summary(self, repair=False):
+        # Rebuilds the index from the rows on disk and reports any (kind, key,
+        # stored, rebuilt) mismatches against the incrementally maintained one.
+        with self._lock:
+            rebuilt = table_monthly_index(self.table)
+            mismatches = self.summary.diff(rebuilt)
+            if repair:
+                self.summary = rebuilt
+        return mismatches
+
+# --- Shared Store ---
+# One open store per process, created on first use. use_backend() switches
+# the backend (and optionally the file or directory) that get_store() opens.
+STORAGE_BACKENDS = ('csv', 'sqlite', 'partitioned', 'remote')
+_store = None
+_store_lock = threading.Lock()
+_store_path = None
+
+def open_store(backend=None, path=None):
+    backend = backend or config.STORAGE_BACKEND
+    if backend == 'csv':
+        return CsvStorage(path or EXPENSE_FILE).load()
+    if backend == 'sqlite':
+        from .sqlite_storage import SqliteStorage
+        return SqliteStorage(path or config.DB_FILE).load()
+    if backend == 'partitioned':
+        from .partitioned import PartitionedStorage
+        return PartitionedStorage(path or config.PARTITION_DIR).load()
+    if backend == 'remote':
+        from .remote import RemoteStorage
+        return RemoteStorage(path or config.SERVER_URL).load()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def use_backend(backend, path=None):
+    global _store_path
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    close_store()
+    config.STORAGE_BACKEND = backend
+    _store_path = path
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(path=_store_path)
+    return _store
+
+def close_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+def initialize_csv(path=EXPENSE_FILE):
+    if not os.path.exists(path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADERS)
+        print(f"Created new expense file: {path}")
+    else:
+        with open(path, 'r', newline='') as file:
+            reader = csv.reader(file)
+            first_row = next(reader, None)
+            if first_row != HEADERS:
+                raise CsvHeaderError("Your CSV file headers might be outdated or missing 'ID' column. Please consider starting with a fresh CSV.")
+
+# --- Expense Functions ---
+# The original function API, kept for the GUI: mutators return
+# (success, message) instead of raising, queries return plain values.
+@timed('storage.get_all_expenses', rows=len)
+def get_all_expenses():
+    return get_store().all()
+
+@timed('storage.get_expense')
+def get_expense(expense_id):
+    return get_store().get(expense_id)
+
+@timed('storage.add_expense')
+def add_expense_to_csv(date, description, amount):
+    try:
+        amount_float = validate_expense(date, amount)
+        get_store().add(date, description, amount_float)
+        return True, "Expense added successfully!"
+    except ExpenseError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"An error occurred: {e}"
+
+@timed('storage.update_expense')
+def update_expense_in_csv(expense_id, new_date, new_description, new_amount):
+    store = get_store()
+    if store.get(expense_id) is None:
+        return False, "Expense not found for update."
+    try:
+        amount_float = validate_expense(new_date, new_amount, require_positive=False)
+    except ExpenseError:
+        return False, "Invalid amount or date format for update."
+    try:
+        store.update(expense_id, new_date, new_description, amount_float)
+        return True, "Expense updated successfully!"
+    except Exception as e:
+        return False, f"Error updating expense: {e}"
+
+@timed('storage.delete_expense')
+def delete_expense_from_csv(expense_id):
+    try:
+        if get_store().delete(expense_id) is None:
+            return False, "Expense not found for deletion."
+        return True, "Expense deleted successfully!"
+    except Exception as e:
+        return False, f"Error deleting expense: {e}"
+
+@timed('aggregate.monthly_summary')
+def get_monthly_summary(year, month):
+    return get_store().month_total(year, month)
+
+@timed('aggregate.yearly_summary')
+def get_yearly_summary(year):
+    return get_store().year_total(year)
+
+@timed('aggregate.monthly_totals', rows=len)
+def get_monthly_totals_for_graph():
+    return get_store().monthly_totals()
+
+@timed('aggregate.check_summary')
+def check_summary_index(repair=False):
+    return get_store().check_summary(repair)
+
+@timed('aggregate.date_range_total')
+def get_date_range_total(start_date, end_date):
+    return get_store().range_total(start_date, end_date)
+
+@timed('aggregate.daily_report')
+def get_daily_report(start_date, end_date):
+    return get_store().daily_report(start_date, end_date)
+
+@timed('storage.search_expenses', rows=len)
+def search_expenses(text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None,
+                    sort='Date', descending=False, limit=None):
+    return get_store().search(text, prefix, start_date, end_date, min_amount, max_amount, sort, descending, limit)
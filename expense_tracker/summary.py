@@ -0,0 +1,76 @@
+import json
+import os
+
+from .records import row_month_paise
+from .table import ExpenseRow
+
+# --- Monthly Aggregate Index ---
+# Per-month and per-year (total, count) pairs kept up to date by applying
+# deltas on every add/edit/delete, so summaries never rescan the ledger.
+# Totals are integer paise, so they stay exact however many deltas pile up.
+# The index is saved next to the CSV with a stamp of the files it was built
+# from; a stale or missing stamp simply triggers a rebuild on load.
+SUMMARY_VERSION = 2 # Version 1 files held float rupee totals
+
+class MonthlyIndex:
+    def __init__(self):
+        self.months = {}
+        self.years = {}
+
+    def apply(self, row, sign=1):
+        entry = row.month_paise() if isinstance(row, ExpenseRow) else row_month_paise(row)
+        if entry is None:
+            return
+        month_key, paise = entry
+        for table, key in ((self.months, month_key), (self.years, month_key[:4])):
+            total, count = table.get(key, (0, 0))
+            count += sign
+            if count <= 0:
+                table.pop(key, None)
+            else:
+                table[key] = (total + sign * paise, count)
+
+    def rebuild(self, rows):
+        self.months = {}
+        self.years = {}
+        for row in rows:
+            self.apply(row)
+        return self
+
+    def month_total(self, year, month):
+        return self.months.get(f"{int(year):04d}-{int(month):02d}", (0, 0))[0] / 100
+
+    def year_total(self, year):
+        return self.years.get(f"{int(year):04d}", (0, 0))[0] / 100
+
+    def monthly_totals(self):
+        return {key: total / 100 for key, (total, _) in sorted(self.months.items())}
+
+    def diff(self, other):
+        mismatches = []
+        for name, mine, theirs in (('month', self.months, other.months), ('year', self.years, other.years)):
+            for key in sorted(set(mine) | set(theirs)):
+                a, b = mine.get(key, (0, 0)), theirs.get(key, (0, 0))
+                if a != b:
+                    mismatches.append((name, key, a, b))
+        return mismatches
+
+    def save(self, path, stamp):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'version': SUMMARY_VERSION, 'stamp': stamp, 'months': self.months, 'years': self.years}, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, stamp):
+        try:
+            with open(path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SUMMARY_VERSION or data.get('stamp') != stamp:
+            return None
+        index = cls()
+        index.months = {k: tuple(v) for k, v in data['months'].items()}
+        index.years = {k: tuple(v) for k, v in data['years'].items()}
+        return index
@@ -0,0 +1,441 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import date, datetime
+from itertools import chain, compress
+
+from .config import HEADERS
+from .records import format_paise, to_paise
+
+# --- Compact Expense Table ---
+# Expenses are kept column-wise in packed arrays instead of one dict of four
+# strings per row:
+#   ID           the 16 UUID bytes, in one bytearray
+#   Date         day ordinal (date.toordinal()), array('i')
+#   Amount       integer paise, array('q'), so totals are exact
+#   Description  UTF-8 bytes in one shared buffer, found by offset and length;
+#                repeated descriptions point at the same bytes
+# IDs are looked up through an open-addressing hash table of slot numbers.
+# Slots are never reused: deleting only clears the slot's alive flag, so
+# ledger order is slot order and ExpenseRow views never change identity.
+# Values that do not fit the packed form (IDs that are not lower-case UUIDs,
+# unparseable dates or amounts) are kept verbatim in small side dicts.
+DESCRIPTION_POOL_LIMIT = 100000 # Distinct descriptions remembered for sharing
+_EMPTY = 0                      # Hash table entries hold slot + 1
+_REMOVED = -1
+_MIN_INDEX_SIZE = 8
+
+def _uuid_bytes(text):
+    if len(text) != 36 or text[8] != '-' or text[13] != '-' or text[18] != '-' or text[23] != '-' or text != text.lower():
+        return None
+    try:
+        key = bytes.fromhex(text.replace('-', ''))
+    except ValueError:
+        return None
+    return key if len(key) == 16 else None
+
+def _day_ordinal(text):
+    try:
+        if len(text) == 10 and text[4] == '-' and text[7] == '-':
+            return date.fromisoformat(text).toordinal()
+        return datetime.strptime(text, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        return None
+
+class ExpenseRow(Mapping):
+    # Read-only view of one slot with the same keys as a CSV row dict.
+    __slots__ = ('_table', '_slot')
+
+    def __init__(self, table, slot):
+        self._table = table
+        self._slot = slot
+
+    def __getitem__(self, key):
+        if key == 'ID':
+            return self._table.id_text(self._slot)
+        if key == 'Date':
+            return self._table.date_text(self._slot)
+        if key == 'Description':
+            return self._table.description(self._slot)
+        if key == 'Amount':
+            return self._table.amount_text(self._slot)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(HEADERS)
+
+    def __len__(self):
+        return len(HEADERS)
+
+    def __repr__(self):
+        return f"ExpenseRow({dict(self)!r})"
+
+    def month_paise(self):
+        return self._table.month_paise(self._slot)
+
+    def day_paise(self):
+        return self._table.day_paise(self._slot)
+
+class RowList(Sequence):
+    # The rows of a set of slots, created as views only when accessed.
+    __slots__ = ('_table', '_slots')
+
+    def __init__(self, table, slots):
+        self._table = table
+        self._slots = slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ExpenseRow(self._table, slot) for slot in self._slots[i]]
+        return ExpenseRow(self._table, self._slots[i])
+
+    def __iter__(self):
+        table = self._table
+        return (ExpenseRow(table, slot) for slot in self._slots)
+
+class ChainedRows(Sequence):
+    # Several row sequences read as one, e.g. one RowList per partition.
+    __slots__ = ('_parts', '_starts')
+
+    def __init__(self, parts):
+        self._parts = [part for part in parts if len(part)]
+        self._starts = []
+        total = 0
+        for part in self._parts:
+            self._starts.append(total)
+            total += len(part)
+        self._starts.append(total)
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            rows = []
+            part = bisect_right(self._starts, start) - 1
+            while start < stop:
+                offset = self._starts[part]
+                end = min(stop, self._starts[part + 1])
+                rows.extend(self._parts[part][start - offset:end - offset])
+                start = end
+                part += 1
+            return rows
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        part = bisect_right(self._starts, i) - 1
+        return self._parts[part][i - self._starts[part]]
+
+    def __iter__(self):
+        return chain.from_iterable(self._parts)
+
+class ExpenseTable:
+    def __init__(self):
+        self.ids = bytearray()
+        self.days = array('i')
+        self.paise = array('q')
+        self.desc_start = array('q')
+        self.desc_length = array('i')
+        self.alive = bytearray()
+        self.buffer = bytearray()
+        self.live = 0
+        self._pool = {}          # description -> (offset, length) in buffer
+        self._index = array('q', bytes(8 * _MIN_INDEX_SIZE))
+        self._index_used = 0     # Entries that are not _EMPTY, removed ones included
+        self._odd_ids = {}       # ID text -> slot, for IDs that are not packed UUIDs
+        self._odd_id_text = {}   # slot -> ID text
+        self._odd_dates = {}     # slot -> date text
+        self._odd_amounts = {}   # slot -> amount text
+        self._date_cache = {}    # day ordinal -> 'YYYY-MM-DD'
+        self._month_cache = {}   # day ordinal -> 'YYYY-MM'
+        self.load_errors = []    # {'line', 'error'} per malformed row of the file this was read from
+
+    def __len__(self):
+        return self.live
+
+    # --- Encoding ---
+    def _set_date(self, slot, text):
+        day = _day_ordinal(text)
+        if day is None:
+            self._odd_dates[slot] = text
+            day = 0
+        else:
+            self._odd_dates.pop(slot, None)
+        return day
+
+    def _set_amount(self, slot, text):
+        try:
+            paise = to_paise(text)
+            self._odd_amounts.pop(slot, None)
+        except ValueError:
+            self._odd_amounts[slot] = '' if text is None else str(text)
+            paise = 0
+        return paise
+
+    def store_description(self, text):
+        # (offset, length) of text in buffer; repeats share the first copy.
+        span = self._pool.get(text)
+        if span is None:
+            data = text.encode('utf-8')
+            span = (len(self.buffer), len(data))
+            self.buffer += data
+            if len(self._pool) < DESCRIPTION_POOL_LIMIT:
+                self._pool[text] = span
+        return span
+
+    def _set_id(self, slot, expense_id):
+        key = _uuid_bytes(expense_id)
+        if key is None:
+            old = self._odd_ids.get(expense_id)
+            if old is not None:
+                self._kill(old)
+            self._odd_ids[expense_id] = slot
+            self._odd_id_text[slot] = expense_id
+            key = bytes(16)
+        return key
+
+    def append(self, expense_id, date_text, description, amount):
+        # Adds a row without indexing its ID; reindex() must follow. Used for
+        # bulk loads, where one rebuild is far cheaper than growing the index.
+        slot = len(self.alive)
+        self.ids += self._set_id(slot, expense_id)
+        self.days.append(self._set_date(slot, date_text or ''))
+        self.paise.append(self._set_amount(slot, amount))
+        start, length = self.store_description(description or '')
+        self.desc_start.append(start)
+        self.desc_length.append(length)
+        self.alive.append(1)
+        self.live += 1
+        return slot
+
+    def extend_columns(self, ids, days, paise, desc_start, desc_length):
+        # Adds len(days) live rows at once from packed column buffers in the
+        # layouts above (see columnar.read_ledger_columns). Descriptions must
+        # already be in the buffer. Like append(), no ID is indexed.
+        self.ids += ids
+        self.days.frombytes(days)
+        self.paise.frombytes(paise)
+        self.desc_start.frombytes(desc_start)
+        self.desc_length.frombytes(desc_length)
+        count = len(self.days) - len(self.alive)
+        self.alive += b'\x01' * count
+        self.live += count
+
+    def fill(self, slot, expense_id, date_text, description, amount):
+        # Sets every column of a slot added by extend_columns() the way
+        # append() would have, for rows the bulk loader left to Python.
+        self.ids[slot * 16:slot * 16 + 16] = self._set_id(slot, expense_id)
+        self.overwrite(slot, date_text, description, amount)
+
+    def insert(self, expense_id, date_text, description, amount):
+        slot = self.append(expense_id, date_text, description, amount)
+        if slot not in self._odd_id_text:
+            self._index_add(bytes(self.ids[slot * 16:slot * 16 + 16]), slot)
+        return slot
+
+    def overwrite(self, slot, date_text, description, amount):
+        self.days[slot] = self._set_date(slot, date_text or '')
+        self.paise[slot] = self._set_amount(slot, amount)
+        self.desc_start[slot], self.desc_length[slot] = self.store_description(description or '')
+
+    def put(self, expense_id, date_text, description, amount):
+        slot = self.find(expense_id)
+        if slot < 0:
+            return self.insert(expense_id, date_text, description, amount)
+        self.overwrite(slot, date_text, description, amount)
+        return slot
+
+    def _kill(self, slot):
+        if self.alive[slot]:
+            self.alive[slot] = 0
+            self.live -= 1
+
+    def remove(self, slot):
+        # The slot's values stay readable, so views of deleted rows still work.
+        if not self.alive[slot]:
+            return
+        self._kill(slot)
+        odd_id = self._odd_id_text.get(slot)
+        if odd_id is not None:
+            self._odd_ids.pop(odd_id, None)
+        else:
+            position = self._probe(bytes(self.ids[slot * 16:slot * 16 + 16]))
+            if position >= 0:
+                self._index[position] = _REMOVED
+
+    # --- ID Index ---
+    def _probe(self, key):
+        # Position of key in the hash table, or -1.
+        index, ids = self._index, self.ids
+        mask = len(index) - 1
+        i = int.from_bytes(key[:8], 'little') & mask
+        while True:
+            entry = index[i]
+            if entry == _EMPTY:
+                return -1
+            if entry > 0 and ids[(entry - 1) * 16:entry * 16] == key:
+                return i
+            i = (i + 1) & mask
+
+    def _index_add(self, key, slot):
+        if (self._index_used + 1) * 2 > len(self._index):
+            self.reindex()
+            if self._probe(key) >= 0:
+                return
+        index = self._index
+        mask = len(index) - 1
+        i = int.from_bytes(key[:8], 'little') & mask
+        while index[i] > 0:
+            i = (i + 1) & mask
+        if index[i] == _EMPTY:
+            self._index_used += 1
+        index[i] = slot + 1
+
+    def reindex(self):
+        # Rebuilds the hash table from the live slots at a load factor of at
+        # most 1/2. A repeated ID keeps its last slot, like dict assignment.
+        size = _MIN_INDEX_SIZE
+        while size < self.live * 2:
+            size *= 2
+        index = array('q', bytes(8 * size))
+        mask = size - 1
+        ids, odd = self.ids, self._odd_id_text
+        used = 0
+        for slot in compress(range(len(self.alive)), self.alive):
+            if slot in odd:
+                continue
+            key = ids[slot * 16:slot * 16 + 16]
+            i = int.from_bytes(key[:8], 'little') & mask
+            while True:
+                entry = index[i]
+                if entry == _EMPTY:
+                    index[i] = slot + 1
+                    used += 1
+                    break
+                if ids[(entry - 1) * 16:entry * 16] == key:
+                    self._kill(entry - 1)
+                    index[i] = slot + 1
+                    break
+                i = (i + 1) & mask
+        self._index = index
+        self._index_used = used
+
+    def adopt_index(self, index, used, superseded=()):
+        # Installs an array('q') hash table of the live slots built elsewhere
+        # in reindex()'s layout, used being its entries that are not _EMPTY.
+        # superseded are the earlier slots of repeated IDs, which reindex()
+        # would have killed.
+        for slot in superseded:
+            self._kill(slot)
+        self._index = index
+        self._index_used = used
+
+    def find(self, expense_id):
+        # Slot of a live row, or -1.
+        key = _uuid_bytes(expense_id)
+        if key is None:
+            return self._odd_ids.get(expense_id, -1)
+        position = self._probe(key)
+        return self._index[position] - 1 if position >= 0 else -1
+
+    # --- Decoding ---
+    def id_text(self, slot):
+        text = self._odd_id_text.get(slot)
+        if text is not None:
+            return text
+        h = self.ids[slot * 16:slot * 16 + 16].hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def date_text(self, slot):
+        text = self._odd_dates.get(slot)
+        if text is not None:
+            return text
+        day = self.days[slot]
+        text = self._date_cache.get(day)
+        if text is None:
+            text = self._date_cache[day] = date.fromordinal(day).isoformat()
+        return text
+
+    def amount_text(self, slot):
+        text = self._odd_amounts.get(slot)
+        return text if text is not None else format_paise(self.paise[slot])
+
+    def description(self, slot):
+        start = self.desc_start[slot]
+        return self.buffer[start:start + self.desc_length[slot]].decode('utf-8')
+
+    def month_paise(self, slot):
+        # ('YYYY-MM', paise) for the summary index, or None if either is unparseable.
+        if slot in self._odd_dates or slot in self._odd_amounts:
+            return None
+        day = self.days[slot]
+        month = self._month_cache.get(day)
+        if month is None:
+            month = self._month_cache[day] = self.date_text(slot)[:7]
+        return month, self.paise[slot]
+
+    def day_paise(self, slot):
+        # (day ordinal, paise) for the daily index, or None if either is unparseable.
+        if slot in self._odd_dates or slot in self._odd_amounts:
+            return None
+        return self.days[slot], self.paise[slot]
+
+    def day_totals(self):
+        # {day ordinal: (paise, rows)} over the live rows the daily index can use.
+        totals = {}
+        odd = self.unparsed_slots()
+        for slot, (day, amount, alive) in enumerate(zip(self.days, self.paise, self.alive)):
+            if alive and slot not in odd:
+                paise, rows = totals.get(day, (0, 0))
+                totals[day] = (paise + amount, rows + 1)
+        return totals
+
+    def range_stats(self, first_day=None, last_day=None):
+        # (rows, paise) over the live rows dated first_day..last_day (day
+        # ordinals, inclusive). Unparseable dates never match; unparseable
+        # amounts count as a row of 0 paise.
+        if first_day is None and last_day is None and not self._odd_dates:
+            return self.live, sum(compress(self.paise, self.alive))
+        first = first_day or 1
+        last = last_day or date.max.toordinal()
+        rows = paise = 0
+        for amount, day, alive in zip(self.paise, self.days, self.alive):
+            if alive and first <= day <= last:
+                rows += 1
+                paise += amount
+        return rows, paise
+
+    def odd_id_slots(self):
+        # Slots whose ID is not a packed UUID; they are not in the hash table.
+        return self._odd_id_text.keys()
+
+    def odd_date_slots(self):
+        # Slots whose Date did not parse; their day ordinal reads 0.
+        return self._odd_dates.keys()
+
+    def odd_amount_slots(self):
+        # Slots whose Amount did not parse; their paise read 0.
+        return self._odd_amounts.keys()
+
+    def unparsed_slots(self):
+        # Slots whose Date or Amount did not parse; the summaries skip them.
+        return self._odd_dates.keys() | self._odd_amounts.keys()
+
+    # --- Rows ---
+    def live_slots(self):
+        if self.live == len(self.alive):
+            return array('i', range(self.live))
+        return array('i', compress(range(len(self.alive)), self.alive))
+
+    def row(self, slot):
+        return ExpenseRow(self, slot)
+
+    def rows(self):
+        return RowList(self, self.live_slots())
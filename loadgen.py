@@ -0,0 +1,151 @@
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from expense_tracker import RemoteStorage, StorageError
+from benchmark import DESCRIPTIONS, generate_ledger
+
+# --- Configuration ---
+DEFAULT_CLIENTS = 16
+DEFAULT_DURATION_S = 10
+DEFAULT_WRITE_RATIO = 0.5
+DEFAULT_LEDGER_ROWS = 10000
+SERVER_START_TIMEOUT_S = 30
+
+# --- Load Generator ---
+# Starts (or connects to) an expense server and runs N client threads, each
+# with its own keep-alive connection, doing a mix of adds and reads for a
+# fixed time. Prints throughput, latency percentiles and, from the server's
+# /metrics, how many adds were grouped into each fsync'd write batch.
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(directory, rows, seed):
+    path = os.path.join(directory, 'expenses.csv')
+    generate_ledger(path, rows, seed)
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'expense_tracker', '--data', path, 'serve', '--port', str(port)],
+                               stdout=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)))
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_S
+    while True:
+        try:
+            RemoteStorage(url).load()
+            return process, url
+        except StorageError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.1)
+
+def client(store, seed, write_ratio, stop_at, latencies, counts, errors):
+    rng = random.Random(seed)
+    first_day = date(2015, 1, 1)
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                day = first_day + timedelta(days=rng.randrange(3650))
+                store.add(day.isoformat(), rng.choice(DESCRIPTIONS), round(rng.uniform(10, 5000), 2))
+                kind = 'write'
+            else:
+                day = first_day + timedelta(days=rng.randrange(3650))
+                if rng.random() < 0.5:
+                    store.month_total(day.year, day.month)
+                else:
+                    store.search(rng.choice(DESCRIPTIONS)[:4], prefix=True, limit=50)
+                kind = 'read'
+        except StorageError:
+            errors.append(1)
+            continue
+        latencies[kind].append(time.perf_counter() - started)
+        counts[kind] += 1
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def _batch_counts(store):
+    batches = store._request('GET', '/metrics').get('server.write_batch') or {'calls': 0, 'rows': 0}
+    return batches['calls'], batches['rows']
+
+def run(url, clients, duration, write_ratio, seed):
+    store = RemoteStorage(url)
+    calls_before, rows_before = _batch_counts(store)
+    errors = []
+    stop_at = time.monotonic() + duration
+    threads = []
+    results = []
+    for i in range(clients):
+        latencies, counts = {'read': [], 'write': []}, {'read': 0, 'write': 0}
+        results.append((latencies, counts))
+        threads.append(threading.Thread(target=client, args=(store, seed + i, write_ratio, stop_at, latencies, counts, errors),
+                                        daemon=True))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    report = {'clients': clients, 'seconds': round(elapsed, 2), 'errors': len(errors)}
+    for kind in ('read', 'write'):
+        latencies = [value for result in results for value in result[0][kind]]
+        report[kind] = {'requests': len(latencies), 'per_second': round(len(latencies) / elapsed, 1),
+                        'p50_ms': round(_percentile(latencies, 0.5) * 1000, 2),
+                        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2)}
+    calls, rows = _batch_counts(store)
+    if calls > calls_before:
+        report['write_batches'] = calls - calls_before
+        report['avg_batch_size'] = round((rows - rows_before) / (calls - calls_before), 2)
+    store.close()
+    return report
+
+def print_report(report):
+    print(f"{report['clients']} clients for {report['seconds']} s ({report['errors']} failed requests)")
+    for kind in ('read', 'write'):
+        result = report[kind]
+        print(f"  {kind:<6} {result['requests']:>8} requests  {result['per_second']:>9.1f}/s  "
+              f"p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms")
+    if 'write_batches' in report:
+        print(f"  {report['write_batches']} write batches (fsyncs), {report['avg_batch_size']} mutations per batch on average")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the expense server")
+    parser.add_argument('--url', help="Server to load (default: start one on a temporary synthetic ledger)")
+    parser.add_argument('--clients', type=int, nargs='+', default=[DEFAULT_CLIENTS], help="Concurrent clients; several values run one round each")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION_S, help="Seconds per round")
+    parser.add_argument('--write-ratio', type=float, default=DEFAULT_WRITE_RATIO, help="Share of requests that add an expense")
+    parser.add_argument('--rows', type=int, default=DEFAULT_LEDGER_ROWS, help="Size of the temporary ledger")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    directory = process = None
+    url = args.url
+    if url is None:
+        directory = tempfile.mkdtemp(prefix='expense-load-')
+        process, url = start_server(directory, args.rows, args.seed)
+        print(f"Started a server on {url} with {args.rows} expenses", file=sys.stderr)
+    try:
+        for clients in args.clients:
+            print_report(run(url, clients, args.duration, args.write_ratio, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import random
+import uuid
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from expense_tracker import CsvStorage, HEADERS, MonthlyIndex, table_day_totals, table_monthly_index, table_range_stats
+from expense_tracker import storage
+from expense_tracker.columnar import read_ledger_columns
+from expense_tracker.table import ExpenseTable
+
+def read_row_by_row(path, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, 'read_ledger_columns', lambda path, table: None)
+        return storage.read_ledger_csv(path)
+
+def assert_same_table(columns, rows):
+    assert [dict(row) for row in columns.rows()] == [dict(row) for row in rows.rows()]
+    assert bytes(columns.alive) == bytes(rows.alive) and columns.live == rows.live
+    assert columns.load_errors == rows.load_errors
+    assert columns.unparsed_slots() == rows.unparsed_slots()
+    for row in rows.rows():
+        assert columns.find(row['ID']) == rows.find(row['ID'])
+
+def uid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def test_usual_ledger_matches_the_row_by_row_read(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    lines = [','.join(HEADERS)]
+    for _ in range(500):
+        amount = rng.choice([f"{rng.uniform(1, 5000):.2f}", f"{rng.uniform(1, 99):.1f}", str(rng.randint(0, 10 ** 9))])
+        lines.append(f"{uid(rng)},{rng.randint(1990, 2030)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},"
+                     f"{rng.choice(['Rent', 'Chai', '', 'x' * 80, 'ऑटो'])},{amount}")
+    path = tmp_path / 'expenses.csv'
+    path.write_text('\r\n'.join(lines) + '\r\n', encoding='utf-8')
+    columns = ExpenseTable()
+    assert read_ledger_columns(str(path), columns) is columns
+    assert columns.load_errors == []
+    assert_same_table(columns, read_row_by_row(str(path), monkeypatch))
+
+def test_malformed_rows_are_reported_by_line(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    repeated = uid(rng)
+    lines = [','.join(HEADERS),
+             f"{repeated},2024-01-05,Groceries,120.50",
+             '',
+             f"{uid(rng)},2024-02-30,Bad date,10",
+             f"{uid(rng)},2024-01-06,Bad amount,12.3.4",
+             f"{uid(rng)},2024-01-07,Three fields",
+             f"{uid(rng)},2024-01-08,Five,fields,1",
+             f'{uid(rng)},2024-01-09,"Quoted, with a\nnewline",7',
+             f"not-a-uuid,2024-01-10,Odd ID,8",
+             f"{repeated},2024-01-11,Later copy wins,9"]
+    path = tmp_path / 'expenses.csv'
+    path.write_text('\n'.join(lines), encoding='utf-8') # No newline at the end
+    columns = ExpenseTable()
+    read_ledger_columns(str(path), columns)
+    assert columns.load_errors == [
+        {'line': 3, 'error': "Empty row skipped"},
+        {'line': 4, 'error': "Unparseable date '2024-02-30'"},
+        {'line': 5, 'error': "Unparseable amount '12.3.4'"},
+        {'line': 6, 'error': "Expected 4 fields, found 3"},
+        {'line': 7, 'error': "Expected 4 fields, found 5"},
+    ]
+    assert columns.row(columns.find(repeated))['Description'] == 'Later copy wins'
+    assert columns.row(columns.find('not-a-uuid'))['Amount'] == '8.00'
+    assert_same_table(columns, read_row_by_row(str(path), monkeypatch))
+
+def test_other_files_are_left_to_the_row_by_row_read(tmp_path):
+    path = tmp_path / 'expenses.csv'
+    path.write_text('Date,Amount\n2024-01-01,5\n')
+    assert read_ledger_columns(str(path), ExpenseTable()) is None
+    path.write_text(','.join(HEADERS) + '\r' + f"{uuid.uuid4()},2024-01-01,Old Mac line ends,5\r")
+    assert read_ledger_columns(str(path), ExpenseTable()) is None
+
+def test_store_exposes_load_errors(tmp_path):
+    path = tmp_path / 'expenses.csv'
+    path.write_text(','.join(HEADERS) + f"\n{uuid.uuid4()},2024-03-01,Books,15\n{uuid.uuid4()},2024-03-02\n")
+    store = CsvStorage(str(path)).load()
+    assert len(store) == 2
+    assert store.load_errors == [{'line': 3, 'error': "Expected 4 fields, found 2"}]
+    assert store.month_total(2024, 3) == 15
+
+def test_aggregates_match_the_table():
+    rng = random.Random(11)
+    table = ExpenseTable()
+    for _ in range(300):
+        table.append(uid(rng), f"{rng.randint(2019, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                     'Item', str(rng.randint(1, 10 ** 6) / 100))
+    table.append(uid(rng), 'someday', 'Undated', '5')
+    table.append(uid(rng), '2024-01-01', 'Unpriced', 'lots')
+    table.remove(3)
+    table.reindex()
+    columns, rows = table_monthly_index(table), MonthlyIndex().rebuild(table.rows())
+    assert (columns.months, columns.years) == (rows.months, rows.years)
+    assert table_day_totals(table) == table.day_totals()
+    for first, last in [(None, None), (737425, 738000), (738000, None), (None, 737500), (739000, 738000)]:
+        assert table_range_stats(table, first, last) == table.range_stats(first, last)
@@ -0,0 +1,99 @@
+import random
+from datetime import date
+
+import pytest
+
+from expense_tracker import CsvStorage, DailyIndex, FenwickTree, ValidationError
+from expense_tracker import daily
+
+def brute_range(totals, first, last):
+    entries = [entry for day, entry in totals.items() if first <= day <= last]
+    return sum(rows for _, rows in entries), sum(paise for paise, _ in entries)
+
+def brute_weekdays(totals, first, last):
+    result = [[name, 0, 0] for name in daily.WEEKDAYS]
+    for day, (paise, rows) in totals.items():
+        if first <= day <= last:
+            result[date.fromordinal(day).weekday()][1] += paise
+            result[date.fromordinal(day).weekday()][2] += rows
+    return [tuple(item) for item in result]
+
+def test_fenwick_prefix_sums_follow_point_updates():
+    rng = random.Random(1)
+    values = [rng.randint(-50, 50) for _ in range(200)]
+    tree = FenwickTree(values)
+    for _ in range(300):
+        position, delta = rng.randrange(len(values)), rng.randint(-100, 100)
+        values[position] += delta
+        tree.add(position, delta)
+        end = rng.randint(0, len(values) + 5)
+        assert tree.prefix(end) == sum(values[:end])
+
+def test_range_stats_match_brute_force_as_the_span_grows():
+    rng = random.Random(2)
+    index, totals = DailyIndex(), {}
+    middle = date(2020, 6, 15).toordinal()
+    for step in range(2000):
+        # Spread widens over time, so the span grows both ways; a few far-off
+        # days end up as outliers.
+        day = middle + rng.randint(-step * 4, step * 4)
+        if rng.random() < 0.01:
+            day = rng.choice([date(9999, 12, 31).toordinal(), date(1, 1, 1).toordinal(), date(2999, 1, 1).toordinal()])
+        paise = rng.randint(1, 100000)
+        index.add(day, paise)
+        old_paise, old_rows = totals.get(day, (0, 0))
+        totals[day] = (old_paise + paise, old_rows + 1)
+        if rng.random() < 0.2:
+            # An edit or delete: the row comes back out.
+            index.add(day, -paise, -1)
+            totals[day] = (totals[day][0] - paise, totals[day][1] - 1)
+    totals = {day: entry for day, entry in totals.items() if entry != (0, 0)}
+    assert index.day_totals() == totals
+    assert len(index.paise) <= daily.MAX_SPAN_DAYS and index.outliers
+    for _ in range(300):
+        first = rng.choice([middle - rng.randint(0, 9000), 1, date(2999, 1, 1).toordinal()])
+        last = first + rng.randint(0, 20000)
+        assert index.range_stats(first, last) == brute_range(totals, first, last)
+        assert index.weekday_totals(first, last) == brute_weekdays(totals, first, last)
+    assert index.range_stats(1, date.max.toordinal()) == brute_range(totals, 1, date.max.toordinal())
+
+def test_rebuild_days_centres_the_span_on_the_busiest_days():
+    busy = {date(2024, 1, 1).toordinal() + i: (100 * i, 1) for i in range(50)}
+    typo = {date(9999, 12, 31).toordinal(): (5, 1)}
+    index = DailyIndex().rebuild_days({**busy, **typo})
+    assert index.first_day == min(busy)
+    assert index.outliers == {day: [paise, rows] for day, (paise, rows) in typo.items()}
+    assert index.day_totals() == {**busy, **typo}
+
+def test_too_many_outliers_move_the_span(monkeypatch):
+    monkeypatch.setattr(daily, 'MAX_OUTLIER_DAYS', 5)
+    index = DailyIndex()
+    index.add(date(9999, 12, 31).toordinal(), 5) # The first expense has the typo date
+    first = date(2024, 1, 1).toordinal()
+    for i in range(10):
+        index.add(first + i * 400 * 10, 100)
+    assert len(index.outliers) <= 5
+    assert index.range_stats(first, date.max.toordinal()) == (11, 1005)
+
+def test_report_compares_with_the_same_days_a_year_earlier():
+    index = DailyIndex()
+    index.add(date(2023, 2, 28).toordinal(), 1000)
+    index.add(date(2024, 2, 29).toordinal(), 3000)
+    index.add(date(2024, 2, 1).toordinal(), 2000)
+    report = index.report('2024-02-01', '2024-02-29')
+    assert (report['total'], report['count'], report['days']) == (50.0, 2, 29)
+    assert report['year_over_year'] == {'from': '2023-02-01', 'to': '2023-02-28', 'total': 10.0, 'count': 1, 'change': 4.0}
+    assert report['rolling'][0] == {'days': 7, 'average': 30 / 7}
+    assert {'weekday': 'Thursday', 'total': 50.0, 'count': 2} in report['weekdays']
+    with pytest.raises(ValidationError):
+        index.report('2024-03-01', '2024-02-01')
+
+def test_store_keeps_its_daily_index_current(tmp_path):
+    store = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    rows = store.add_many([(f'2024-05-{day:02d}', 'Chai', str(day)) for day in range(1, 29)])
+    store.daily_report('2024-05-01', '2024-05-31') # Builds the index
+    store.update(rows[0]['ID'], '2024-06-01', 'Chai', '100')
+    store.delete(rows[1]['ID'])
+    store.add('2024-05-31', 'Rent', '900')
+    for start, end in [('2024-05-01', '2024-05-31'), ('2024-06-01', '2024-06-30'), ('2023-05-01', '2024-05-15')]:
+        assert store.daily_report(start, end) == DailyIndex().rebuild(store.all()).report(start, end)
@@ -0,0 +1,57 @@
+from expense_tracker import CsvStorage, import_expenses
+from expense_tracker.importer import parse_import_amount, validate_import_batch
+
+STATEMENT = """Txn Date,Narration,Debit
+05/01/2024,Groceries,"1,250.00"
+06/01/2024,Salary,50000 Cr
+07/01/2024,Refund,(120.00)
+08/01/2024,Reversal,20-
+09/01/2024,Huge,1e30
+10/01/2024,Infinite,inf
+11/01/2024,Not a number,nan
+12/01/2024,Zero,0
+13/01/2024,Fuel,Rs. 500 Dr
+32/01/2024,Bad date,10
+14/01/2024,Nothing,
+"""
+
+def test_parse_import_amount_signs():
+    assert parse_import_amount('1,250.00') == 1250.0
+    assert parse_import_amount('₹ 99 Dr') == 99.0
+    assert parse_import_amount('500 Cr') == -500.0
+    assert parse_import_amount('(10.00)') == -10.0
+    assert parse_import_amount('20-') == -20.0
+
+def test_validate_rejects_amounts_the_ledger_cannot_hold():
+    batch = [(2, '2024-01-01', 'Big', '1e30'), (3, '2024-01-01', 'Inf', 'inf'), (4, '2024-01-01', 'NaN', 'nan'),
+             (5, '2024-01-01', 'Ok', '12.50')]
+    valid, errors = validate_import_batch(batch, '%Y-%m-%d')
+    assert valid == [(5, '2024-01-01', 'Ok', 12.5)]
+    assert [error['line'] for error in errors] == [2, 3, 4]
+    assert all(error['error'].startswith('Invalid amount') for error in errors)
+
+def test_import_reports_bad_rows_and_imports_the_rest(tmp_path):
+    source = tmp_path / 'statement.csv'
+    source.write_text(STATEMENT, encoding='utf-8')
+    store = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    report = import_expenses(str(source), store=store)
+    assert report['date_format'] == '%d/%m/%Y'
+    assert report['imported'] == 2
+    assert sorted((row['Description'], row['Amount']) for row in store.all()) == [('Fuel', '500.00'),
+                                                                                  ('Groceries', '1250.00')]
+    errors = {error['line']: error['error'] for error in report['errors']}
+    assert sorted(errors) == [3, 4, 5, 6, 7, 8, 9, 11, 12]
+    assert all('Credit amount' in errors[line] for line in (3, 4, 5))
+    assert all(errors[line].startswith('Invalid amount') for line in (6, 7, 8))
+    assert errors[9] == "Amount must be positive."
+    assert errors[11].startswith('Invalid date')
+    assert errors[12] == "No amount"
+
+def test_reimport_skips_duplicates(tmp_path):
+    source = tmp_path / 'statement.csv'
+    source.write_text(STATEMENT, encoding='utf-8')
+    store = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    import_expenses(str(source), store=store)
+    again = import_expenses(str(source), store=store)
+    assert again['imported'] == 0
+    assert again['duplicates'] == [2, 10]
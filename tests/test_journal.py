@@ -0,0 +1,88 @@
+import os
+
+from expense_tracker import CsvStorage, HEADERS, metrics
+from expense_tracker.storage import trim_torn_tail
+
+def open_csv(tmp_path, **kwargs):
+    return CsvStorage(str(tmp_path / 'expenses.csv'), **kwargs).load()
+
+def test_replay_restores_rows_without_compaction(tmp_path):
+    store = open_csv(tmp_path)
+    kept = store.add('2024-01-05', 'Groceries', '120.50')
+    edited = store.add('2024-01-06', 'Rent', '900')
+    gone = store.add('2024-02-01', 'Fuel', '40')
+    store.update(edited['ID'], '2024-01-07', 'Rent (Jan)', '950')
+    store.delete(gone['ID'])
+    store.sync()
+    # No close(): the rows only exist in the journal.
+    reloaded = open_csv(tmp_path)
+    assert dict(reloaded.get(kept['ID'])) == {'ID': kept['ID'], 'Date': '2024-01-05', 'Description': 'Groceries',
+                                              'Amount': '120.50'}
+    assert reloaded.get(edited['ID'])['Amount'] == '950.00'
+    assert reloaded.get(gone['ID']) is None
+    assert reloaded.month_total(2024, 1) == 1070.5
+    assert reloaded.check_summary() == []
+
+def test_torn_tail_does_not_swallow_the_next_entry(tmp_path):
+    store = open_csv(tmp_path)
+    first = store.add('2024-03-01', 'Books', '15')
+    store.sync()
+    # A crash in the middle of writing the next entry.
+    with open(store.journal_path, 'a', newline='') as file:
+        file.write('A,5e0f, "half a descr')
+    store = open_csv(tmp_path)
+    second = store.add('2024-03-02', 'Movie tickets', '30')
+    store.sync()
+    reloaded = open_csv(tmp_path)
+    assert reloaded.get(first['ID']) is not None
+    assert reloaded.get(second['ID']) is not None
+    assert len(reloaded) == 2
+
+def test_trim_keeps_quoted_newlines(tmp_path):
+    path = tmp_path / 'journal'
+    complete = b'A,1,2024-01-01,"two\nlines",5\r\n'
+    path.write_bytes(complete + b'A,2,2024-01-02,"torn\n')
+    trim_torn_tail(str(path))
+    assert path.read_bytes() == complete
+    trim_torn_tail(str(tmp_path / 'missing')) # No journal yet: nothing to do
+
+def test_compaction_folds_the_journal_into_the_csv(tmp_path):
+    store = open_csv(tmp_path, compact_threshold=1000)
+    rows = store.add_many([(f'2024-04-{day:02d}', f'Item {day}', str(day)) for day in range(1, 21)])
+    store.delete(rows[0]['ID'])
+    store.compact()
+    assert not os.path.exists(store.journal_path)
+    assert not os.path.exists(store.compacting_path)
+    with open(store.path) as file:
+        lines = file.read().splitlines()
+    assert lines[0] == ','.join(HEADERS)
+    assert len(lines) == 20
+    store.close()
+    reloaded = open_csv(tmp_path)
+    assert len(reloaded) == 19
+    assert reloaded.month_total(2024, 4) == sum(range(2, 21))
+
+def test_interrupted_compaction_is_replayed(tmp_path):
+    store = open_csv(tmp_path)
+    row = store.add('2024-05-01', 'Gym membership', '700')
+    store.sync()
+    # The journal was rotated but the snapshot never written.
+    store._journal.close()
+    store._journal = None
+    os.replace(store.journal_path, store.compacting_path)
+    reloaded = open_csv(tmp_path)
+    assert reloaded.get(row['ID'])['Amount'] == '700.00'
+    reloaded.close()
+    assert not os.path.exists(reloaded.compacting_path)
+    assert open_csv(tmp_path).get(row['ID']) is not None
+
+def test_failed_summary_save_is_reported_not_printed(tmp_path, capsys):
+    store = open_csv(tmp_path)
+    store.add('2024-06-01', 'Tea', '10')
+    os.mkdir(store.summary_path + '.tmp') # The save cannot create its temp file
+    errors = metrics.snapshot().get('csv.save_summary', {}).get('errors', 0)
+    store.close()
+    assert capsys.readouterr().out == ''
+    assert 'Could not save summary index' in str(store.summary_error)
+    assert metrics.snapshot()['csv.save_summary']['errors'] == errors + 1
+    assert open_csv(tmp_path).month_total(2024, 6) == 10.0
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+def test_import_does_not_load_server_or_sqlite():
+    # Startup of the GUI and the CLI pays for every module the package imports.
+    code = ("import sys, expense_tracker; "
+            "print(sorted(m for m in ('asyncio', 'sqlite3', 'http.client') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.strip() == '[]'
+
+def test_lazy_names_still_resolve():
+    import expense_tracker
+    from expense_tracker.server import serve
+    assert expense_tracker.serve is serve
+    assert expense_tracker.SqliteStorage.__name__ == 'SqliteStorage'
+    assert expense_tracker.RemoteStorage.__name__ == 'RemoteStorage'
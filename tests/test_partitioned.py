@@ -0,0 +1,67 @@
+import os
+
+from expense_tracker import CsvStorage, PartitionedStorage, convert_csv_to_partitions, metrics
+
+def make_ledger(tmp_path):
+    # A CSV ledger over three months, converted to partitions.
+    source = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    source.add_many([('2024-01-10', 'Rent', '900'), ('2024-01-20', 'Tea', '0.10'),
+                     ('2024-02-05', 'Fuel', '40'), ('2024-03-15', 'Books', '15.50')])
+    source.close()
+    directory = str(tmp_path / 'parts')
+    convert_csv_to_partitions(source.path, directory)
+    return directory
+
+def ids_by_description(store):
+    return {row['Description']: row['ID'] for row in store.all()}
+
+def test_cross_month_update_moves_the_row(tmp_path):
+    directory = make_ledger(tmp_path)
+    ids = ids_by_description(PartitionedStorage(directory).load())
+    store = PartitionedStorage(directory).load()
+    moved = store.update(ids['Rent'], '2024-03-01', 'Rent', '950')
+    assert moved['Date'] == '2024-03-01'
+    assert store.month_total(2024, 1) == 0.1
+    assert store.month_total(2024, 3) == 965.5
+    assert store.daily_report('2024-01-01', '2024-03-31')['total'] == 1005.6
+    assert [row['Description'] for row in store.search(start_date='2024-03-01', end_date='2024-03-31')] == ['Rent', 'Books']
+    assert store.check_summary() == []
+    store.close()
+
+    reloaded = PartitionedStorage(directory).load()
+    assert len(reloaded) == 4
+    assert reloaded.get(ids['Rent'])['Date'] == '2024-03-01'
+    assert sorted(row['Description'] for row in reloaded.all()) == ['Books', 'Fuel', 'Rent', 'Tea']
+
+def test_move_into_a_month_not_read_yet_is_not_duplicated(tmp_path):
+    directory = make_ledger(tmp_path)
+    ids = ids_by_description(PartitionedStorage(directory).load())
+    store = PartitionedStorage(directory).load()
+    # Only January and February get read; March is untouched until the move.
+    store.update(ids['Fuel'], '2024-03-20', 'Fuel', '45')
+    assert [row['Description'] for row in store.all() if row['Date'].startswith('2024-03')] == ['Books', 'Fuel']
+    store.close()
+    assert len(PartitionedStorage(directory).load().all()) == 4
+
+def test_add_many_returns_normalized_rows(tmp_path):
+    directory = make_ledger(tmp_path)
+    store = PartitionedStorage(directory).load()
+    store.get(PartitionedStorage(directory).load().all()[0]['ID']) # Reads January only
+    rows = store.add_many([('2024-01-25', 'Snacks', '94.9'), ('2024-05-01', 'Movie', '94.9')])
+    assert [dict(row) for row in rows] == [
+        {'ID': rows[0]['ID'], 'Date': '2024-01-25', 'Description': 'Snacks', 'Amount': '94.90'},
+        {'ID': rows[1]['ID'], 'Date': '2024-05-01', 'Description': 'Movie', 'Amount': '94.90'},
+    ]
+    assert store.add('2024-06-01', 'Gym', '7.5')['Amount'] == '7.50'
+
+def test_failed_manifest_save_is_reported_not_printed(tmp_path, capsys):
+    directory = make_ledger(tmp_path)
+    store = PartitionedStorage(directory).load()
+    store.add('2024-04-01', 'Medicines', '12')
+    os.mkdir(store.manifest_path + '.tmp')
+    errors = metrics.snapshot().get('partitioned.save_manifest', {}).get('errors', 0)
+    store.close()
+    assert capsys.readouterr().out == ''
+    assert 'Could not save partition manifest' in str(store.manifest_error)
+    assert metrics.snapshot()['partitioned.save_manifest']['errors'] == errors + 1
+    assert PartitionedStorage(directory).load().month_total(2024, 4) == 12.0
@@ -0,0 +1,45 @@
+import pytest
+
+from expense_tracker import CsvStorage, ValidationError, format_paise, to_paise, validate_expense
+from expense_tracker.storage import add_expense_to_csv, close_store, use_backend
+
+def test_to_paise_is_exact():
+    assert to_paise('19.99') == 1999
+    assert to_paise('120') == 12000
+    assert to_paise('-5.5') == -550
+    assert to_paise(0.1) == 10
+    assert to_paise('1.005') == 101 # Half up
+    assert format_paise(-550) == '-5.50'
+
+@pytest.mark.parametrize('amount', ['1e30', '9e999999999', 'inf', '-inf', 'nan', 'NaN', 'abc', '', None])
+def test_to_paise_rejects_what_the_ledger_cannot_hold(amount):
+    with pytest.raises(ValueError):
+        to_paise(amount)
+
+@pytest.mark.parametrize('amount', ['1e30', 'inf', 'nan', 'abc', None])
+def test_validate_expense_rejects_unrepresentable_amounts(amount):
+    with pytest.raises(ValidationError):
+        validate_expense('2024-01-01', amount)
+
+@pytest.mark.parametrize('amount', ['0', '-3', '0.001'])
+def test_validate_expense_requires_positive(amount):
+    with pytest.raises(ValidationError, match='positive'):
+        validate_expense('2024-01-01', amount)
+
+def test_validate_expense_checks_the_date():
+    assert validate_expense('2024-02-29', '12.5') == 12.5
+    with pytest.raises(ValidationError):
+        validate_expense('2023-02-29', '12.5')
+
+def test_rejected_amounts_never_reach_the_totals(tmp_path):
+    path = str(tmp_path / 'expenses.csv')
+    use_backend('csv', path)
+    try:
+        assert add_expense_to_csv('2024-06-01', 'Tea', '0.30')[0]
+        for amount in ('1e30', 'nan'):
+            assert add_expense_to_csv('2024-06-02', 'Bad', amount)[0] is False
+    finally:
+        close_store()
+    store = CsvStorage(path).load()
+    assert len(store) == 1
+    assert store.month_total(2024, 6) == 0.3
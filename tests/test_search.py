@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from expense_tracker import CsvStorage, PartitionedStorage, ValidationError, to_paise
+
+DESCRIPTIONS = ['Groceries', 'Rent', 'Electricity bill', 'Mobile recharge', 'Chai', 'chai with samosa',
+                'Dining out', 'Train ticket', 'Books', 'GROCERIES (bulk)']
+QUERIES = [{}, {'text': 'chai'}, {'text': 'GRO'}, {'text': 'gro', 'prefix': True}, {'text': 'ill'}, {'text': 'zz'},
+           {'start_date': '2023-03-10', 'end_date': '2023-07-31'}, {'end_date': '2022-12-31'},
+           {'min_amount': '100', 'max_amount': '999.99'}, {'min_amount': 4000},
+           {'text': 'e', 'start_date': '2023-01-01', 'min_amount': '50.5'},
+           {'text': 'rent', 'start_date': '2024-06-01', 'end_date': '2024-01-01'}]
+
+def fill(store, rng):
+    rows = store.add_many([(f"{rng.randint(2022, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                            rng.choice(DESCRIPTIONS), f"{rng.randint(100, 500000) / 100:.2f}") for _ in range(400)])
+    for row in rng.sample(rows, 40):
+        store.update(row['ID'], '2023-05-05', rng.choice(DESCRIPTIONS), str(rng.randint(1, 5000)))
+    for row in rng.sample(rows, 40):
+        store.delete(row['ID'])
+
+def sort_key(row, sort):
+    if sort == 'Amount':
+        return to_paise(row['Amount'])
+    if sort == 'Description':
+        return row['Description'].lower(), row['Date']
+    return row['Date']
+
+def brute_force(rows, text=None, prefix=False, start_date=None, end_date=None, min_amount=None, max_amount=None):
+    matches = []
+    for row in rows:
+        description = row['Description'].lower()
+        if text and not (description.startswith(text.lower()) if prefix else text.lower() in description):
+            continue
+        if start_date and row['Date'] < start_date or end_date and row['Date'] > end_date:
+            continue
+        paise = to_paise(row['Amount'])
+        if min_amount is not None and paise < to_paise(min_amount) or max_amount is not None and paise > to_paise(max_amount):
+            continue
+        matches.append(dict(row))
+    return matches
+
+def assert_matches_brute_force(store):
+    rows = [dict(row) for row in store.all()]
+    for query in QUERIES:
+        expected = brute_force(rows, **query)
+        for sort in ('Date', 'Description', 'Amount'):
+            for descending in (False, True):
+                found = [dict(row) for row in store.search(**query, sort=sort, descending=descending)]
+                assert sorted(found, key=lambda row: row['ID']) == sorted(expected, key=lambda row: row['ID']), query
+                keys = [sort_key(row, sort) for row in found]
+                assert keys == sorted(keys, reverse=descending), (query, sort)
+                limited = [sort_key(row, sort) for row in store.search(**query, sort=sort, descending=descending, limit=7)]
+                assert limited == keys[:7], (query, sort)
+
+@pytest.mark.parametrize('backend', ['csv', 'partitioned'])
+def test_search_matches_brute_force(tmp_path, backend):
+    def open_store():
+        if backend == 'csv':
+            return CsvStorage(str(tmp_path / 'expenses.csv')).load()
+        return PartitionedStorage(str(tmp_path / 'expenses')).load()
+    store = open_store()
+    fill(store, random.Random(5))
+    assert_matches_brute_force(store) # Indexes kept current by add/update/delete
+    store.close()
+    assert_matches_brute_force(open_store()) # Indexes rebuilt from disk
+
+def test_search_rejects_bad_filters(tmp_path):
+    store = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    with pytest.raises(ValidationError):
+        store.search(sort='ID')
+    with pytest.raises(ValidationError):
+        store.search(min_amount='lots')
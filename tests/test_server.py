@@ -0,0 +1,76 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from expense_tracker import CsvStorage, ExpenseServer, RemoteStorage, metrics
+
+@pytest.fixture
+def server(tmp_path):
+    # An ExpenseServer on a free port, run by its own event loop thread.
+    store = CsvStorage(str(tmp_path / 'expenses.csv')).load()
+    server = ExpenseServer(store, '127.0.0.1', 0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(10)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    store.close()
+
+def remote(server):
+    return RemoteStorage(f"http://127.0.0.1:{server.port}")
+
+def raw_request(server, data):
+    with socket.create_connection(('127.0.0.1', server.port), timeout=10) as sock:
+        sock.sendall(data)
+        response = b''
+        while chunk := sock.recv(65536):
+            response += chunk
+    return response
+
+def test_adds_are_batched_and_readable(server):
+    client = remote(server)
+    rows = client.add_many([('2024-01-0%d' % day, 'Tea', '10') for day in range(1, 6)])
+    assert [row['Amount'] for row in rows] == ['10.00'] * 5
+    assert client.month_total(2024, 1) == 50.0
+    assert client.get(rows[0]['ID'])['Date'] == '2024-01-01'
+    assert client.update(rows[1]['ID'], '2024-02-01', 'Tea', '12')['Amount'] == '12.00'
+    assert client.delete(rows[2]['ID'])['ID'] == rows[2]['ID']
+    assert len(client) == 4
+    client.close()
+
+def test_iter_chunks_pages_through_the_server(server):
+    client = remote(server)
+    client.add_many([(f'2024-03-{day:02d}', f'Item {day}', str(day)) for day in range(1, 26)])
+    requests = metrics.snapshot()['server.request']['calls']
+    chunks = list(client.iter_chunks(10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert metrics.snapshot()['server.request']['calls'] - requests == 3
+    assert [row['Description'] for chunk in chunks for row in chunk] == [f'Item {day}' for day in range(1, 26)]
+    ranged = [row['Date'] for chunk in client.iter_chunks(4, '2024-03-05', '2024-03-14') for row in chunk]
+    assert ranged == [f'2024-03-{day:02d}' for day in range(5, 15)]
+    client.close()
+
+def test_bad_content_length_is_a_400(server):
+    response = raw_request(server, b'POST /expenses HTTP/1.1\r\nContent-Length: ten\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 400 ')
+    assert b'Invalid Content-Length' in response
+    response = raw_request(server, b'POST /expenses HTTP/1.1\r\nContent-Length: -5\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 400 ')
+
+def test_reads_wait_for_the_writer(server):
+    client = remote(server)
+    client.add('2024-04-01', 'Books', '15')
+    with server._rows_lock:
+        reader = threading.Thread(target=lambda: result.append(client.all()))
+        result = []
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive() # Blocked until the writer lets go
+    reader.join(10)
+    assert [row['Description'] for row in result[0]] == ['Books']
+    client.close()
@@ -0,0 +1,27 @@
+import shutil
+import sqlite3
+
+from expense_tracker import SqliteStorage
+
+def test_sync_moves_commits_out_of_the_wal(tmp_path):
+    store = SqliteStorage(str(tmp_path / 'expenses.db')).load()
+    row = store.add('2024-07-01', 'Internet', '799')
+    store.sync()
+    # Only the main database file, without the -wal file next to it.
+    copy = tmp_path / 'copy.db'
+    shutil.copyfile(store.path, copy)
+    conn = sqlite3.connect(copy)
+    try:
+        assert conn.execute("SELECT Description, Amount FROM expenses WHERE ID = ?", (row['ID'],)).fetchall() == [
+            ('Internet', 799.0)]
+    finally:
+        conn.close()
+    store.close()
+
+def test_sqlite_totals_match_rows(tmp_path):
+    store = SqliteStorage(str(tmp_path / 'expenses.db')).load()
+    store.add_many([('2024-07-01', 'Tea', '0.10'), ('2024-07-02', 'Tea', '0.20'), ('2024-08-01', 'Rent', '900')])
+    assert store.month_total(2024, 7) == 0.3
+    assert store.range_total('2024-07-02', '2024-08-01') == 900.2
+    assert store.monthly_totals() == {'2024-07': 0.3, '2024-08': 900.0}
+    store.close()